@@ -8,6 +8,8 @@ function Auditoria() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const auth = useAuth();
 
   // Usamos useCallback para que la función sea estable y no cause warnings
@@ -15,9 +17,10 @@ function Auditoria() {
     try {
       setLoading(true);
       setError(null);
-      // Petición ligera
+      // Kardex paginado por cursor (más recientes primero)
       const response = await auth.axiosApi.get('/historial-inventario/');
-      setHistorial(response.data);
+      setHistorial(response.data.results);
+      setNextUrl(response.data.next);
     } catch (err) {
       console.error(err);
       setError("Error de conexión al cargar auditoría.");
@@ -30,11 +33,24 @@ function Auditoria() {
     fetchHistorial(); 
   }, [fetchHistorial]); // Ahora sí podemos incluirla en el array
 
-  const getTipoCambio = (tipo) => {
-      switch(tipo) {
-          case '+': return <Badge bg="success">Creación</Badge>;
-          case '~': return <Badge bg="warning" text="dark">Ajuste</Badge>;
-          case '-': return <Badge bg="danger">Borrado</Badge>;
+  const cargarMas = async () => {
+    if (!nextUrl) return;
+    try {
+      setLoadingMore(true);
+      const response = await auth.axiosApi.get(nextUrl);
+      setHistorial(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (err) { alert("Error al cargar más movimientos."); }
+    finally { setLoadingMore(false); }
+  };
+
+  const getMotivo = (motivo) => {
+      switch(motivo) {
+          case 'VENTA': return <Badge bg="primary">Venta</Badge>;
+          case 'AJUSTE': return <Badge bg="warning" text="dark">Ajuste</Badge>;
+          case 'TRASLADO': return <Badge bg="info">Traslado</Badge>;
+          case 'DEVOLUCION': return <Badge bg="success">Devolución</Badge>;
+          case 'IMPORTACION': return <Badge bg="secondary">Importación</Badge>;
           default: return <Badge bg="secondary">?</Badge>;
       }
   };
@@ -50,7 +66,7 @@ function Auditoria() {
       <div className="d-flex justify-content-between align-items-center mb-4 flex-wrap gap-3">
         <div>
             <h2 className="mb-1 d-flex align-items-center gap-2"><FileText size={28}/> Auditoría</h2>
-            <p className="text-muted mb-0 small">Últimos 50 movimientos de stock.</p>
+            <p className="text-muted mb-0 small">Kardex: movimientos de stock, del más reciente al más antiguo.</p>
         </div>
         
         <div className="d-flex gap-2">
@@ -79,17 +95,18 @@ function Auditoria() {
               <th>Acción</th>
               <th>Producto</th>
               <th>Sucursal</th>
+              <th className="text-end">Movimiento</th>
               <th className="text-end">Stock</th>
             </tr>
           </thead>
           <tbody>
             {loading ? (
-                <tr><td colSpan="6" className="text-center py-5"><Spinner animation="border" variant="primary" /></td></tr>
+                <tr><td colSpan="7" className="text-center py-5"><Spinner animation="border" variant="primary" /></td></tr>
             ) : registrosFiltrados.length === 0 ? (
-                <tr><td colSpan="6" className="text-center py-4 text-muted">Sin resultados.</td></tr>
+                <tr><td colSpan="7" className="text-center py-4 text-muted">Sin resultados.</td></tr>
             ) : (
                 registrosFiltrados.map((item) => (
-                <tr key={item.history_id}>
+                <tr key={item.id}>
                     <td className="text-nowrap small text-muted">{item.fecha}</td>
                     <td>
                         <div className="d-flex align-items-center gap-2">
@@ -97,11 +114,14 @@ function Auditoria() {
                             <span className="fw-bold small">{item.usuario}</span>
                         </div>
                     </td>
-                    <td>{getTipoCambio(item.history_type)}</td>
+                    <td>{getMotivo(item.motivo)}{item.pedido && <span className="small text-muted ms-1">#{item.pedido}</span>}</td>
                     <td><span className="fw-bold text-dark">{item.producto_nombre}</span></td>
                     <td className="small text-muted"><MapPin size={12} className="me-1"/>{item.sucursal_nombre}</td>
+                    <td className={`text-end fw-bold ${item.delta < 0 ? 'text-danger' : 'text-success'}`}>
+                        {item.delta > 0 ? `+${item.delta}` : item.delta}
+                    </td>
                     <td className="text-end">
-                        <Badge bg="info" className="px-3">{item.cantidad}</Badge>
+                        <Badge bg="info" className="px-3">{item.cantidad_resultante}</Badge>
                     </td>
                 </tr>
                 ))
@@ -109,6 +129,14 @@ function Auditoria() {
           </tbody>
         </Table>
       </div>
+
+      {nextUrl && (
+        <div className="text-center mt-3">
+          <Button variant="outline-secondary" onClick={cargarMas} disabled={loadingMore}>
+            {loadingMore ? <Spinner animation="border" size="sm" /> : 'Cargar más'}
+          </Button>
+        </div>
+      )}
       
       <style>{`
         .spin-anim { animation: spin 1s linear infinite; }
@@ -1,10 +1,14 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { Table, Button, Modal, Form, Row, Col, Badge, InputGroup, Alert, Spinner } from 'react-bootstrap';
-import { Users, Plus, Edit2, Search, CreditCard, Phone, MapPin, Fingerprint, Trash2, DollarSign } from 'lucide-react';
+import { Users, Plus, Edit2, Search, CreditCard, Phone, MapPin, Fingerprint, Trash2, DollarSign, FileText } from 'lucide-react';
+
+// Clave por operación: si la red se corta, el reintento reusa la misma y el servidor no duplica la venta/abono
+const nuevaClaveIdempotencia = () => (window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
 
 function ClientesPage() {
   const auth = useAuth();
+  const claveAbono = useRef(null);
   const [clientes, setClientes] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filtro, setFiltro] = useState('');
@@ -27,7 +31,7 @@ function ClientesPage() {
   const fetchClientes = useCallback(async () => {
     try {
       setLoading(true);
-      const res = await auth.axiosApi.get('/clientes/');
+      const res = await auth.axiosApi.get('/clientes/?todos=true');
       setClientes(res.data);
     } catch(e) { console.error(e); } 
     finally { setLoading(false); }
@@ -39,9 +43,20 @@ function ClientesPage() {
   const handleOpenAbono = (cliente) => {
       setSelectedCliente(cliente);
       setMontoAbono('');
+      claveAbono.current = nuevaClaveIdempotencia();
       setShowAbonoModal(true);
   };
 
+  const verEstadoCuenta = async (id) => {
+      try {
+          const response = await auth.axiosApi.get(`/clientes/${id}/estado-cuenta/`, { responseType: 'blob' });
+          const url = window.URL.createObjectURL(new Blob([response.data], { type: 'application/pdf' }));
+          window.open(url, '_blank');
+      } catch (error) {
+          alert("No se pudo generar el estado de cuenta.");
+      }
+  };
+
   const procesarAbono = async () => {
       if (!montoAbono || parseFloat(montoAbono) <= 0) {
           alert("Ingrese un monto válido."); return;
@@ -50,7 +65,7 @@ function ClientesPage() {
           const res = await auth.axiosApi.post('/registrar-abono/', {
               cliente_id: selectedCliente.id,
               monto: parseFloat(montoAbono)
-          });
+          }, { headers: { 'Idempotency-Key': claveAbono.current } });
           
           alert(`¡Pago Exitoso!\nSe aplicaron: C$ ${res.data.monto_applied || res.data.monto_aplicado}\nCambio: C$ ${res.data.cambio_devuelto || 0}`);
           setShowAbonoModal(false);
@@ -189,6 +204,7 @@ function ClientesPage() {
                             <DollarSign size={16}/>
                         </Button>
                     )}
+                    <Button size="sm" variant="outline-secondary" className="me-2" onClick={() => verEstadoCuenta(c.id)} title="Estado de Cuenta"><FileText size={16}/></Button>
                     <Button size="sm" variant="outline-primary" className="me-2" onClick={() => openModal(c)}><Edit2 size={16}/></Button>
                     <Button size="sm" variant="outline-danger" onClick={() => handleDelete(c.id)}><Trash2 size={16}/></Button>
                 </td>
@@ -1,12 +1,16 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { 
   Row, Col, Card, Form, Table, Button, Alert, Offcanvas, Navbar, Container, Modal, InputGroup, Badge, Spinner 
 } from 'react-bootstrap';
 import { Plus, Minus, Trash2, Printer, ShoppingCart, CreditCard, Banknote, User, CheckCircle, AlertTriangle, FileText } from 'lucide-react';
 
+// Clave por operación: si la red se corta, el reintento reusa la misma y el servidor no duplica la venta/abono
+const nuevaClaveIdempotencia = () => (window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+
 function Facturacion() {
   const auth = useAuth();
+  const claveVenta = useRef(null);
   const [productos, setProductos] = useState([]); 
   const [clientes, setClientes] = useState([]); 
   const [clienteSeleccionado, setClienteSeleccionado] = useState(null); 
@@ -35,9 +39,9 @@ function Facturacion() {
       try {
         setLoading(true);
         const [resProd, resSuc, resCli] = await Promise.all([
-             auth.axiosApi.get('/productos/'),
+             auth.axiosApi.get('/productos/?todos=true'),
              auth.axiosApi.get('/sucursales/'),
-             auth.axiosApi.get('/clientes/') 
+             auth.axiosApi.get('/clientes/?todos=true') 
         ]);
         setProductos(resProd.data || []);
         setClientes(resCli.data || []);
@@ -114,6 +118,7 @@ function Facturacion() {
   const iniciarCobro = () => {
       if (carrito.length === 0) return;
       if (!sucursalId) { setErrorMsg("Error: Sin sucursal."); return; }
+      claveVenta.current = nuevaClaveIdempotencia();
       setMontoRecibido(''); setMetodoPago('EFECTIVO'); setShowPaymentModal(true);
   };
 
@@ -141,20 +146,23 @@ function Facturacion() {
         monto_recibido: montoEnviar
       };
 
-      const res = await auth.axiosApi.post('/venta-mostrador/', payload, { timeout: 15000 });
+      const res = await auth.axiosApi.post('/venta-mostrador/', payload, {
+        timeout: 15000, headers: { 'Idempotency-Key': claveVenta.current }
+      });
       const nuevoPedidoId = res.data.pedido_id;
       setLastPedidoId(nuevoPedidoId);
       
-      const resCli = await auth.axiosApi.get('/clientes/');
+      const resCli = await auth.axiosApi.get('/clientes/?todos=true');
       setClientes(resCli.data);
       
+      claveVenta.current = null;
       setSuccessMsg(`¡Venta #${nuevoPedidoId} registrada!`);
       setCarrito([]); setSearchTerm(''); setClienteSeleccionado(null);
       setShowPaymentModal(false);
 
     } catch (err) {
       console.error(err);
-      if (err.code === 'ECONNABORTED') setErrorMsg("La venta tardó mucho. Revisa 'Gestión de Ventas'.");
+      if (err.code === 'ECONNABORTED') setErrorMsg("La venta tardó mucho. Puede reintentar: no se duplicará.");
       else setErrorMsg("Error: " + (err.response?.data?.error || "Error al procesar venta."));
     } finally { setProcessing(false); }
   };
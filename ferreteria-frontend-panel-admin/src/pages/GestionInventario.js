@@ -20,8 +20,8 @@ function GestionInventario() {
         setLoading(true);
         // Hacemos las peticiones en paralelo
         const [invRes, prodRes, sucRes] = await Promise.all([
-          auth.axiosApi.get('/inventario/'),
-          auth.axiosApi.get('/productos/'),
+          auth.axiosApi.get('/inventario/?todos=true'),
+          auth.axiosApi.get('/productos/?todos=true'),
           auth.axiosApi.get('/sucursales/')
         ]);
         setInventarios(invRes.data);
@@ -5,6 +5,8 @@ import { Printer, Save, Edit2 } from 'lucide-react';
 
 function GestionPedidos() {
   const [pedidos, setPedidos] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   
@@ -19,8 +21,10 @@ function GestionPedidos() {
   const fetchPedidos = useCallback(async () => {
     try {
       setLoading(true);
+      // Paginado por cursor: la primera página llega rápido, el resto bajo demanda
       const response = await auth.axiosApi.get('/gestion-pedidos/');
-      setPedidos(response.data);
+      setPedidos(response.data.results);
+      setNextUrl(response.data.next);
       setLoading(false);
     } catch (err) { 
       setError("No se pudieron cargar las ventas."); 
@@ -30,6 +34,17 @@ function GestionPedidos() {
 
   useEffect(() => { fetchPedidos(); }, [fetchPedidos]);
 
+  const cargarMas = async () => {
+    if (!nextUrl) return;
+    try {
+      setLoadingMore(true);
+      const response = await auth.axiosApi.get(nextUrl);
+      setPedidos(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (err) { alert("Error al cargar más ventas."); }
+    finally { setLoadingMore(false); }
+  };
+
   const handleEstadoChange = async (pedidoId, nuevoEstado) => {
     try {
       await auth.axiosApi.patch(`/gestion-pedidos/${pedidoId}/`, { estado: nuevoEstado });
@@ -154,6 +169,14 @@ function GestionPedidos() {
         </Table>
       </div>
 
+      {nextUrl && (
+        <div className="text-center mt-3">
+          <Button variant="outline-secondary" onClick={cargarMas} disabled={loadingMore}>
+            {loadingMore ? <Spinner animation="border" size="sm" /> : 'Cargar más'}
+          </Button>
+        </div>
+      )}
+
       <Modal show={showModal} onHide={() => setShowModal(false)} size="lg">
         <Modal.Header closeButton>
             <Modal.Title>
@@ -32,7 +32,7 @@ function GestionProductos() {
     try {
       setLoading(true);
       const [prodRes, catRes] = await Promise.all([
-        auth.axiosApi.get('/productos/'),
+        auth.axiosApi.get('/productos/?todos=true'),
         auth.axiosApi.get('/categorias/')
       ]);
       setProductos(prodRes.data);
@@ -50,7 +50,7 @@ useEffect(() => {
       setLoading(true);
       try {
         const [productosRes, categoriasRes] = await Promise.all([
-            auth.axiosApi.get('/productos/'),
+            auth.axiosApi.get('/productos/?todos=true'),
             auth.axiosApi.get('/categorias/')
         ]);
 
@@ -23,7 +23,7 @@ function GestionUsuarios() {
         try {
           setLoading(true);
           const [usersRes, sucRes] = await Promise.all([
-            auth.axiosApi.get('/gestion-usuarios/'),
+            auth.axiosApi.get('/gestion-usuarios/?todos=true'),
             auth.axiosApi.get('/sucursales/')
           ]);
           setUsuarios(usersRes.data);
@@ -40,7 +40,7 @@ function GestionUsuarios() {
 
   const reloadData = async () => {
       try {
-        const usersRes = await auth.axiosApi.get('/gestion-usuarios/');
+        const usersRes = await auth.axiosApi.get('/gestion-usuarios/?todos=true');
         setUsuarios(usersRes.data);
       } catch(e) { console.error(e); }
   };
@@ -1,9 +1,8 @@
-import React, { createContext, useState, useContext, useEffect } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
 import { useAuth } from './AuthContext';
 
-const SYNC_URL = 'http://127.0.0.1:8000/api/carrito/sincronizar/';
-const CART_API_URL = 'http://127.0.0.1:8000/api/carrito/';
+const SYNC_URL = 'http://127.0.0.1:8000/api/carrito/sync/';
 
 const CartContext = createContext();
 
@@ -11,136 +10,111 @@ export function useCart() {
   return useContext(CartContext);
 }
 
+// Respuesta de carrito/sync (mismo formato que carrito/resumen) -> ítems del contexto
+const desdeResumen = (data) => data.items.map(item => ({
+  id: item.producto_id,
+  nombre: item.nombre,
+  precio: item.precio,
+  imagen: item.imagen,
+  stock_disponible: item.stock_disponible,
+  cantidad: item.cantidad,
+  db_id: item.id
+}));
+
 export function CartProvider({ children }) {
   const [cartItems, setCartItems] = useState([]);
-  const [cartLoading, setCartLoading] = useState(true); // <-- NUEVO ESTADO
+  const [cartLoading, setCartLoading] = useState(true);
   const { authToken } = useAuth();
+  const pendiente = useRef(false); // hay cambios locales sin guardar en el servidor
+
+  const guardar = useCallback((items, modo) => axios.post(SYNC_URL, {
+    modo,
+    items: items.map(i => ({ id: i.id, cantidad: i.cantidad }))
+  }, { headers: { Authorization: `Bearer ${authToken}` } }), [authToken]);
 
   // Cargar Carrito
   useEffect(() => {
     const loadCart = async () => {
-      setCartLoading(true); // Empezamos a cargar
-      
+      setCartLoading(true);
+      const localCart = JSON.parse(localStorage.getItem('cartItems')) || [];
+
       if (authToken) {
-        // Lógica Usuario Logueado
-        const localCart = JSON.parse(localStorage.getItem('cartItems')) || [];
+        // Usuario logueado: el carrito de invitado se combina con el del servidor en una sola llamada
         try {
-          const res = await axios.post(SYNC_URL, { items: localCart }, {
-            headers: { Authorization: `Bearer ${authToken}` }
-          });
-          
-          const serverCart = res.data.map(item => ({
-            id: item.producto_id,
-            nombre: item.producto_detalle.nombre,
-            precio: item.producto_detalle.precio,
-            imagen: item.producto_detalle.imagen,
-            stock_disponible: item.producto_detalle.stock_disponible,
-            cantidad: item.cantidad,
-            db_id: item.id 
-          }));
-          
-          setCartItems(serverCart);
+          const res = await guardar(localCart, 'combinar');
+          setCartItems(desdeResumen(res.data));
           localStorage.removeItem('cartItems');
         } catch (err) {
           console.error("Error sync", err);
         }
       } else {
-        // Lógica Invitado
-        const localCart = JSON.parse(localStorage.getItem('cartItems')) || [];
         setCartItems(localCart);
       }
-      
-      setCartLoading(false); // ¡Terminamos de cargar!
+      setCartLoading(false);
     };
-    
     loadCart();
-  }, [authToken]);
+  }, [authToken, guardar]);
 
-  // Guardar en LocalStorage (Solo si no hay usuario)
+  // Guardar: invitado en LocalStorage; logueado, el carrito completo en UNA petición (con debounce)
   useEffect(() => {
-    if (!authToken && !cartLoading) { // Solo guardar si ya cargó
+    if (cartLoading) return;
+    if (!authToken) {
       localStorage.setItem('cartItems', JSON.stringify(cartItems));
+      return;
     }
-  }, [cartItems, authToken, cartLoading]);
+    if (!pendiente.current) return;
+    const t = setTimeout(() => {
+      pendiente.current = false;
+      guardar(cartItems, 'reemplazar').catch(console.error);
+    }, 400);
+    return () => clearTimeout(t);
+  }, [cartItems, authToken, cartLoading, guardar]);
+
+  const actualizar = (fn) => {
+    pendiente.current = true;
+    setCartItems(fn);
+  };
 
-  // --- ACCIONES (Optimizadas) ---
+  // --- ACCIONES ---
 
-  const addToCart = async (producto) => {
-    setCartItems(prev => {
-      const newCart = [...prev];
-      const idx = newCart.findIndex(i => i.id === producto.id);
-      
-      // Validación Stock
-      const currentQty = idx > -1 ? newCart[idx].cantidad : 0;
+  const addToCart = (producto) => {
+    actualizar(prev => {
+      const idx = prev.findIndex(i => i.id === producto.id);
+      const currentQty = idx > -1 ? prev[idx].cantidad : 0;
       if (producto.stock_disponible && currentQty + 1 > producto.stock_disponible) {
          alert(`¡Solo quedan ${producto.stock_disponible} unidades!`);
          return prev;
       }
-
-      if (idx > -1) {
-        newCart[idx] = { ...newCart[idx], cantidad: newCart[idx].cantidad + 1 };
-      } else {
-        newCart.push({ ...producto, cantidad: 1 });
-      }
-      
-      // Sincronización en segundo plano
-      if (authToken) {
-          const itemToSend = idx > -1 ? newCart[idx] : newCart[newCart.length - 1];
-          axios.post(SYNC_URL, { items: [{ id: producto.id, cantidad: itemToSend.cantidad }] }, {
-             headers: { Authorization: `Bearer ${authToken}` }
-          }).catch(console.error);
-      }
-      
-      return newCart;
+      if (idx > -1) return prev.map((item, i) => i === idx ? { ...item, cantidad: item.cantidad + 1 } : item);
+      return [...prev, { ...producto, cantidad: 1 }];
     });
   };
 
-  const decrementItem = async (producto) => {
-    setCartItems(prev => {
-      const newCart = [...prev];
-      const idx = newCart.findIndex(i => i.id === producto.id);
-      
-      if (idx > -1) {
-        if (newCart[idx].cantidad > 1) {
-          newCart[idx] = { ...newCart[idx], cantidad: newCart[idx].cantidad - 1 };
-          
-          // Sync update
-          if (authToken) {
-              axios.post(SYNC_URL, { items: [{ id: producto.id, cantidad: newCart[idx].cantidad }] }, { 
-                  headers: { Authorization: `Bearer ${authToken}` } 
-              }).catch(console.error);
-          }
-        } else {
-          newCart.splice(idx, 1);
-          
-          // Sync delete
-          if (authToken && producto.db_id) {
-              axios.delete(`${CART_API_URL}${producto.db_id}/`, { 
-                  headers: { Authorization: `Bearer ${authToken}` } 
-              }).catch(console.error);
-          }
-        }
-      }
-      return newCart;
-    });
+  const decrementItem = (producto) => {
+    actualizar(prev => prev
+      .map(i => i.id === producto.id ? { ...i, cantidad: i.cantidad - 1 } : i)
+      .filter(i => i.cantidad > 0));
   };
 
-  const removeItem = async (producto) => {
-    setCartItems(prev => prev.filter(i => i.id !== producto.id));
-    if (authToken && producto.db_id) {
-        axios.delete(`${CART_API_URL}${producto.db_id}/`, {
-            headers: { Authorization: `Bearer ${authToken}` }
-        }).catch(console.error);
-    }
+  const removeItem = (producto) => {
+    actualizar(prev => prev.filter(i => i.id !== producto.id));
+  };
+
+  // Guarda ya lo pendiente (p.ej. antes del checkout, que lee el carrito del servidor)
+  const sincronizarCarrito = async () => {
+    if (!authToken || !pendiente.current) return;
+    pendiente.current = false;
+    await guardar(cartItems, 'reemplazar');
   };
 
+  // Después del checkout el servidor ya vació su carrito; solo se limpia el estado local
   const clearCart = () => {
+    pendiente.current = false;
     setCartItems([]);
     localStorage.removeItem('cartItems');
   };
 
-  // Exportamos también 'cartLoading'
-  const value = { cartItems, addToCart, decrementItem, removeItem, clearCart, cartLoading };
+  const value = { cartItems, addToCart, decrementItem, removeItem, clearCart, sincronizarCarrito, cartLoading };
 
   return <CartContext.Provider value={value}>{children}</CartContext.Provider>;
-}
\ No newline at end of file
+}
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { useCart } from '../context/CartContext';
@@ -12,7 +12,7 @@ const API_BASE = 'http://127.0.0.1:8000/api';
 
 function CartPage() {
   // Obtenemos cartLoading del contexto
-  const { cartItems, addToCart, decrementItem, removeItem, clearCart, cartLoading } = useCart();
+  const { cartItems, addToCart, decrementItem, removeItem, clearCart, sincronizarCarrito, cartLoading } = useCart();
   const auth = useAuth();
   const navigate = useNavigate();
   
@@ -23,6 +23,7 @@ function CartPage() {
   const [selectedBranchId, setSelectedBranchId] = useState("");
   const [showAddressForm, setShowAddressForm] = useState(false);
   const [cupon, setCupon] = useState('');
+  const pedidoReservado = useRef(null);
 
   const subtotal = cartItems.reduce((acc, item) => acc + (item.cantidad * item.precio), 0);
   const iva = subtotal * 0.15;
@@ -49,8 +50,22 @@ function CartPage() {
     setShowAddressForm(false);
   };
 
-  const createOrder = (data, actions) => {
-    return actions.order.create({ purchase_units: [{ description: "Compra Ferretería", amount: { value: total.toFixed(2), currency_code: "USD" } }] });
+  // 1) Antes de abrir PayPal se reserva el stock y el servidor calcula el total del pedido
+  const createOrder = async (data, actions) => {
+    setError(null);
+    if (!auth.authToken) { navigate('/login'); throw new Error('Sin sesión'); }
+    try {
+      await sincronizarCarrito();
+      const res = await axios.post(`${API_BASE}/checkout/`, {
+        sucursal_id: selectedBranchId,
+        direccion_id: selectedAddressId
+      }, { headers: { Authorization: `Bearer ${auth.authToken}` } });
+      pedidoReservado.current = res.data.pedido_id;
+      return actions.order.create({ purchase_units: [{ description: `Pedido #${res.data.pedido_id}`, amount: { value: parseFloat(res.data.total).toFixed(2), currency_code: "USD" } }] });
+    } catch (err) {
+      setError(err.response?.data?.error || "No se pudo reservar el stock.");
+      throw err;
+    }
   };
 
   const onApprove = (data, actions) => {
@@ -59,19 +74,10 @@ function CartPage() {
     }).catch(err => setError("Error procesando pago."));
   };
 
+  // 2) Pago aprobado: se confirma el pedido reservado
   const handleBackendCheckout = async (transactionId) => {
-    setError(null);
-    if (!auth.authToken) return navigate('/login');
-    
-    const payload = {
-      sucursal_id: selectedBranchId,
-      direccion_id: selectedAddressId,
-      items: cartItems.map(item => ({ producto_id: item.id, cantidad: item.cantidad })),
-      transaction_id: transactionId
-    };
-
     try {
-      await axios.post(`${API_BASE}/checkout/`, payload, {
+      await axios.post(`${API_BASE}/checkout/${pedidoReservado.current}/confirmar/`, { transaction_id: transactionId }, {
         headers: { Authorization: `Bearer ${auth.authToken}` }
       });
       alert('¡Compra registrada con éxito!');
@@ -18,7 +18,7 @@ function CategoryPage() {
   const cart = useCart();
   
   const { id_categoria } = useParams(); 
-  const API_URL = `http://127.0.0.1:8000/api/productos/?categoria=${id_categoria}`;
+  const API_URL = `http://127.0.0.1:8000/api/productos/?categoria=${id_categoria}&todos=true`;
 
   useEffect(() => {
     setProductos([]); 
@@ -53,7 +53,7 @@ function CategoryPage() {
               <Card className="h-100">
                 <Card.Img 
                   variant="top" 
-                  src={producto.imagen || "https://via.placeholder.com/300x200.png?text=Sin+Imagen"} 
+                  src={producto.imagen_mediana || producto.imagen || "https://via.placeholder.com/300x200.png?text=Sin+Imagen"} 
                   alt={producto.nombre} 
                   style={{ height: '200px', objectFit: 'cover' }}
                 />
@@ -58,7 +58,7 @@ function Historial() {
                   <ListGroup variant="flush" className="mb-3">
                     {pedido.detalles.map((d, i) => (
                       <ListGroup.Item key={i} className="d-flex justify-content-between px-0">
-                        <span>{d.producto.nombre} (x{d.cantidad})</span>
+                        <span>{d.producto_nombre} (x{d.cantidad})</span>
                         <span>${d.precio_unitario}</span>
                       </ListGroup.Item>
                     ))}
@@ -7,7 +7,7 @@ import CategoryList from '../components/CategoryList';
 import SEO from '../components/SEO';
 import { ShoppingBag } from 'lucide-react';
 
-const API_URL = 'http://127.0.0.1:8000/api/productos/';
+const API_URL = 'http://127.0.0.1:8000/api/productos/?todos=true';
 
 function Inicio() {
   const [productos, setProductos] = useState([]);
@@ -145,7 +145,7 @@ function Inicio() {
                   <div style={{height: '220px', overflow: 'hidden', position: 'relative', backgroundColor: '#fff'}}>
                      <Link to={`/productos/${prod.id}`}>
                         <img 
-                            src={prod.imagen || "https://via.placeholder.com/400?text=Producto"} 
+                            src={prod.imagen_mediana || prod.imagen || "https://via.placeholder.com/400?text=Producto"} 
                             alt={prod.nombre}
                             loading="lazy" /* 3. LAZY LOADING (Ahorra datos) */
                             style={{width: '100%', height: '100%', objectFit: 'contain', padding: '10px'}}
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from . import models
+from .movimientos import registrar_cambios
 
 # Le decimos a Django que registre todos nuestros modelos
 # para que aparezcan en el panel de administrador.
@@ -8,6 +9,21 @@ admin.site.register(models.Usuario)
 admin.site.register(models.Sucursal)
 admin.site.register(models.Categoria)
 admin.site.register(models.Producto)
-admin.site.register(models.Inventario)
+
+@admin.register(models.Inventario)
+class InventarioAdmin(admin.ModelAdmin):
+    # El kardex registra quién ajustó el stock desde el admin
+    def save_model(self, request, obj, form, change):
+        obj._usuario_movimiento = request.user
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, models.Inventario.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        registrar_cambios([(pid, sid, cant, 0) for pid, sid, cant in queryset.values_list('producto_id', 'sucursal_id', 'cantidad')],
+                          usuario=request.user)
+        super().delete_queryset(request, queryset)
+
 admin.site.register(models.Pedido)
 admin.site.register(models.DetallePedido)
\ No newline at end of file
@@ -5,6 +5,5 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
-
-def ready(self):
-        import api.signals
\ No newline at end of file
+    def ready(self):
+        import api.signals
@@ -0,0 +1,183 @@
+"""
+Benchmark de los endpoints más usados (comando `benchmark`).
+
+construir_datos() llena una base vacía con un volumen proporcional a la
+escala (productos, sucursales, clientes, pedidos) usando bulk_create. Cada
+escenario se mide con un solo cliente y con varios hilos a la vez: latencia
+p50/p95/p99 en ms y consultas SQL por petición. comparar() contrasta el
+resultado con una línea base guardada y devuelve las regresiones.
+"""
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cartera import conciliar
+from .resumen_ventas import reconstruir
+from .models import Categoria, Cliente, DetallePedido, Inventario, Pedido, Producto, Sucursal, Usuario
+
+IVA = Decimal('1.15')
+
+
+def construir_datos(escala=1, semilla=42):
+    """Crea los datos del benchmark y devuelve el contexto que usan los escenarios."""
+    rnd = random.Random(semilla)
+    Sucursal.objects.bulk_create([Sucursal(nombre=f'Sucursal {i}', direccion='') for i in range(1, 4)])
+    sucursales = list(Sucursal.objects.order_by('id'))
+    admin = Usuario.objects.create_superuser('bench_admin', 'bench@ferreteria.local', 'bench', sucursal=sucursales[0], rol='ADMIN')
+    Usuario.objects.bulk_create([Usuario(username=f'vendedor{i}', sucursal=sucursales[i % 3], is_staff=True) for i in range(5)])
+    vendedores = list(Usuario.objects.filter(username__startswith='vendedor').values_list('id', flat=True)) + [admin.id]
+
+    Categoria.objects.bulk_create([Categoria(nombre=f'Categoría {i}') for i in range(10)])
+    categorias = list(Categoria.objects.values_list('id', flat=True))
+    Producto.objects.bulk_create([
+        Producto(sku=f'BENCH-{i:06d}', nombre=f'Producto {i:06d}', precio=Decimal(rnd.randint(100, 50000)) / 100,
+                 categoria_id=rnd.choice(categorias))
+        for i in range(200 * escala)
+    ], batch_size=500)
+    precios = dict(Producto.objects.values_list('id', 'precio'))
+    productos = list(precios)
+    # Stock holgado: las ventas del benchmark nunca se quedan sin existencias
+    Inventario.objects.bulk_create([Inventario(producto_id=pid, sucursal=s, cantidad=10 ** 6)
+                                    for s in sucursales for pid in productos], batch_size=1000)
+
+    Cliente.objects.bulk_create([
+        Cliente(nombre=f'Cliente {i:05d}', ruc=f'{i:08d}', limite_credito=Decimal('100000'), dias_credito=rnd.choice([0, 15, 30]))
+        for i in range(100 * escala)
+    ], batch_size=500)
+    clientes = list(Cliente.objects.values_list('id', 'dias_credito'))
+
+    ahora, pedidos, lineas = timezone.now(), [], []
+    for i in range(500 * escala):
+        cliente_id, dias = rnd.choice(clientes)
+        metodo = rnd.choice(['EFECTIVO', 'TARJETA', 'CREDITO'])
+        items = {pid: rnd.randint(1, 5) for pid in rnd.sample(productos, 3)}
+        total = (sum(precios[pid] * cant for pid, cant in items.items()) * IVA).quantize(Decimal('0.01'))
+        fecha = ahora - timedelta(days=rnd.randint(0, 120))
+        pedidos.append(Pedido(
+            cliente_id=cliente_id, sucursal=rnd.choice(sucursales), vendedor_id=rnd.choice(vendedores), metodo_pago=metodo,
+            estado=Pedido.EstadoPedido.PENDIENTE if metodo == 'CREDITO' else Pedido.EstadoPedido.PAGADO,
+            total=total, monto_recibido=Decimal('0') if metodo == 'CREDITO' else total,
+            fecha_vencimiento=(fecha + timedelta(days=dias)).date() if dias else None,
+        ))
+        lineas.append((fecha, items))
+    Pedido.objects.bulk_create(pedidos, batch_size=500)
+    ids = list(Pedido.objects.order_by('id').values_list('id', flat=True))
+    DetallePedido.objects.bulk_create([
+        DetallePedido(pedido_id=pk, producto_id=pid, cantidad=cant, precio_unitario=precios[pid])
+        for pk, (_, items) in zip(ids, lineas) for pid, cant in items.items()
+    ], batch_size=1000)
+    # auto_now_add pisa la fecha: se reparte después en un UPDATE por día
+    por_dia = {}
+    for pk, (fecha, _) in zip(ids, lineas): por_dia.setdefault(fecha, []).append(pk)
+    for fecha, pks in por_dia.items(): Pedido.objects.filter(id__in=pks).update(fecha_pedido=fecha)
+
+    conciliar(corregir=True)  # saldo_pendiente de los pedidos a crédito insertados en bloque
+    reconstruir()  # y el resumen diario de ventas
+    deudores = list(Pedido.objects.filter(estado=Pedido.EstadoPedido.PENDIENTE).values_list('cliente_id', flat=True).distinct())
+    return {
+        'admin': admin, 'productos': productos, 'pedidos': ids, 'deudores': deudores,
+        'conteos': {'sucursales': len(sucursales), 'productos': len(productos), 'clientes': len(clientes),
+                    'pedidos': len(ids), 'detalles': DetallePedido.objects.count()},
+    }
+
+
+# (nombre, método, función que arma (url, datos) con el contexto y un random propio)
+ESCENARIOS = [
+    ('productos', 'get', lambda ctx, rnd: ('/api/productos/', None)),
+    ('venta-mostrador', 'post', lambda ctx, rnd: ('/api/venta-mostrador/', {
+        'metodo_pago': 'EFECTIVO', 'items': [{'id': pid, 'cantidad': 1} for pid in rnd.sample(ctx['productos'], 3)]})),
+    ('registrar-abono', 'post', lambda ctx, rnd: ('/api/registrar-abono/', {
+        'cliente_id': rnd.choice(ctx['deudores']), 'monto': '0.50'})),
+    ('gestion-pedidos', 'get', lambda ctx, rnd: ('/api/gestion-pedidos/', None)),
+    ('clientes', 'get', lambda ctx, rnd: ('/api/clientes/', None)),
+    ('reporte-vendedores', 'get', lambda ctx, rnd: ('/api/reporte-vendedores/', None)),
+    ('reporte-ventas', 'get', lambda ctx, rnd: ('/api/reporte-ventas/', None)),
+    ('corte-caja', 'get', lambda ctx, rnd: ('/api/corte-caja/', None)),
+    ('factura', 'get', lambda ctx, rnd: (f"/api/factura/{rnd.choice(ctx['pedidos'])}/", None)),
+]
+
+
+def _percentil(valores, p):
+    if len(valores) == 1: return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def _correr(ctx, metodo, armar, peticiones, semilla):
+    """Hace `peticiones` llamadas con un cliente propio; devuelve [(ms, consultas, status)]."""
+    rnd = random.Random(semilla)
+    cliente = APIClient()
+    cliente.force_authenticate(ctx['admin'])
+    muestras = []
+    try:
+        for _ in range(peticiones):
+            url, datos = armar(ctx, rnd)
+            connection.queries_log.clear()  # el registro tiene tope (9000): se cuenta petición por petición
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = getattr(cliente, metodo)(url, datos, format='json') if datos else getattr(cliente, metodo)(url)
+                ms = (time.perf_counter() - inicio) * 1000
+            muestras.append((ms, len(consultas), respuesta.status_code))
+    finally:
+        connections.close_all()  # cada hilo cierra su conexión
+    return muestras
+
+
+def medir(ctx, metodo, armar, hilos=1, peticiones=50, calentamiento=3):
+    if calentamiento: _correr(ctx, metodo, armar, calentamiento, semilla=0)
+    por_hilo = max(1, peticiones // hilos)
+    resultados = [None] * hilos
+
+    def trabajador(i): resultados[i] = _correr(ctx, metodo, armar, por_hilo, semilla=i + 1)
+
+    inicio = time.perf_counter()
+    if hilos == 1:
+        trabajador(0)
+    else:
+        trabajadores = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        for t in trabajadores: t.start()
+        for t in trabajadores: t.join()
+    duracion = time.perf_counter() - inicio
+
+    muestras = [m for r in resultados for m in (r or [])]
+    tiempos = [ms for ms, _, _ in muestras]
+    consultas = [n for _, n, _ in muestras]
+    return {
+        'hilos': hilos,
+        'peticiones': len(muestras),
+        'errores': sum(not 200 <= status < 300 for _, _, status in muestras),
+        'p50_ms': round(_percentil(tiempos, 50), 2),
+        'p95_ms': round(_percentil(tiempos, 95), 2),
+        'p99_ms': round(_percentil(tiempos, 99), 2),
+        'consultas_p50': statistics.median(consultas),
+        'consultas_max': max(consultas),
+        'peticiones_seg': round(len(muestras) / duracion, 1),
+    }
+
+
+def comparar(resultados, base, tolerancia, holgura_ms=5):
+    """
+    Lista de regresiones frente a la línea base: cualquier error HTTP, más consultas
+    SQL que en la base (exacto) o latencia por encima de base * (1 + tolerancia) + holgura_ms
+    (la holgura absorbe el ruido de las mediciones de pocos milisegundos). Con varios
+    hilos solo se compara p50: el p95 ahí depende sobre todo del planificador y el GIL.
+    """
+    regresiones = []
+    for escenario, modos in resultados.items():
+        for modo, actual in modos.items():
+            if actual['errores']: regresiones.append(f"{escenario} [{modo}]: {actual['errores']} respuestas con error")
+            previo = base.get(escenario, {}).get(modo)
+            if not previo: continue
+            if actual['consultas_max'] > previo['consultas_max']:
+                regresiones.append(f"{escenario} [{modo}]: {actual['consultas_max']} consultas (base {previo['consultas_max']})")
+            for clave in ('p50_ms', 'p95_ms') if actual['hilos'] == 1 else ('p50_ms',):
+                if actual[clave] > previo[clave] * (1 + tolerancia) + holgura_ms:
+                    regresiones.append(f"{escenario} [{modo}]: {clave} {actual[clave]} (base {previo[clave]})")
+    return regresiones
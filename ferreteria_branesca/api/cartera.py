@@ -0,0 +1,218 @@
+"""
+Cartera de crédito: saldo pendiente por cliente.
+
+Cliente.saldo_pendiente es la suma de (total - monto_recibido) de sus pedidos
+PENDIENTE. Se mantiene en la misma transacción que la venta, el abono o la
+cancelación: los guardados de un Pedido pasan por las señales (api/signals.py)
+y las rutas masivas (ventas/lote, checkout web, abonos) llaman a ajustar_saldos().
+
+registrar_abono() guarda el pago (Abono) y lo reparte FIFO entre los pedidos
+pendientes: bloquea una vez al cliente y sus pendientes, calcula el reparto en
+memoria y lo aplica con un bulk_update, así el número de consultas no crece con
+la cantidad de facturas abiertas.
+Así el límite de crédito se valida con una sola lectura por pk y el comando
+`conciliar_saldos` compara el saldo guardado con los pedidos.
+
+actualizar_mora() guarda en Pedido.vencido / Pedido.mora el atraso al día con dos
+UPDATE por conjunto (uno marca, otro limpia); correrlo de nuevo no cambia nada.
+
+movimientos_cuenta() alimenta el estado de cuenta: facturas a crédito y abonos
+en una sola consulta (UNION) leída por bloques, con el saldo corrido.
+
+antiguedad_saldos() reparte la cartera por días de atraso en una sola
+consulta agrupada por cliente (sumas condicionales con fechas de corte
+calculadas en Python, sin funciones de fecha propias de cada motor).
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DateField, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from . import resumen_ventas
+from .history import historial_en_bloque
+from .models import Abono, AplicacionAbono, Cliente, Pedido
+
+LOTE_UPDATE = 500
+CERO = Decimal('0')
+
+
+class CreditoExcedido(Exception):
+    pass
+
+
+class ErrorAbono(Exception):
+    pass
+
+
+def _campo_saldo():
+    return DecimalField(max_digits=14, decimal_places=2)
+
+
+def ajustar_saldos(deltas):
+    """Suma {cliente_id: delta} a saldo_pendiente con UPDATE CASE por lotes (sin leer los clientes)."""
+    items = [(cid, delta) for cid, delta in deltas.items() if cid and delta]
+    for i in range(0, len(items), LOTE_UPDATE):
+        lote = items[i:i + LOTE_UPDATE]
+        Cliente.objects.filter(id__in=[cid for cid, _ in lote]).update(saldo_pendiente=Case(
+            *[When(id=cid, then=F('saldo_pendiente') + delta) for cid, delta in lote],
+            default=F('saldo_pendiente'), output_field=_campo_saldo()))
+
+
+def deudas_de(pedidos):
+    """{cliente_id: deuda} de un queryset de pedidos (una consulta agrupada)."""
+    return dict(pedidos.filter(estado=Pedido.EstadoPedido.PENDIENTE, cliente__isnull=False)
+                .values('cliente_id').annotate(deuda=Sum(F('total') - F('monto_recibido'), output_field=_campo_saldo()))
+                .values_list('cliente_id', 'deuda'))
+
+
+def verificar_credito(cliente_id, monto):
+    """
+    Bloquea la fila del cliente (lectura por pk) y rechaza la venta a crédito si supera
+    el límite. Dos ventas simultáneas al mismo cliente se validan una detrás de otra.
+    """
+    fila = Cliente.objects.select_for_update().filter(id=cliente_id).values_list('limite_credito', 'saldo_pendiente').first()
+    if fila is None: raise Cliente.DoesNotExist('Cliente no encontrado')
+    limite, saldo = fila
+    if limite <= 0: raise CreditoExcedido('El cliente no tiene crédito autorizado.')
+    if saldo + monto > limite:
+        raise CreditoExcedido(f'Límite de crédito excedido: disponible C$ {limite - saldo:.2f}, venta C$ {monto:.2f}.')
+
+
+def registrar_abono(cliente_id, monto, usuario=None):
+    """Guarda el abono y lo aplica FIFO (por fecha del pedido). Devuelve el Abono con .saldo_cliente."""
+    with transaction.atomic():
+        fila = Cliente.objects.select_for_update().filter(id=cliente_id).values_list('saldo_pendiente', flat=True)
+        if not fila: raise Cliente.DoesNotExist('Cliente no encontrado')
+        saldo = fila[0]
+        pendientes = list(Pedido.objects.select_for_update()
+                          .filter(cliente_id=cliente_id, estado=Pedido.EstadoPedido.PENDIENTE).order_by('fecha_pedido', 'id'))
+        if not pendientes: raise ErrorAbono('Este cliente no tiene deuda pendiente.')
+
+        antes = resumen_ventas.resumen_de_objetos(pendientes)
+        restante, aplicaciones, cambiados = monto, [], []
+        for pedido in pendientes:
+            if restante <= 0: break
+            deuda = pedido.total - pedido.monto_recibido
+            pago = min(deuda, restante)
+            if pago > 0:
+                pedido.monto_recibido += pago
+                restante -= pago
+                aplicaciones.append((pedido.id, pago))
+            if pedido.monto_recibido >= pedido.total:
+                pedido.estado, pedido.vencido, pedido.mora = Pedido.EstadoPedido.PAGADO, False, CERO
+            cambiados.append(pedido)
+
+        aplicado = monto - restante
+        Pedido.objects.bulk_update(cambiados, ['monto_recibido', 'estado', 'vencido', 'mora'], batch_size=300)
+        resumen_ventas.mover(antes, resumen_ventas.resumen_de_objetos(pendientes))
+        abono = Abono.objects.create(cliente_id=cliente_id, monto=monto, aplicado=aplicado, cambio=restante, usuario=usuario)
+        AplicacionAbono.objects.bulk_create([AplicacionAbono(abono=abono, pedido_id=pid, monto=pago) for pid, pago in aplicaciones])
+        historial_en_bloque(cambiados, usuario=usuario, motivo=f'Abono #{abono.id}')
+        ajustar_saldos({cliente_id: -aplicado})
+    abono.saldo_cliente = saldo - aplicado
+    abono.aplicaciones_fifo = aplicaciones
+    return abono
+
+
+def movimientos_cuenta(cliente_id, chunk_size=2000):
+    """
+    Genera (fecha, tipo, documento, vencimiento, cargo, abono, saldo) en orden cronológico:
+    tipo 'F' = factura a crédito (cargo = total), 'A' = abono (lo aplicado). Un solo cursor
+    (UNION) leído con iterator(), así la memoria no depende del largo de la cuenta.
+    """
+    campo, cero = _campo_saldo(), Value(CERO, output_field=_campo_saldo())
+    facturas = (Pedido.objects.filter(cliente_id=cliente_id, metodo_pago='CREDITO')
+                .exclude(estado__in=[Pedido.EstadoPedido.CANCELADO, Pedido.EstadoPedido.DEVOLUCION])
+                .annotate(f=F('fecha_pedido'), t=Value('F'), v=F('fecha_vencimiento'),
+                          cargo=ExpressionWrapper(F('total'), output_field=campo), pago=cero)
+                .values_list('f', 't', 'id', 'v', 'cargo', 'pago'))
+    abonos = (Abono.objects.filter(cliente_id=cliente_id, aplicado__gt=0)
+              .annotate(f=F('fecha'), t=Value('A'), v=Value(None, output_field=DateField()),
+                        cargo=cero, pago=ExpressionWrapper(F('aplicado'), output_field=campo))
+              .values_list('f', 't', 'id', 'v', 'cargo', 'pago'))
+    saldo = CERO
+    for fecha, tipo, documento, vence, cargo, pago in facturas.union(abonos, all=True).order_by('f', 't', 'id').iterator(chunk_size=chunk_size):
+        cargo, pago = Decimal(cargo or 0), Decimal(pago or 0)
+        saldo += cargo - pago
+        yield fecha, tipo, documento, vence, cargo, pago, saldo
+
+
+def conciliar(corregir=False):
+    """
+    Compara saldo_pendiente con la suma real de los pedidos. Devuelve
+    [(cliente_id, guardado, real), ...] de los que no cuadran; con corregir=True los ajusta.
+    """
+    reales = deudas_de(Pedido.objects.all())
+    diferencias = []
+    for cid, guardado in Cliente.objects.values_list('id', 'saldo_pendiente').iterator(chunk_size=2000):
+        real = reales.get(cid) or CERO
+        if guardado != real: diferencias.append((cid, guardado, real))
+    if corregir:
+        ajustar_saldos({cid: real - guardado for cid, guardado, real in diferencias})
+    return diferencias
+
+
+def _mora():
+    # * 0.01 y no / 100: SQLite guarda los decimales enteros como INTEGER y dividiría truncando
+    return ExpressionWrapper(F('total') * F('tasa_mora') * Value(Decimal('0.01')), output_field=_campo_saldo())
+
+
+def actualizar_mora(hoy=None):
+    """
+    Marca vencidos los pedidos a crédito pendientes con fecha_vencimiento < hoy y guarda su
+    mora (total * tasa_mora %); limpia los que ya no lo están. Solo escribe las filas que
+    cambian. Devuelve (marcados, limpiados).
+    """
+    hoy = hoy or timezone.localdate()
+    atrasado = Q(estado=Pedido.EstadoPedido.PENDIENTE, fecha_vencimiento__lt=hoy)
+    mora = Round(_mora(), 2)
+    with transaction.atomic():
+        marcados = (Pedido.objects.filter(atrasado).exclude(vencido=True, mora=mora)
+                    .update(vencido=True, mora=mora))
+        limpiados = Pedido.objects.filter(vencido=True).exclude(atrasado).update(vencido=False, mora=CERO)
+    return marcados, limpiados
+
+
+# (clave, desde, hasta) en días de atraso respecto a fecha_vencimiento; None = sin tope
+TRAMOS = [('d1_30', 1, 30), ('d31_60', 31, 60), ('d61_90', 61, 90), ('d90_mas', 91, None)]
+
+
+def antiguedad_saldos(corte, sucursal_id=None):
+    """Saldo pendiente por cliente y tramo de atraso al día `corte`, más la mora (total * tasa_mora %)."""
+    clave = f'cartera:antiguedad:{corte.isoformat()}:{sucursal_id or 0}'
+    datos = cache.get(clave)
+    if datos is not None: return datos
+
+    campo = _campo_saldo()
+    cero = Value(CERO, output_field=campo)
+    saldo = ExpressionWrapper(F('total') - F('monto_recibido'), output_field=campo)
+    columnas = {'corriente': Sum(Case(When(Q(fecha_vencimiento__isnull=True) | Q(fecha_vencimiento__gte=corte), then=saldo),
+                                      default=cero, output_field=campo))}
+    for nombre, desde, hasta in TRAMOS:
+        condicion = Q(fecha_vencimiento__lte=corte - timedelta(days=desde))
+        if hasta: condicion &= Q(fecha_vencimiento__gte=corte - timedelta(days=hasta))
+        columnas[nombre] = Sum(Case(When(condicion, then=saldo), default=cero, output_field=campo))
+    columnas['mora'] = Sum(Case(When(fecha_vencimiento__lt=corte, then=_mora()), default=cero, output_field=campo))
+    columnas['saldo'] = Sum(saldo)
+    columnas['facturas'] = Count('id')
+
+    fin_del_dia = timezone.make_aware(datetime.combine(corte + timedelta(days=1), datetime.min.time()))
+    pedidos = Pedido.objects.filter(estado=Pedido.EstadoPedido.PENDIENTE, cliente__isnull=False, fecha_pedido__lt=fin_del_dia)
+    if sucursal_id: pedidos = pedidos.filter(sucursal_id=sucursal_id)
+    filas = pedidos.values('cliente_id', 'cliente__nombre').annotate(**columnas).order_by('-saldo', 'cliente_id')
+
+    montos = ['corriente'] + [t[0] for t in TRAMOS] + ['mora', 'saldo']
+    clientes, totales = [], dict.fromkeys(montos, CERO)
+    for fila in filas:
+        fila = {**fila, **{m: Decimal(fila[m] or 0).quantize(Decimal('0.01')) for m in montos}}
+        clientes.append(fila)
+        for m in montos: totales[m] += fila[m]
+    totales['facturas'] = sum(f['facturas'] for f in clientes)
+    datos = {'corte': corte, 'sucursal': sucursal_id, 'totales': totales, 'clientes': clientes}
+    cache.set(clave, datos, settings.REPORTES_CACHE_SEGUNDOS)
+    return datos
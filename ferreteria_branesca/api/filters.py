@@ -0,0 +1,39 @@
+import django_filters
+from django.db.models import Exists, OuterRef
+
+from .models import Producto, Inventario, Pedido
+
+
+class ProductoFilter(django_filters.FilterSet):
+    """
+    /api/productos/?categoria=3&precio_min=10&precio_max=500&con_stock_en=1&sku=TRU-
+    Todo se resuelve en SQL sobre columnas indexadas.
+    """
+    precio_min = django_filters.NumberFilter(field_name='precio', lookup_expr='gte')
+    precio_max = django_filters.NumberFilter(field_name='precio', lookup_expr='lte')
+    con_stock_en = django_filters.NumberFilter(method='filtrar_con_stock', label='Con stock en sucursal (id)')
+    sku = django_filters.CharFilter(method='filtrar_sku', label='Prefijo de SKU')
+
+    class Meta:
+        model = Producto
+        fields = ['categoria']
+
+    def filtrar_con_stock(self, queryset, name, value):
+        stock = Inventario.objects.filter(producto=OuterRef('pk'), sucursal_id=value, cantidad__gt=0)
+        return queryset.filter(Exists(stock))
+
+    def filtrar_sku(self, queryset, name, value):
+        # Los SKU se guardan en mayúsculas (Producto.save); startswith sensible a
+        # mayúsculas permite usar el índice único de 'sku' (LIKE 'TRU-%')
+        return queryset.filter(sku__startswith=value.strip().upper())
+
+
+class PedidoFilter(django_filters.FilterSet):
+    """
+    /api/gestion-pedidos/?vencido=true&ordering=-mora
+    vencido y mora los guarda el comando `actualizar_mora`; con el índice
+    (vencido, -mora, -id) el filtro y el orden se resuelven en la base.
+    """
+    class Meta:
+        model = Pedido
+        fields = ['vencido', 'estado', 'cliente', 'sucursal', 'metodo_pago']
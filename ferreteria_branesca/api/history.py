@@ -0,0 +1,43 @@
+"""
+Historial (simple_history) para operaciones masivas.
+
+bulk_create / update() no disparan las señales de simple_history. Estas
+funciones escriben las filas de historial en bloque para que la auditoría
+siga completa sin volver a guardar objeto por objeto.
+"""
+from django.db import connection
+from django.db.models import CharField, DateTimeField, IntegerField, Value
+from django.utils import timezone
+
+
+def historial_desde_queryset(queryset, tipo='~', usuario=None, motivo=''):
+    """
+    Copia al historial el estado actual de las filas del queryset con un solo
+    INSERT ... SELECT (sin traer las filas a Python). Devuelve cuántas se copiaron.
+    """
+    modelo = queryset.model
+    historico = modelo.history.model
+    campos = [f.attname for f in historico.tracked_fields]
+    qs = (queryset.order_by()
+          .annotate(h_fecha=Value(timezone.now(), output_field=DateTimeField()),
+                    h_motivo=Value(motivo, output_field=CharField()),
+                    h_tipo=Value(tipo, output_field=CharField()),
+                    h_usuario=Value(getattr(usuario, 'pk', None), output_field=IntegerField()))
+          .values_list(*campos, 'h_fecha', 'h_motivo', 'h_tipo', 'h_usuario'))
+    sql, params = qs.query.sql_with_params()
+
+    qn = connection.ops.quote_name
+    columnas = [modelo._meta.get_field(f.name).column for f in historico.tracked_fields]
+    columnas += ['history_date', 'history_change_reason', 'history_type', 'history_user_id']
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(historico._meta.db_table)} ({', '.join(qn(c) for c in columnas)}) {sql}", params)
+        return cursor.rowcount
+
+
+def historial_en_bloque(objetos, tipo='~', usuario=None, motivo=''):
+    """Historial para objetos ya en memoria (p.ej. después de un bulk_update)."""
+    if not objetos: return []
+    modelo = type(objetos[0])
+    return modelo.history.bulk_history_create(
+        objetos, batch_size=500, update=(tipo == '~'), default_user=usuario, default_change_reason=motivo,
+    )
@@ -0,0 +1,76 @@
+"""
+Encabezado Idempotency-Key para endpoints de escritura del POS.
+
+El POS reintenta /venta-mostrador/ y /registrar-abono/ cuando la red se corta.
+Con la misma clave, el reintento devuelve la respuesta guardada de la primera
+petición (una lectura por índice único) sin volver a ejecutar la transacción.
+
+La clave se reserva dentro de la misma transacción que la operación: un
+reintento que llega mientras la original sigue en curso espera en el índice
+único y luego recibe la respuesta ya confirmada. Solo se guardan respuestas
+2xx; si la operación falla, la clave queda libre para reintentar.
+Las claves viejas se borran en bloque con `purgar_idempotencia`.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = 'Idempotency-Key'
+LARGO_MAXIMO = 100
+
+
+def huella(data):
+    if hasattr(data, 'lists'): data = dict(data.lists())  # QueryDict (form-data)
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _repetir(registro, firma):
+    if registro.huella != firma:
+        return Response({'error': f'{ENCABEZADO} ya se usó con otra petición.'}, status=422)
+    respuesta = Response(registro.respuesta, status=registro.estado_http)
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def _buscar(request, clave):
+    return ClaveIdempotencia.objects.filter(usuario=request.user, ruta=request.path, clave=clave).first()
+
+
+def idempotente(metodo):
+    """Decorador para post() de un APIView. Sin encabezado se comporta igual que antes."""
+    @wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        clave = request.headers.get(ENCABEZADO, '').strip()
+        if not clave:
+            return metodo(self, request, *args, **kwargs)
+        if len(clave) > LARGO_MAXIMO:
+            return Response({'error': f'{ENCABEZADO} de más de {LARGO_MAXIMO} caracteres.'}, status=400)
+
+        firma = huella(request.data)
+        previa = _buscar(request, clave)
+        if previa: return _repetir(previa, firma)
+
+        try:
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(
+                    usuario=request.user, ruta=request.path, clave=clave, huella=firma, estado_http=0, respuesta={})
+                respuesta = metodo(self, request, *args, **kwargs)
+                if 200 <= respuesta.status_code < 300:
+                    registro.estado_http = respuesta.status_code
+                    registro.respuesta = json.loads(JSONRenderer().render(respuesta.data) or b'null')
+                    registro.save(update_fields=['estado_http', 'respuesta'])
+                else:
+                    transaction.set_rollback(True)
+                return respuesta
+        except IntegrityError:
+            # Otra petición con la misma clave se confirmó primero
+            previa = _buscar(request, clave)
+            if previa is None: raise
+            return _repetir(previa, firma)
+    return envoltura
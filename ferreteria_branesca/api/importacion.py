@@ -0,0 +1,182 @@
+"""
+Importación masiva (upsert) de productos desde CSV o XLSX.
+
+Columnas: sku, nombre, descripcion, precio, categoria y, opcionalmente, una
+columna stock_<id_sucursal> por sucursal (p.ej. stock_1, stock_3).
+
+El archivo se lee fila por fila y se procesa por lotes: cada lote separa las
+claves que ya existen (bulk_update) de las nuevas (bulk_create) en cada tabla,
+sin upserts que SQL Server no soporta, escribe el historial en bloque
+y se confirma en su propia transacción, así la memoria no crece con el
+tamaño del archivo.
+"""
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Categoria, Inventario, Producto, Sucursal
+from .movimientos import Motivo, registrar_cambios
+from .search import indexar_productos
+from .signals import marcar_catalogo_modificado
+
+COLUMNAS_REQUERIDAS = ('sku', 'nombre', 'precio')
+MAX_ERRORES_DETALLE = 500
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+def leer_filas(archivo, nombre):
+    """Genera diccionarios por fila sin cargar el archivo completo."""
+    if nombre.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(c or '').strip().lower() for c in next(filas, [])]
+        for fila in filas:
+            if any(v not in (None, '') for v in fila):
+                yield dict(zip(encabezado, fila))
+        libro.close()
+    else:
+        if isinstance(archivo.read(0), bytes):
+            archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+        lector = csv.DictReader(archivo)
+        lector.fieldnames = [c.strip().lower() for c in (lector.fieldnames or [])]
+        yield from lector
+
+
+class ImportadorProductos:
+    def __init__(self, usuario=None, lote=1000):
+        self.usuario = usuario
+        self.lote = lote
+        self.categorias = dict(Categoria.objects.values_list('nombre', 'id'))
+        self.sucursales = set(Sucursal.objects.values_list('id', flat=True))
+        self.procesadas = self.creados = self.actualizados = self.inventarios = 0
+        self.errores = []
+        self.total_errores = 0
+
+    # --- API ---
+    def importar(self, archivo, nombre):
+        inicio = time.monotonic()
+        buffer = []
+        for numero, fila in enumerate(leer_filas(archivo, nombre), start=2):  # fila 1 = encabezado
+            if numero == 2: self._validar_encabezado(fila)
+            try:
+                buffer.append(self._parsear(numero, fila))
+            except ErrorImportacion as e:
+                self._error(numero, str(e))
+            if len(buffer) >= self.lote:
+                self._guardar_lote(buffer); buffer = []
+        if buffer:
+            self._guardar_lote(buffer)
+        if self.procesadas:
+            marcar_catalogo_modificado()
+            for sucursal_id in self.sucursales: marcar_catalogo_modificado(sucursal_id)
+        segundos = time.monotonic() - inicio
+        return {
+            'filas_procesadas': self.procesadas,
+            'productos_creados': self.creados,
+            'productos_actualizados': self.actualizados,
+            'inventarios_actualizados': self.inventarios,
+            'filas_con_error': self.total_errores,
+            'errores': self.errores,
+            'segundos': round(segundos, 2),
+            'filas_por_segundo': round(self.procesadas / segundos) if segundos else None,
+        }
+
+    # --- Helpers ---
+    def _validar_encabezado(self, fila):
+        faltan = [c for c in COLUMNAS_REQUERIDAS if c not in fila]
+        if faltan: raise ErrorImportacion(f"Faltan columnas: {', '.join(faltan)}")
+        for columna in fila:
+            if columna and columna.startswith('stock_'):
+                try: sucursal_id = int(columna[6:])
+                except ValueError: raise ErrorImportacion(f'Columna inválida: {columna}')
+                if sucursal_id not in self.sucursales: raise ErrorImportacion(f'Sucursal {sucursal_id} no existe ({columna})')
+
+    def _parsear(self, numero, fila):
+        sku = str(fila.get('sku') or '').strip().upper()
+        nombre = str(fila.get('nombre') or '').strip()
+        if not sku: raise ErrorImportacion('SKU vacío')
+        if len(sku) > 50: raise ErrorImportacion('SKU de más de 50 caracteres')
+        if not nombre: raise ErrorImportacion('Nombre vacío')
+        try:
+            precio = Decimal(str(fila.get('precio')).replace(',', '').strip()).quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ErrorImportacion(f"Precio inválido: {fila.get('precio')!r}")
+        if precio < Decimal('0.01'): raise ErrorImportacion('El precio debe ser mayor a 0')
+
+        stock = {}
+        for columna, valor in fila.items():
+            if columna and columna.startswith('stock_') and valor not in (None, ''):
+                try: cantidad = int(Decimal(str(valor)))
+                except (InvalidOperation, ValueError): raise ErrorImportacion(f'Cantidad inválida en {columna}: {valor!r}')
+                if cantidad < 0: raise ErrorImportacion(f'Cantidad negativa en {columna}')
+                stock[int(columna[6:])] = cantidad
+        return {
+            'sku': sku, 'nombre': nombre[:255], 'precio': precio,
+            'descripcion': str(fila.get('descripcion') or '').strip(),
+            'categoria': str(fila.get('categoria') or '').strip()[:100] or None,
+            'stock': stock,
+        }
+
+    def _error(self, numero, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_DETALLE:
+            self.errores.append({'fila': numero, 'error': mensaje})
+
+    def _guardar_lote(self, filas):
+        # El último valor de un SKU repetido dentro del lote gana
+        filas = list({f['sku']: f for f in filas}.values())
+        with transaction.atomic():
+            self._crear_categorias({f['categoria'] for f in filas if f['categoria']})
+            skus = [f['sku'] for f in filas]
+            existentes = dict(Producto.objects.filter(sku__in=skus).values_list('sku', 'id'))
+
+            # bulk_create para los SKU nuevos y bulk_update para los existentes: mssql-django
+            # no soporta update_conflicts / ignore_conflicts
+            productos = [Producto(id=existentes.get(f['sku']), sku=f['sku'], nombre=f['nombre'], descripcion=f['descripcion'],
+                                  precio=f['precio'], categoria_id=self.categorias.get(f['categoria'])) for f in filas]
+            Producto.objects.bulk_create([p for p in productos if p.id is None], batch_size=500)
+            Producto.objects.bulk_update([p for p in productos if p.id is not None],
+                                         ['nombre', 'descripcion', 'precio', 'categoria'], batch_size=500)
+            # Releemos las filas guardadas: el historial debe copiar la fila completa (imagen incluida)
+            guardados = list(Producto.objects.filter(sku__in=skus))
+            ids = {p.sku: p.id for p in guardados}
+            nuevos = [p for p in guardados if p.sku not in existentes]
+            cambiados = [p for p in guardados if p.sku in existentes]
+            Producto.history.bulk_history_create(nuevos, batch_size=500, default_user=self.usuario, default_change_reason='Importación')
+            Producto.history.bulk_history_create(cambiados, batch_size=500, update=True, default_user=self.usuario, default_change_reason='Importación')
+
+            inventarios = [Inventario(producto_id=ids[f['sku']], sucursal_id=sid, cantidad=cant)
+                           for f in filas for sid, cant in f['stock'].items()]
+            if inventarios:
+                # Filas y cantidades previas (kardex) en una consulta por lote
+                anteriores = {(pid, sid): (pk, cant) for pk, pid, sid, cant in Inventario.objects.filter(
+                    producto_id__in=ids.values(), sucursal_id__in={i.sucursal_id for i in inventarios}
+                ).values_list('id', 'producto_id', 'sucursal_id', 'cantidad')}
+                for i in inventarios: i.id = anteriores.get((i.producto_id, i.sucursal_id), (None, 0))[0]
+                Inventario.objects.bulk_create([i for i in inventarios if i.id is None], batch_size=500)
+                Inventario.objects.bulk_update([i for i in inventarios if i.id is not None], ['cantidad'], batch_size=500)
+                registrar_cambios([(i.producto_id, i.sucursal_id, anteriores.get((i.producto_id, i.sucursal_id), (None, 0))[1], i.cantidad)
+                                   for i in inventarios], Motivo.IMPORTACION, self.usuario)
+
+            indexar_productos(ids.values())
+
+        self.procesadas += len(filas)
+        self.creados += len(nuevos)
+        self.actualizados += len(cambiados)
+        self.inventarios += len(inventarios)
+
+    def _crear_categorias(self, nombres):
+        nuevas = [n for n in nombres if n not in self.categorias]
+        if not nuevas: return
+        self.categorias.update(Categoria.objects.filter(nombre__in=nuevas).values_list('nombre', 'id'))
+        faltantes = [n for n in nuevas if n not in self.categorias]
+        if not faltantes: return
+        Categoria.objects.bulk_create([Categoria(nombre=n) for n in faltantes])
+        self.categorias.update(Categoria.objects.filter(nombre__in=faltantes).values_list('nombre', 'id'))
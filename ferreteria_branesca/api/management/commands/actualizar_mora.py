@@ -0,0 +1,18 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from api.cartera import actualizar_mora
+
+class Command(BaseCommand):
+    help = 'Marca los pedidos a crédito vencidos y guarda su mora (proceso nocturno, se puede repetir)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Día de referencia AAAA-MM-DD (por defecto hoy)')
+
+    def handle(self, *args, **options):
+        try:
+            hoy = date.fromisoformat(options['fecha']) if options['fecha'] else None
+        except ValueError:
+            raise CommandError('Fecha inválida, use AAAA-MM-DD')
+        marcados, limpiados = actualizar_mora(hoy)
+        self.stdout.write(self.style.SUCCESS(f'✅ Mora actualizada: {marcados} pedidos vencidos, {limpiados} ya al día'))
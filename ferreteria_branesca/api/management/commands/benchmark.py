@@ -0,0 +1,67 @@
+import json
+import os
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from api import benchmark
+
+class Command(BaseCommand):
+    help = ('Mide latencia (p50/p95/p99) y consultas SQL de los endpoints principales sobre una base SQLite '
+            'desechable. Uso: python manage.py benchmark --settings=ferreteria_branesca.settings_benchmark')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=int, default=1, help='Factor de volumen: 200 productos, 100 clientes y 500 pedidos por unidad')
+        parser.add_argument('--peticiones', type=int, default=100, help='Peticiones medidas por escenario y modo')
+        parser.add_argument('--hilos', type=int, default=4, help='Clientes concurrentes del modo multihilo')
+        parser.add_argument('--solo', nargs='*', help='Medir solo estos escenarios (ej. productos factura)')
+        parser.add_argument('--salida', default='benchmark_resultados.json', help='Archivo JSON con los resultados')
+        parser.add_argument('--base', default=os.path.join(settings.BASE_DIR, 'benchmark_base.json'),
+                            help='Línea base para comparar (se ignora si no existe)')
+        parser.add_argument('--tolerancia', type=float, default=0.5, help='Aumento de p50/p95 permitido frente a la base (0.5 = +50%%)')
+        parser.add_argument('--holgura-ms', type=float, default=5, help='Margen absoluto de latencia, en ms, además de la tolerancia')
+        parser.add_argument('--guardar-base', action='store_true', help='Guardar estos resultados como nueva línea base')
+
+    def handle(self, *args, **options):
+        # Borra y recrea la base: nunca contra SQL Server
+        if connection.vendor != 'sqlite':
+            raise CommandError('El benchmark solo corre sobre SQLite: use --settings=ferreteria_branesca.settings_benchmark')
+        connection.close()
+        if os.path.exists(settings.DATABASES['default']['NAME']): os.remove(settings.DATABASES['default']['NAME'])
+        call_command('migrate', verbosity=0)
+
+        ctx = benchmark.construir_datos(options['escala'])
+        self.stdout.write(f"Datos: {ctx['conteos']}")
+
+        resultados = {}
+        for nombre, metodo, armar in benchmark.ESCENARIOS:
+            if options['solo'] and nombre not in options['solo']: continue
+            for hilos in sorted({1, options['hilos']}):
+                modo = f'{hilos}_hilo' + ('s' if hilos > 1 else '')
+                r = benchmark.medir(ctx, metodo, armar, hilos=hilos, peticiones=options['peticiones'])
+                resultados.setdefault(nombre, {})[modo] = r
+                self.stdout.write(f"{nombre:<20} {modo:<9} p50 {r['p50_ms']:>8} ms  p95 {r['p95_ms']:>8} ms  "
+                                  f"p99 {r['p99_ms']:>8} ms  consultas {r['consultas_max']:>4}  errores {r['errores']}")
+
+        informe = {'fecha': timezone.now().isoformat(), 'escala': options['escala'], 'peticiones': options['peticiones'],
+                   'datos': ctx['conteos'], 'resultados': resultados}
+        with open(options['salida'], 'w', encoding='utf-8') as f: json.dump(informe, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados en {options['salida']}"))
+
+        if options['guardar_base']:
+            with open(options['base'], 'w', encoding='utf-8') as f: json.dump(informe, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Línea base guardada en {options['base']}"))
+            return
+        if not os.path.exists(options['base']):
+            self.stdout.write(self.style.WARNING('Sin línea base: use --guardar-base para crearla.'))
+            return
+        with open(options['base'], encoding='utf-8') as f: base = json.load(f)
+        if base.get('escala') != options['escala']:
+            self.stdout.write(self.style.WARNING(f"La base es de escala {base.get('escala')}: no se compara."))
+            return
+        regresiones = benchmark.comparar(resultados, base['resultados'], options['tolerancia'], options['holgura_ms'])
+        if regresiones:
+            for r in regresiones: self.stderr.write(f'❌ {r}')
+            raise CommandError(f'{len(regresiones)} regresiones frente a la línea base')
+        self.stdout.write(self.style.SUCCESS('✅ Sin regresiones frente a la línea base'))
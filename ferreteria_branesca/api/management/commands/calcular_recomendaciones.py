@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from api.recomendaciones import calcular
+
+class Command(BaseCommand):
+    help = 'Calcula recomendaciones por co-compra (lift) procesando solo los pedidos nuevos desde la última corrida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Descarta lo acumulado y recalcula todo el historial')
+        parser.add_argument('--top', type=int, default=10, help='Recomendaciones por producto (default 10)')
+        parser.add_argument('--min-soporte', type=int, default=2, help='Pedidos mínimos en común para recomendar (default 2)')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        res = calcular(completo=options['completo'], top_k=options['top'], min_soporte=options['min_soporte'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Recomendaciones actualizadas en {time.monotonic() - inicio:.1f}s'))
+        self.stdout.write(f"   - {res['pedidos_nuevos']} pedidos nuevos procesados")
+        self.stdout.write(f"   - {res['productos_afectados']} productos recalculados, {res['recomendaciones']} recomendaciones escritas")
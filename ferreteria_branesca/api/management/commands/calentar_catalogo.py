@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from api.models import Sucursal, VersionCatalogo
+from api import snapshots
+
+class Command(BaseCommand):
+    help = 'Precalienta la caché del catálogo serializado para cada sucursal (usar al desplegar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-base', default='http://127.0.0.1:8000',
+                            help='Host público de la API; las URLs de imágenes se arman con él')
+
+    def handle(self, *args, **options):
+        url = options['url_base'].rstrip('/')
+        esquema, host = url.split('://', 1)
+        request = RequestFactory().get('/', secure=(esquema == 'https'), HTTP_HOST=host)
+        for sucursal in Sucursal.objects.order_by('id'):
+            inicio = time.monotonic()
+            version, _ = VersionCatalogo.vigente(sucursal.id)
+            tam = snapshots.guardar(sucursal.id, version, request)
+            self.stdout.write(f'   - {sucursal.nombre}: {tam / 1024:.0f} KB en {time.monotonic() - inicio:.2f}s')
+        self.stdout.write(self.style.SUCCESS('✅ Catálogo precalentado.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.cartera import conciliar
+
+class Command(BaseCommand):
+    help = 'Verifica Cliente.saldo_pendiente contra los pedidos pendientes (y con --corregir lo ajusta)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Ajustar los saldos que no cuadran')
+        parser.add_argument('--detalle', type=int, default=20, help='Cuántas diferencias mostrar')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            diferencias = conciliar(corregir=options['corregir'])
+        for cliente_id, guardado, real in diferencias[:options['detalle']]:
+            self.stdout.write(f'   - Cliente {cliente_id}: guardado C$ {guardado} / real C$ {real}')
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los saldos cuadran con los pedidos'))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(diferencias)} saldos corregidos'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(diferencias)} saldos no cuadran (use --corregir)'))
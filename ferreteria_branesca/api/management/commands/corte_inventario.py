@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from api.models import Sucursal
+from api.movimientos import tomar_corte
+
+class Command(BaseCommand):
+    help = 'Guarda un corte del stock de cada sucursal para reconstruir el stock a fechas pasadas (programar a diario)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sucursal', type=int, help='Solo esta sucursal (id)')
+        parser.add_argument('--cada', type=int, default=0, help='Repetir cada N segundos (modo servicio); 0 = una sola vez')
+
+    def handle(self, *args, **options):
+        while True:
+            sucursales = Sucursal.objects.all()
+            if options['sucursal']: sucursales = sucursales.filter(id=options['sucursal'])
+            for sucursal_id in sucursales.values_list('id', flat=True):
+                corte = tomar_corte(sucursal_id)
+                self.stdout.write(self.style.SUCCESS(f'✅ Corte sucursal {sucursal_id}: {len(corte.stock)} productos con stock'))
+            if not options['cada']: break
+            time.sleep(options['cada'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import Producto
+from api import thumbnails
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP que falten (imágenes subidas antes de activar el pipeline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya existen')
+
+    def handle(self, *args, **options):
+        hechas = errores = 0
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True).only('id', 'imagen', 'miniaturas')
+        for p in productos.iterator(chunk_size=200):
+            if not options['todas'] and (p.miniaturas or {}).get('origen') == p.imagen.name: continue
+            try:
+                thumbnails.generar(p.id, p.imagen.name); hechas += 1
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f'   - {p.imagen.name}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Miniaturas generadas para {hechas} productos ({errores} errores)'))
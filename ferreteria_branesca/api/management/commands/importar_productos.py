@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.importacion import ImportadorProductos, ErrorImportacion
+
+class Command(BaseCommand):
+    help = 'Importa/actualiza productos, categorías e inventario por sucursal desde un CSV o XLSX (upsert por SKU)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta al .csv o .xlsx (columnas: sku, nombre, descripcion, precio, categoria, stock_<id_sucursal>...)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote (default 1000)')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        modo = 'rb' if ruta.lower().endswith('.xlsx') else 'r'
+        try:
+            with open(ruta, modo, **({} if modo == 'rb' else {'encoding': 'utf-8-sig', 'newline': ''})) as f:
+                res = ImportadorProductos(lote=options['lote']).importar(f, ruta)
+        except (OSError, ErrorImportacion) as e:
+            raise CommandError(str(e))
+
+        for err in res['errores']:
+            self.stderr.write(f"   - Fila {err['fila']}: {err['error']}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {res['filas_procesadas']} filas en {res['segundos']}s ({res['filas_por_segundo']} filas/s)"))
+        self.stdout.write(f"   - {res['productos_creados']} productos creados, {res['productos_actualizados']} actualizados")
+        self.stdout.write(f"   - {res['inventarios_actualizados']} registros de inventario")
+        if res['filas_con_error']:
+            self.stdout.write(self.style.WARNING(f"   - {res['filas_con_error']} filas con error"))
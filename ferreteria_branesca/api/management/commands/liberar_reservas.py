@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from api.reservas import liberar_expiradas
+
+class Command(BaseCommand):
+    help = 'Cancela los pedidos web cuyas reservas de stock vencieron y libera ese stock (programar cada minuto)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cada', type=int, default=0, help='Repetir cada N segundos (modo servicio); 0 = una sola vez')
+
+    def handle(self, *args, **options):
+        while True:
+            cancelados = liberar_expiradas()
+            if cancelados or not options['cada']:
+                self.stdout.write(self.style.SUCCESS(f'✅ {cancelados} pedidos con reserva vencida cancelados'))
+            if not options['cada']: break
+            time.sleep(options['cada'])
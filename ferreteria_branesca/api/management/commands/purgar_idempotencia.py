@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import ClaveIdempotencia
+
+class Command(BaseCommand):
+    help = 'Borra en bloque las claves de idempotencia más viejas que IDEMPOTENCIA_HORAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=settings.IDEMPOTENCIA_HORAS, help=f'Antigüedad mínima (default {settings.IDEMPOTENCIA_HORAS})')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        # Sin señales ni relaciones entrantes: Django lo resuelve con un solo DELETE
+        borradas, _ = ClaveIdempotencia.objects.filter(creado__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(f'✅ {borradas} claves de idempotencia eliminadas'))
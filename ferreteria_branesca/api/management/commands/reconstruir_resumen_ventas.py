@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from api.resumen_ventas import reconstruir
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen diario de ventas (VentaDiaria) desde los pedidos, completo o en un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día AAAA-MM-DD (por defecto desde el inicio)')
+        parser.add_argument('--hasta', help='Último día AAAA-MM-DD (por defecto hasta el final)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else None
+            hasta = date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError:
+            raise CommandError('Fecha inválida, use AAAA-MM-DD')
+        if desde and hasta and desde > hasta: raise CommandError('--desde no puede ser posterior a --hasta')
+        filas = reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen de ventas reconstruido: {filas} filas'))
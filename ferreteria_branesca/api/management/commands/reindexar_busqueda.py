@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Producto, PalabraBusqueda, TrigramaBusqueda
+from api.search import reconstruir_indice
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de productos (después de cargas masivas sin señales)'
+
+    @transaction.atomic
+    def handle(self, *args, **kwargs):
+        inicio = time.monotonic()
+        total = reconstruir_indice(Producto, PalabraBusqueda, TrigramaBusqueda)
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} productos indexados en {time.monotonic() - inicio:.1f}s'))
@@ -1,20 +1,67 @@
 import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from api.models import Sucursal, Categoria, Producto, Inventario, Pedido, DetallePedido, Usuario
+from django.utils import timezone
+from api.models import (Sucursal, Categoria, Producto, Inventario, Pedido, DetallePedido, Usuario, Cliente,
+                        MovimientoInventario, ReservaStock, Abono, AplicacionAbono, VentaDiaria,
+                        PalabraBusqueda, TrigramaBusqueda)
+from api.movimientos import registrar_cambios
+from api.cartera import conciliar
+from api.resumen_ventas import reconstruir
+from api.search import reconstruir_indice
+from api.signals import marcar_catalogo_modificado
+
+# Histórico sintético (--escala): pesos por mes (ene..dic) y por día (lun..dom).
+# Verano (ene-abr) es temporada alta de construcción, el invierno baja y diciembre sube por pintura y regalos.
+PESO_MES = [1.10, 1.15, 1.20, 1.20, 1.05, 0.85, 0.80, 0.80, 0.75, 0.80, 0.95, 1.30]
+PESO_DIA = [1.00, 1.00, 1.00, 1.05, 1.15, 1.25, 0.40]
+HORAS = list(range(7, 19))
+PESO_HORA = [0.6, 1.2, 1.4, 1.3, 1.0, 0.7, 0.8, 1.0, 1.0, 0.9, 0.7, 0.4]
+METODOS = [('EFECTIVO', 50), ('TARJETA', 25), ('CREDITO', 18), ('PAYPAL', 7)]
+VARIANTES = ['Económico', 'Profesional', 'Industrial', 'Premium', 'Truper', 'Stanley', 'Pretul', 'Surtek', 'Nacional', 'Importado']
+IVA = Decimal('1.15')
+LOTE = 5000
+
+
+@contextmanager
+def _sin_auto_now_add(modelo, campo):
+    # bulk_create respeta la fecha histórica solo si auto_now_add está apagado (comando de una sola ejecución)
+    field = modelo._meta.get_field(campo)
+    field.auto_now_add = False
+    try: yield
+    finally: field.auto_now_add = True
+
 
 class Command(BaseCommand):
-    help = 'Rellena la base de datos con productos reales, sucursales e inventario inicial'
+    help = 'Rellena la base de datos con productos reales, sucursales e inventario inicial (y con --escala, años de ventas sintéticas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=int, default=0,
+                            help='Genera histórico sintético: 1000 productos, 500 clientes y 40.000 pedidos por unidad (0 = solo catálogo)')
+        parser.add_argument('--meses', type=int, default=24, help='Meses de histórico de ventas a generar')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (misma semilla = mismos datos)')
 
     @transaction.atomic
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
         self.stdout.write("🚧 Iniciando limpieza y poblado de base de datos...")
 
         # 1. Limpiar datos antiguos (Opcional: comenta estas líneas si no quieres borrar todo)
         self.stdout.write("   - Borrando datos antiguos...")
         Inventario.objects.all().delete()
         DetallePedido.objects.all().delete()
-        Pedido.objects.all().delete()
+        ReservaStock.objects.all().delete()
+        AplicacionAbono.objects.all().delete()
+        Abono.objects.all().delete()
+        # Borrado directo en SQL: con cientos de miles de pedidos no se cargan filas ni se genera historial por cada uno
+        MovimientoInventario.objects.filter(pedido__isnull=False).update(pedido=None)
+        Pedido.objects.all()._raw_delete(Pedido.objects.db)
+        VentaDiaria.objects.all().delete()
+        Cliente.objects.filter(ruc__startswith='SEED-').delete()
         Producto.objects.all().delete()
         Categoria.objects.all().delete()
         Sucursal.objects.all().delete()
@@ -90,7 +137,7 @@ class Command(BaseCommand):
 
             for prod_nombre, prod_precio, prod_desc in productos_lista:
                 # Crear Producto
-                sku = f"{nombre_categoria[:3].upper()}-{random.randint(1000, 9999)}"
+                sku = f"{nombre_categoria[:3].upper()}-{rnd.randint(1000, 9999)}"
                 producto = Producto.objects.create(
                     sku=sku,
                     nombre=prod_nombre,
@@ -103,7 +150,7 @@ class Command(BaseCommand):
 
                 # Asignar Stock a las 4 Sucursales
                 for sucursal in sucursales:
-                    cantidad_random = random.randint(0, 100) # Entre 0 y 100 unidades
+                    cantidad_random = rnd.randint(0, 100) # Entre 0 y 100 unidades
                     
                     # Lógica especial: Asegurar que la Sucursal 1 siempre tenga stock (para pruebas)
                     if sucursal.id == sucursales[0].id and cantidad_random < 10:
@@ -117,9 +164,152 @@ class Command(BaseCommand):
 
         # Guardar todo el inventario de una sola vez (optimización)
         Inventario.objects.bulk_create(items_inventario)
+        # Stock inicial en el kardex
+        registrar_cambios([(i.producto_id, i.sucursal_id, 0, i.cantidad) for i in items_inventario])
 
         self.stdout.write(self.style.SUCCESS(f'✅ ¡Éxito! Base de datos poblada con:'))
         self.stdout.write(f'   - {len(sucursales)} Sucursales')
         self.stdout.write(f'   - {len(catalogo)} Categorías')
         self.stdout.write(f'   - {total_productos} Productos')
-        self.stdout.write(f'   - {len(items_inventario)} Registros de Inventario')
\ No newline at end of file
+        self.stdout.write(f'   - {len(items_inventario)} Registros de Inventario')
+
+        if options['escala'] > 0:
+            self._historico(rnd, options['escala'], options['meses'], sucursales)
+
+    # --- Histórico sintético ---
+    def _medir(self, tabla, filas, inicio):
+        segundos = max(time.perf_counter() - inicio, 1e-6)
+        self.stdout.write(f'   - {tabla:<16} {filas:>9} filas en {segundos:6.2f} s ({filas / segundos:,.0f} filas/s)')
+
+    def _historico(self, rnd, escala, meses, sucursales):
+        self.stdout.write(f"🚧 Generando histórico sintético (escala {escala}, {meses} meses)...")
+        categorias = list(Categoria.objects.order_by('id').values_list('id', 'nombre'))
+        base = list(Producto.objects.order_by('id').values_list('nombre', 'precio', 'descripcion', 'categoria_id'))
+
+        # Productos: variantes de los reales (marca/gama) con precios alrededor del original
+        inicio = time.perf_counter()
+        nuevos = []
+        for i in range(1000 * escala):
+            nombre, precio, descripcion, categoria_id = rnd.choice(base)
+            nuevos.append(Producto(
+                sku=f'GEN-{i + 1:07d}', nombre=f'{nombre} {rnd.choice(VARIANTES)} #{i + 1}', descripcion=descripcion,
+                precio=(Decimal(precio) * Decimal(rnd.uniform(0.6, 1.8))).quantize(Decimal('0.01')), categoria_id=categoria_id))
+        Producto.objects.bulk_create(nuevos, batch_size=1000)
+        self._medir('Producto', len(nuevos), inicio)
+        precios = dict(Producto.objects.values_list('id', 'precio'))
+        productos = sorted(precios)
+        # Popularidad tipo Zipf: pocos productos concentran la mayoría de las líneas
+        orden = productos[:]
+        rnd.shuffle(orden)
+        acumulado, pesos = 0, []
+        for rango in range(1, len(orden) + 1):
+            acumulado += 1 / rango ** 0.9
+            pesos.append(acumulado)
+
+        inicio = time.perf_counter()
+        existentes = {p.producto_id for p in Inventario.objects.only('producto_id')}
+        inventario = [Inventario(producto_id=pid, sucursal=s, cantidad=rnd.randint(0, 500))
+                      for pid in productos if pid not in existentes for s in sucursales]
+        Inventario.objects.bulk_create(inventario, batch_size=2000)
+        registrar_cambios([(i.producto_id, i.sucursal_id, 0, i.cantidad) for i in inventario])
+        self._medir('Inventario', len(inventario), inicio)
+
+        # Clientes: la mitad con crédito (plazo y límite)
+        inicio = time.perf_counter()
+        clientes = [Cliente(nombre=f'Cliente {i + 1:06d}', ruc=f'SEED-{i + 1:06d}', telefono=f'8{rnd.randint(1000000, 9999999)}',
+                            dias_credito=(plazo := rnd.choice([0, 0, 15, 30, 45])),
+                            limite_credito=Decimal(rnd.randrange(500, 20000, 500)) if plazo else Decimal('0'))
+                    for i in range(500 * escala)]
+        Cliente.objects.bulk_create(clientes, batch_size=1000)
+        self._medir('Cliente', len(clientes), inicio)
+        mostrador, _ = Cliente.objects.get_or_create(nombre='Cliente Mostrador', defaults={'ruc': '0000'})
+        todos = list(Cliente.objects.filter(ruc__startswith='SEED-').order_by('id').values_list('id', 'dias_credito'))
+        con_credito = [c for c in todos if c[1] > 0]
+
+        # Vendedores: dos por sucursal (sin contraseña utilizable)
+        nombres = [f'vendedor_{s.id}_{n}' for s in sucursales for n in (1, 2)]
+        faltan = set(nombres) - set(Usuario.objects.filter(username__in=nombres).values_list('username', flat=True))
+        vendedores_nuevos = []
+        for nombre in sorted(faltan):
+            u = Usuario(username=nombre, is_staff=True, sucursal_id=int(nombre.split('_')[1]))
+            u.set_unusable_password()
+            vendedores_nuevos.append(u)
+        Usuario.objects.bulk_create(vendedores_nuevos)
+        vendedores = {}
+        for uid, sid in Usuario.objects.filter(username__in=nombres).order_by('id').values_list('id', 'sucursal_id'):
+            vendedores.setdefault(sid, []).append(uid)
+
+        # Pedidos: volumen diario con estacionalidad, en lotes para no acumular todo en memoria
+        hoy = timezone.localdate()
+        dias = [hoy - timedelta(days=d) for d in range(int(meses * 30.4), 0, -1)]
+        peso_dias = [PESO_MES[d.month - 1] * PESO_DIA[d.weekday()] * (1 + 0.1 * i / len(dias)) for i, d in enumerate(dias)]
+        total_pedidos = 40000 * escala
+        por_dia = [0] * len(dias)
+        for i in rnd.choices(range(len(dias)), weights=peso_dias, k=total_pedidos): por_dia[i] += 1
+
+        metodos, peso_metodos = zip(*METODOS)
+        n_pedidos = n_detalles = 0
+        t_pedidos = t_detalles = 0.0
+        pedidos, lineas = [], []
+        for dia, cantidad in zip(dias, por_dia):
+            for _ in range(cantidad):
+                sucursal = rnd.choice(sucursales)
+                metodo = rnd.choices(metodos, peso_metodos)[0]
+                cliente_id, plazo = (rnd.choice(con_credito) if metodo == 'CREDITO' else
+                                     rnd.choice(todos) if rnd.random() < 0.35 else (mostrador.id, 0))
+                if metodo == 'PAYPAL': cliente_id, plazo = None, 0
+                items = {}
+                for pid in rnd.choices(orden, cum_weights=pesos, k=min(1 + int(rnd.expovariate(0.45)), 12)):
+                    items[pid] = items.get(pid, 0) + rnd.choices((1, 2, 3, 5, 10), (50, 20, 12, 10, 8))[0]
+                total = (sum(precios[pid] * cant for pid, cant in items.items()) * IVA).quantize(Decimal('0.01'))
+
+                fecha = timezone.make_aware(datetime.combine(dia, datetime.min.time())
+                                            .replace(hour=rnd.choices(HORAS, PESO_HORA)[0], minute=rnd.randrange(60)))
+                vencimiento = dia + timedelta(days=plazo) if plazo else None
+                recibido, estado = total, Pedido.EstadoPedido.PAGADO
+                if metodo == 'PAYPAL':
+                    estado = Pedido.EstadoPedido.ENTREGADO
+                elif metodo == 'CREDITO':
+                    # Las deudas viejas casi siempre están pagadas; las recientes, parcialmente
+                    atraso = (hoy - vencimiento).days
+                    if atraso > 60 and rnd.random() < 0.9: pass
+                    elif rnd.random() < 0.4: recibido, estado = Decimal('0'), Pedido.EstadoPedido.PENDIENTE
+                    else: recibido, estado = (total * Decimal(rnd.uniform(0.1, 0.9))).quantize(Decimal('0.01')), Pedido.EstadoPedido.PENDIENTE
+                if rnd.random() < 0.02: estado = Pedido.EstadoPedido.CANCELADO
+
+                pedidos.append(Pedido(cliente_id=cliente_id, sucursal=sucursal, vendedor_id=None if metodo == 'PAYPAL' else rnd.choice(vendedores[sucursal.id]),
+                                      metodo_pago=metodo, estado=estado, total=total, monto_recibido=recibido,
+                                      fecha_pedido=fecha, fecha_vencimiento=vencimiento,
+                                      transaction_id=f'SEED{rnd.getrandbits(40):X}' if metodo == 'PAYPAL' else None))
+                lineas.append(items)
+            if len(pedidos) >= LOTE or dia == dias[-1]:
+                creados, detalles, segundos = self._guardar_lote(pedidos, lineas, precios)
+                n_pedidos += creados; n_detalles += detalles
+                t_pedidos += segundos[0]; t_detalles += segundos[1]
+                pedidos, lineas = [], []
+
+        self.stdout.write(f'   - {"Pedido":<16} {n_pedidos:>9} filas en {t_pedidos:6.2f} s ({n_pedidos / max(t_pedidos, 1e-6):,.0f} filas/s)')
+        self.stdout.write(f'   - {"DetallePedido":<16} {n_detalles:>9} filas en {t_detalles:6.2f} s ({n_detalles / max(t_detalles, 1e-6):,.0f} filas/s)')
+        # Los pedidos se insertaron sin señales: saldo pendiente y resumen diario en un solo paso
+        conciliar(corregir=True)
+        reconstruir()
+        # Productos e inventario también: índice de búsqueda por lotes y nueva versión del catálogo (ETag/snapshots)
+        inicio = time.perf_counter()
+        indexados = reconstruir_indice(Producto, PalabraBusqueda, TrigramaBusqueda)
+        self._medir('Índice búsqueda', indexados, inicio)
+        marcar_catalogo_modificado()
+        for s in sucursales: marcar_catalogo_modificado(s.id)
+        self.stdout.write(self.style.SUCCESS('✅ Histórico sintético generado'))
+
+    def _guardar_lote(self, pedidos, lineas, precios):
+        inicio = time.perf_counter()
+        ultimo = Pedido.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        with _sin_auto_now_add(Pedido, 'fecha_pedido'):
+            Pedido.objects.bulk_create(pedidos, batch_size=1000)
+        # Sin RETURNING en todos los motores: los ids del lote son los nuevos, en orden de inserción
+        ids = list(Pedido.objects.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True))
+        medio = time.perf_counter()
+        detalles = [DetallePedido(pedido_id=pk, producto_id=pid, cantidad=cant, precio_unitario=precios[pid])
+                    for pk, items in zip(ids, lineas) for pid, cant in items.items()]
+        DetallePedido.objects.bulk_create(detalles, batch_size=2000)
+        return len(ids), len(detalles), (medio - inicio, time.perf_counter() - medio)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def construir_indice(apps, schema_editor):
+    from api.search import reconstruir_indice
+    reconstruir_indice(apps.get_model('api', 'Producto'), apps.get_model('api', 'PalabraBusqueda'), apps.get_model('api', 'TrigramaBusqueda'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PalabraBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('palabra', models.CharField(db_index=True, max_length=60)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='palabras_busqueda', to='api.producto')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrigramaBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(db_index=True, max_length=3)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas_busqueda', to='api.producto')),
+            ],
+            options={
+                'unique_together': {('trigrama', 'producto')},
+            },
+        ),
+        migrations.RunPython(construir_indice, migrations.RunPython.noop),
+    ]
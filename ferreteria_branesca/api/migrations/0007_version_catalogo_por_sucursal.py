@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_indices_filtros_productos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versioncatalogo',
+            name='sucursal',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='version_catalogo', to='api.sucursal'),
+        ),
+    ]
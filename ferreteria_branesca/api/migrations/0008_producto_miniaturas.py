@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_version_catalogo_por_sucursal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalproducto',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_producto_miniaturas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcesoRecomendaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_pedido_id', models.BigIntegerField(default=0)),
+                ('total_pedidos', models.PositiveIntegerField(default=0)),
+                ('ejecutado', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CoocurrenciaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conteo', models.PositiveIntegerField(default=0)),
+                ('producto_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coocurrencias', to='api.producto')),
+                ('producto_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.producto')),
+            ],
+            options={
+                'unique_together': {('producto_a', 'producto_b')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_claves_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalpedido',
+            name='clave_offline',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='clave_offline',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='pedido',
+            constraint=models.UniqueConstraint(condition=models.Q(('clave_offline__isnull', False)), fields=('clave_offline',), name='pedido_clave_offline_uniq'),
+        ),
+    ]
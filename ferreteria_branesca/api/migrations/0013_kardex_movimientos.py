@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copiar_historial(apps, schema_editor):
+    """Convierte las copias de fila de HistoricalInventario en movimientos (delta = cantidad - anterior)."""
+    Historico = apps.get_model('api', 'HistoricalInventario')
+    Movimiento = apps.get_model('api', 'MovimientoInventario')
+    productos = set(apps.get_model('api', 'Producto').objects.values_list('id', flat=True))
+    sucursales = set(apps.get_model('api', 'Sucursal').objects.values_list('id', flat=True))
+    usuarios = set(apps.get_model('api', 'Usuario').objects.values_list('id', flat=True))
+
+    anterior, lote = {}, []
+    filas = (Historico.objects.order_by('producto_id', 'sucursal_id', 'history_date', 'history_id')
+             .values_list('producto_id', 'sucursal_id', 'cantidad', 'history_type', 'history_date',
+                          'history_user_id', 'history_change_reason'))
+    for producto_id, sucursal_id, cantidad, tipo, fecha, usuario_id, razon in filas.iterator(chunk_size=5000):
+        if producto_id not in productos or sucursal_id not in sucursales: continue
+        clave = (producto_id, sucursal_id)
+        resultante = 0 if tipo == '-' else cantidad
+        delta = resultante - anterior.get(clave, 0)
+        anterior[clave] = resultante
+        if not delta: continue
+        razon = (razon or '').lower()
+        motivo = 'IMPORTACION' if 'import' in razon else 'VENTA' if 'venta' in razon or 'pedido' in razon else 'AJUSTE'
+        lote.append(Movimiento(producto_id=producto_id, sucursal_id=sucursal_id, delta=delta, cantidad_resultante=resultante,
+                               motivo=motivo, usuario_id=usuario_id if usuario_id in usuarios else None, fecha=fecha))
+        if len(lote) >= 2000:
+            Movimiento.objects.bulk_create(lote); lote = []
+    Movimiento.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_reservas_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('cantidad_resultante', models.PositiveIntegerField()),
+                ('motivo', models.CharField(choices=[('VENTA', 'Venta'), ('AJUSTE', 'Ajuste'), ('TRASLADO', 'Traslado'), ('DEVOLUCION', 'Devolución'), ('IMPORTACION', 'Importación')], max_length=12)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='api.pedido')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='api.producto')),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='api.sucursal')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copiar_historial, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='HistoricalInventario',
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['-fecha', '-id'], name='movimiento_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', '-fecha', '-id'], name='movimiento_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['sucursal', '-fecha', '-id'], name='movimiento_suc_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_kardex_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_movimiento', models.BigIntegerField(default=0)),
+                ('stock', models.JSONField(default=dict)),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes', to='api.sucursal')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sucursal', 'fecha'], name='corte_suc_fecha_idx')],
+            },
+        ),
+    ]
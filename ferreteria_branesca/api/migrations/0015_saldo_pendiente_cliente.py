@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:29
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_saldos(apps, schema_editor):
+    """Saldo inicial de cada cliente en un solo UPDATE (suma de total - monto_recibido de sus pendientes)."""
+    Cliente = apps.get_model('api', 'Cliente')
+    Pedido = apps.get_model('api', 'Pedido')
+    campo = DecimalField(max_digits=14, decimal_places=2)
+    deuda = (Pedido.objects.filter(cliente=OuterRef('pk'), estado='PENDIENTE').values('cliente')
+             .annotate(s=Sum(F('total') - F('monto_recibido'), output_field=campo)).values('s')[:1])
+    Cliente.objects.update(saldo_pendiente=Coalesce(Subquery(deuda), Value(0), output_field=campo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_cortes_inventario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='saldo_pendiente',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_saldo_pendiente_cliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', 'cliente', 'fecha_vencimiento'], name='pedido_estado_cli_venc_idx'),
+        ),
+    ]
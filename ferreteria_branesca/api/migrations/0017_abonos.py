@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_indice_cartera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Abono',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('aplicado', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('cambio', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='abonos', to='api.cliente')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AplicacionAbono',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('abono', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aplicaciones', to='api.abono')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='abonos', to='api.pedido')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='abono',
+            index=models.Index(fields=['cliente', '-fecha'], name='abono_cliente_fecha_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='aplicacionabono',
+            unique_together={('abono', 'pedido')},
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_abonos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalpedido',
+            name='mora',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='historicalpedido',
+            name='vencido',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='mora',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='vencido',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['vencido', '-mora', '-id'], name='pedido_vencido_mora_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def resumir_historico(apps, schema_editor):
+    """Resumen inicial: una consulta agrupada sobre Pedido y un bulk_create."""
+    Pedido = apps.get_model('api', 'Pedido')
+    VentaDiaria = apps.get_model('api', 'VentaDiaria')
+    filas = (Pedido.objects.order_by().annotate(dia=TruncDate('fecha_pedido'))
+             .values_list('dia', 'sucursal_id', 'vendedor_id', 'metodo_pago', 'estado')
+             .annotate(n=Count('id'), suma=Sum('total')))
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(fecha=dia, sucursal_id=suc, vendedor_id=vend, metodo_pago=metodo, estado=estado, pedidos=n, total=suma or 0)
+        for dia, suc, vend, metodo, estado, n, suma in filas
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_mora_materializada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('metodo_pago', models.CharField(max_length=50)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente de Pago'), ('PAGADO', 'Pagado'), ('EN_PROCESO', 'En Proceso'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado'), ('DEVOLUCION', 'Devolución')], max_length=15)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucursal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.sucursal')),
+                ('vendedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('fecha', 'sucursal', 'vendedor', 'metodo_pago', 'estado')},
+            },
+        ),
+        migrations.RunPython(resumir_historico, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Sucursal, VersionCatalogo
+
+
+class CatalogoCondicionalMixin:
+    """
+    GET condicional (ETag / Last-Modified) para vistas del catálogo.
+
+    El ETag sale de VersionCatalogo (global + la sucursal cuyo stock se muestra,
+    que suben las señales de Producto, Categoria e Inventario) y de la URL pedida. Si el
+    cliente manda un If-None-Match vigente se responde 304 sin tocar las tablas de
+    productos ni correr los serializers.
+    """
+    condicional_actions = ('list', 'retrieve')
+
+    def catalogo_etag(self, request, version, sucursal_id):
+        firma = hashlib.md5(request.get_full_path().encode()).hexdigest()[:12]
+        return f'W/"v{version}-s{sucursal_id or 0}-{firma}"'
+
+    def dispatch(self, request, *args, **kwargs):
+        self._validadores = self.catalogo_version = None
+        return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)  # autenticación y permisos primero
+        if request.method in ('GET', 'HEAD') and self.action in self.condicional_actions:
+            sucursal_id = Sucursal.id_catalogo(request.user) if getattr(self, 'stock_por_sucursal', False) else None
+            version, modificado = VersionCatalogo.vigente(sucursal_id)
+            self.catalogo_version = (version, sucursal_id)
+            self._validadores = (self.catalogo_etag(request, version, sucursal_id), modificado)
+
+    def handle_conditional(self, request):
+        if not self._validadores: return False
+        etag, modificado = self._validadores
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags or etag.removeprefix('W/') in etags
+        desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return desde is not None and int(modificado.timestamp()) <= desde
+
+    def list(self, request, *args, **kwargs):
+        if self.handle_conditional(request): return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.handle_conditional(request): return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._validadores and response.status_code in (200, 304):
+            etag, modificado = self._validadores
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(modificado.timestamp())
+            patch_vary_headers(response, ['Authorization'])
+        return response
@@ -4,7 +4,10 @@ from django.core.validators import RegexValidator, MinValueValidator
 from simple_history.models import HistoricalRecords
 from decimal import Decimal 
 from datetime import timedelta, date
-from django.db.models import Sum
+from django.db.models import Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.utils import timezone
 
 # --- Validadores ---
 solo_letras = RegexValidator(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', 'Solo se permiten letras y espacios.')
@@ -18,6 +21,16 @@ class Sucursal(models.Model):
     direccion = models.TextField()
     def __str__(self): return self.nombre
 
+    @classmethod
+    def id_catalogo(cls, usuario=None):
+        # Sucursal cuyo stock se muestra: la del empleado, o la de respaldo para
+        # el público (settings.SUCURSAL_CATALOGO_ID; si no está definida, la primera creada)
+        if usuario is not None and getattr(usuario, 'sucursal_id', None):
+            return usuario.sucursal_id
+        if settings.SUCURSAL_CATALOGO_ID:
+            return settings.SUCURSAL_CATALOGO_ID
+        return cls.objects.order_by('id').values_list('id', flat=True).first()
+
 # 2. Usuario (SOLO EMPLEADOS - LOGIN)
 class Usuario(AbstractUser):
     class Rol(models.TextChoices):
@@ -27,6 +40,9 @@ class Usuario(AbstractUser):
 
     rol = models.CharField(max_length=10, choices=Rol.choices, default=Rol.VENDEDOR)
     sucursal = models.ForeignKey('Sucursal', on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=['-date_joined', '-id'], name='usuario_fecha_alta_id_idx')]
     
     def __str__(self): return self.username
 
@@ -41,17 +57,20 @@ class Cliente(models.Model):
     # Datos Financieros
     limite_credito = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     dias_credito = models.PositiveIntegerField(default=0, verbose_name="Días de Plazo")
+    # Suma de (total - monto_recibido) de sus pedidos PENDIENTE; se mantiene al vender/abonar/cancelar (api/cartera.py)
+    saldo_pendiente = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx')]
+
     def __str__(self): return f"{self.nombre} ({self.ruc or 'S/R'})"
 
     @property
     def deuda_actual(self):
-        # Lógica FIFO Real: Sumamos (Total - Lo pagado) de pedidos pendientes
-        pendientes = self.pedidos.filter(estado='PENDIENTE')
-        deuda = sum((p.total - p.monto_recibido) for p in pendientes)
-        return deuda
+        # Saldo desnormalizado: no recorre los pedidos (ver conciliar_saldos)
+        return self.saldo_pendiente
 
 # 4. Direccion
 class Direccion(models.Model):
@@ -70,6 +89,11 @@ class Categoria(models.Model):
     def __str__(self): return self.nombre
 
 # 6. Producto
+class ProductoQuerySet(models.QuerySet):
+    def con_stock(self, sucursal_id):
+        # Anota 'stock_sucursal' (existencia menos reservas vigentes) en la misma consulta
+        return self.annotate(stock_sucursal=Inventario.disponible('pk', sucursal_id))
+
 class Producto(models.Model):
     sku = models.CharField(max_length=50, unique=True)
     nombre = models.CharField(max_length=255)
@@ -77,7 +101,17 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     categoria = models.ForeignKey(Categoria, related_name='productos', on_delete=models.SET_NULL, null=True, blank=True)
     imagen = models.ImageField(upload_to='productos/', null=True, blank=True)
+    miniaturas = models.JSONField(default=dict, blank=True, editable=False)  # rutas WebP (api/thumbnails.py)
     history = HistoricalRecords()
+
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx'),
+            models.Index(fields=['categoria', 'nombre', 'id'], name='producto_cat_nombre_idx'),
+            models.Index(fields=['precio'], name='producto_precio_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         self.sku = self.sku.upper()
@@ -86,13 +120,59 @@ class Producto(models.Model):
 
 # 7. Inventario
 class Inventario(models.Model):
+    # Los cambios de stock se auditan en MovimientoInventario (no en una copia de la fila)
     producto = models.ForeignKey(Producto, related_name='inventarios', on_delete=models.CASCADE)
     sucursal = models.ForeignKey(Sucursal, related_name='inventarios', on_delete=models.CASCADE)
     cantidad = models.PositiveIntegerField(default=0)
-    history = HistoricalRecords()
-    class Meta: unique_together = ('producto', 'sucursal')
+    class Meta:
+        unique_together = ('producto', 'sucursal')
+        indexes = [models.Index(fields=['sucursal', 'producto', 'cantidad'], name='inventario_suc_prod_cant_idx')]
     def __str__(self): return f"{self.producto.nombre} en {self.sucursal.nombre}: {self.cantidad}"
 
+    @staticmethod
+    def disponible(producto_ref, sucursal_id):
+        # Expresión: cantidad en la sucursal menos reservas web vigentes (ver api/reservas.py)
+        stock = Inventario.objects.filter(producto=OuterRef(producto_ref), sucursal_id=sucursal_id).values('cantidad')[:1]
+        reservado = (ReservaStock.objects.filter(producto=OuterRef(producto_ref), sucursal_id=sucursal_id, expira__gt=timezone.now())
+                     .values('producto').annotate(total=Sum('cantidad')).values('total')[:1])
+        return Coalesce(Subquery(stock), Value(0)) - Coalesce(Subquery(reservado), Value(0))
+
+# 7b. Kardex: movimientos de inventario (solo se agregan filas, ver api/movimientos.py)
+class MovimientoInventario(models.Model):
+    class Motivo(models.TextChoices):
+        VENTA = 'VENTA', 'Venta'
+        AJUSTE = 'AJUSTE', 'Ajuste'
+        TRASLADO = 'TRASLADO', 'Traslado'
+        DEVOLUCION = 'DEVOLUCION', 'Devolución'
+        IMPORTACION = 'IMPORTACION', 'Importación'
+
+    producto = models.ForeignKey(Producto, related_name='movimientos', on_delete=models.CASCADE)
+    sucursal = models.ForeignKey(Sucursal, related_name='movimientos', on_delete=models.CASCADE)
+    delta = models.IntegerField()  # con signo: -3 = salieron 3 unidades
+    cantidad_resultante = models.PositiveIntegerField()
+    motivo = models.CharField(max_length=12, choices=Motivo.choices)
+    pedido = models.ForeignKey('Pedido', related_name='movimientos', on_delete=models.SET_NULL, null=True, blank=True)
+    usuario = models.ForeignKey(Usuario, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='movimiento_fecha_id_idx'),
+            models.Index(fields=['producto', '-fecha', '-id'], name='movimiento_prod_fecha_idx'),
+            models.Index(fields=['sucursal', '-fecha', '-id'], name='movimiento_suc_fecha_idx'),
+        ]
+    def __str__(self): return f"{self.producto_id}@{self.sucursal_id} {self.delta:+d} = {self.cantidad_resultante}"
+
+# 7c. Corte periódico de stock por sucursal (comando `corte_inventario`, ver api/movimientos.py)
+class CorteInventario(models.Model):
+    sucursal = models.ForeignKey(Sucursal, related_name='cortes', on_delete=models.CASCADE)
+    fecha = models.DateTimeField(default=timezone.now)
+    ultimo_movimiento = models.BigIntegerField(default=0)  # id del último MovimientoInventario incluido
+    stock = models.JSONField(default=dict)  # {"producto_id": cantidad}, solo cantidades distintas de 0
+    class Meta:
+        indexes = [models.Index(fields=['sucursal', 'fecha'], name='corte_suc_fecha_idx')]
+    def __str__(self): return f"Corte {self.sucursal_id} @ {self.fecha:%Y-%m-%d %H:%M}"
+
 # 8. Pedido
 class Pedido(models.Model):
     class EstadoPedido(models.TextChoices):
@@ -104,6 +184,8 @@ class Pedido(models.Model):
         DEVOLUCION = 'DEVOLUCION', 'Devolución'
     
     cliente = models.ForeignKey(Cliente, related_name='pedidos', on_delete=models.SET_NULL, null=True, blank=True)
+    # Comprador de la tienda web (checkout desde CarritoItem)
+    usuario = models.ForeignKey(Usuario, related_name='pedidos_web', on_delete=models.SET_NULL, null=True, blank=True)
     vendedor = models.ForeignKey(Usuario, related_name='ventas_realizadas', on_delete=models.SET_NULL, null=True, blank=True)
     
     sucursal = models.ForeignKey(Sucursal, on_delete=models.SET_NULL, null=True, blank=True)
@@ -117,32 +199,70 @@ class Pedido(models.Model):
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     monto_recibido = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     tasa_mora = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, verbose_name="Tasa Mora %")
+    # Los materializa cada noche `actualizar_mora` (api/cartera.py) para poder filtrar y ordenar en SQL
+    vencido = models.BooleanField(default=False, editable=False)
+    mora = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
     
     estado = models.CharField(max_length=15, choices=EstadoPedido.choices, default=EstadoPedido.PENDIENTE)
     metodo_pago = models.CharField(max_length=50, default='EFECTIVO')
     transaction_id = models.CharField(max_length=100, null=True, blank=True)
+    # Clave que genera la terminal para ventas hechas sin conexión (ver api/sincronizacion.py)
+    clave_offline = models.CharField(max_length=64, null=True, blank=True)
     
     history = HistoricalRecords()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-fecha_pedido', '-id'], name='pedido_fecha_id_idx'),
+            # Cartera: pendientes agrupados por cliente (antigüedad de saldos)
+            models.Index(fields=['estado', 'cliente', 'fecha_vencimiento'], name='pedido_estado_cli_venc_idx'),
+            # /gestion-pedidos/?vencido=true&ordering=-mora
+            models.Index(fields=['vencido', '-mora', '-id'], name='pedido_vencido_mora_idx'),
+        ]
+        constraints = [models.UniqueConstraint(fields=['clave_offline'], condition=models.Q(clave_offline__isnull=False),
+                                               name='pedido_clave_offline_uniq')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Deuda tal como está en la base: la señal post_save ajusta el saldo del cliente por diferencia
+        instancia = super().from_db(db, field_names, values)
+        if {'cliente_id', 'estado', 'total', 'monto_recibido'} <= set(field_names):
+            instancia._deuda_guardada = (instancia.cliente_id, instancia.deuda_cliente())
+        if {'fecha_pedido', 'sucursal_id', 'vendedor_id', 'metodo_pago', 'estado', 'total'} <= set(field_names):
+            instancia._venta_guardada = instancia.venta_resumen()
+        return instancia
+
+    def deuda_cliente(self):
+        # Lo que este pedido suma al saldo_pendiente de su cliente
+        if not self.cliente_id or self.estado != 'PENDIENTE': return Decimal('0')
+        return Decimal(str(self.total)) - Decimal(str(self.monto_recibido))
+
+    def venta_resumen(self):
+        # (clave de VentaDiaria, total) con la que este pedido cuenta en el resumen diario
+        if not self.fecha_pedido: return None
+        clave = (timezone.localdate(self.fecha_pedido), self.sucursal_id, self.vendedor_id, self.metodo_pago, self.estado)
+        return clave, Decimal(str(self.total))
+
     def save(self, *args, **kwargs):
         # Calculamos vencimiento basado en el CLIENTE
         if not self.id and self.cliente and self.cliente.dias_credito > 0:
             self.fecha_vencimiento = date.today() + timedelta(days=self.cliente.dias_credito)
             
-        # Si es venta a crédito, nace como PENDIENTE
-        if self.metodo_pago == 'CREDITO':
-            self.estado = 'PENDIENTE'
-        elif self.metodo_pago == 'EFECTIVO' or self.metodo_pago == 'TARJETA':
-            # Si paga de una vez, nace como PAGADO
-            self.estado = 'PAGADO'
+        # Estado inicial según el método de pago (solo al crear: después lo cambian
+        # los abonos y las cancelaciones, y no debe volver a PENDIENTE/PAGADO solo)
+        if not self.id:
+            if self.metodo_pago == 'CREDITO':
+                self.estado = 'PENDIENTE'
+            elif self.metodo_pago == 'EFECTIVO' or self.metodo_pago == 'TARJETA':
+                self.estado = 'PAGADO'
 
         super().save(*args, **kwargs)
 
     @property
     def total_con_mora(self):
-        if self.estado == 'PENDIENTE' and self.fecha_vencimiento and self.fecha_vencimiento < date.today():
-            multa = self.total * (self.tasa_mora / 100)
-            return self.total + multa
+        # La mora guardada es la de la última corrida de `actualizar_mora`
+        if self.estado == 'PENDIENTE' and self.vencido:
+            return self.total + self.mora
         return self.total
 
 # 9. DetallePedido
@@ -154,6 +274,37 @@ class DetallePedido(models.Model):
     class Meta: unique_together = ('pedido', 'producto')
     def __str__(self): return f"{self.cantidad} x {self.producto.nombre}"
 
+# 9b. Abono: pago a la cuenta de crédito de un cliente, repartido FIFO entre sus pedidos (ver api/cartera.py)
+class Abono(models.Model):
+    cliente = models.ForeignKey(Cliente, related_name='abonos', on_delete=models.SET_NULL, null=True, blank=True)
+    monto = models.DecimalField(max_digits=12, decimal_places=2)  # lo que entregó el cliente
+    aplicado = models.DecimalField(max_digits=12, decimal_places=2)
+    cambio = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    usuario = models.ForeignKey(Usuario, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+    class Meta:
+        indexes = [models.Index(fields=['cliente', '-fecha'], name='abono_cliente_fecha_idx')]
+    def __str__(self): return f"Abono #{self.id}: C$ {self.aplicado} ({self.cliente_id})"
+
+class AplicacionAbono(models.Model):
+    abono = models.ForeignKey(Abono, related_name='aplicaciones', on_delete=models.CASCADE)
+    pedido = models.ForeignKey(Pedido, related_name='abonos', on_delete=models.CASCADE)
+    monto = models.DecimalField(max_digits=12, decimal_places=2)
+    class Meta: unique_together = ('abono', 'pedido')
+    def __str__(self): return f"Abono #{self.abono_id} -> Pedido #{self.pedido_id}: {self.monto}"
+
+# 9c. VentaDiaria: resumen de pedidos por día para los reportes (ver api/resumen_ventas.py)
+class VentaDiaria(models.Model):
+    fecha = models.DateField()
+    sucursal = models.ForeignKey(Sucursal, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    vendedor = models.ForeignKey(Usuario, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    metodo_pago = models.CharField(max_length=50)
+    estado = models.CharField(max_length=15, choices=Pedido.EstadoPedido.choices)
+    pedidos = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    class Meta: unique_together = ('fecha', 'sucursal', 'vendedor', 'metodo_pago', 'estado')
+    def __str__(self): return f"{self.fecha} {self.metodo_pago}/{self.estado}: {self.pedidos} pedidos, C$ {self.total}"
+
 # 10. CarritoItem
 class CarritoItem(models.Model):
     usuario = models.ForeignKey(Usuario, related_name='carrito', on_delete=models.CASCADE)
@@ -163,10 +314,94 @@ class CarritoItem(models.Model):
     class Meta: unique_together = ('usuario', 'producto')
     def __str__(self): return f"{self.usuario.username} - {self.producto.nombre}"
 
+# 10b. Reserva de stock mientras el cliente web paga (ver api/reservas.py)
+class ReservaStock(models.Model):
+    pedido = models.ForeignKey(Pedido, related_name='reservas', on_delete=models.CASCADE)
+    producto = models.ForeignKey(Producto, related_name='reservas', on_delete=models.CASCADE)
+    sucursal = models.ForeignKey(Sucursal, related_name='reservas', on_delete=models.CASCADE)
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField(db_index=True)
+    class Meta:
+        unique_together = ('pedido', 'producto')
+        indexes = [models.Index(fields=['sucursal', 'producto', 'expira'], name='reserva_suc_prod_expira_idx')]
+    def __str__(self): return f"Pedido #{self.pedido_id}: {self.cantidad} x {self.producto_id}"
+
 # 11. Recomendacion
 class Recomendacion(models.Model):
     producto_base = models.ForeignKey(Producto, related_name='recomendaciones_base', on_delete=models.CASCADE)
     producto_recomendado = models.ForeignKey(Producto, related_name='recomendaciones_sugeridas', on_delete=models.CASCADE)
     score = models.FloatField(default=0.0)
     class Meta: unique_together = ('producto_base', 'producto_recomendado'); ordering = ['-score']
-    def __str__(self): return f"{self.producto_base.nombre} -> {self.producto_recomendado.nombre}"
\ No newline at end of file
+    def __str__(self): return f"{self.producto_base.nombre} -> {self.producto_recomendado.nombre}"
+# 12. Índice de búsqueda (ver api/search.py)
+class PalabraBusqueda(models.Model):
+    producto = models.ForeignKey(Producto, related_name='palabras_busqueda', on_delete=models.CASCADE)
+    palabra = models.CharField(max_length=60, db_index=True)  # normalizada, sin tildes
+    peso = models.PositiveSmallIntegerField(default=1)
+    def __str__(self): return f"{self.palabra} -> {self.producto_id}"
+
+class TrigramaBusqueda(models.Model):
+    producto = models.ForeignKey(Producto, related_name='trigramas_busqueda', on_delete=models.CASCADE)
+    trigrama = models.CharField(max_length=3, db_index=True)
+    class Meta: unique_together = ('trigrama', 'producto')
+    def __str__(self): return f"{self.trigrama} -> {self.producto_id}"
+
+# 13. Versión del catálogo (ETag / Last-Modified y snapshots por sucursal)
+class VersionCatalogo(models.Model):
+    # Fila con sucursal NULL: productos y categorías (afecta a todas las sucursales).
+    # Una fila por sucursal: su inventario. Así un cambio de stock en León no
+    # invalida el catálogo cacheado de Masaya.
+    sucursal = models.OneToOneField(Sucursal, null=True, blank=True, on_delete=models.CASCADE, related_name='version_catalogo')
+    version = models.PositiveBigIntegerField(default=1)
+    actualizado = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def vigente(cls, sucursal_id=None):
+        """Devuelve ('<global>.<sucursal>', última modificación) en una sola consulta."""
+        from django.db.models import Q
+        filas = list(cls.objects.filter(Q(sucursal__isnull=True) | Q(sucursal_id=sucursal_id)).values_list('sucursal_id', 'version', 'actualizado'))
+        if not any(f[0] is None for f in filas):
+            g = cls.objects.get_or_create(sucursal=None)[0]
+            filas.append((None, g.version, g.actualizado))
+        glob = next(f for f in filas if f[0] is None)
+        suc = next((f for f in filas if f[0] is not None), (None, 0, glob[2]))
+        return f"{glob[1]}.{suc[1]}", max(glob[2], suc[2])
+
+    @classmethod
+    def incrementar(cls, sucursal_id=None):
+        from django.utils import timezone
+        filtro = {'sucursal__isnull': True} if sucursal_id is None else {'sucursal_id': sucursal_id}
+        if not cls.objects.filter(**filtro).update(version=models.F('version') + 1, actualizado=timezone.now()):
+            # La sucursal pudo borrarse en la misma transacción (p. ej. seed_db): no hay catálogo que invalidar
+            if sucursal_id is None or Sucursal.objects.filter(id=sucursal_id).exists():
+                cls.objects.get_or_create(sucursal_id=sucursal_id)
+
+    def __str__(self): return f"Catálogo v{self.version} ({self.sucursal_id or 'global'})"
+
+# 14. Co-ocurrencias de compra (insumo de Recomendacion, ver api/recomendaciones.py)
+class CoocurrenciaProducto(models.Model):
+    # Se guarda en ambos sentidos; la diagonal (a == a) es el número de pedidos con el producto
+    producto_a = models.ForeignKey(Producto, related_name='coocurrencias', on_delete=models.CASCADE)
+    producto_b = models.ForeignKey(Producto, related_name='+', on_delete=models.CASCADE)
+    conteo = models.PositiveIntegerField(default=0)
+    class Meta: unique_together = ('producto_a', 'producto_b')
+    def __str__(self): return f"{self.producto_a_id} + {self.producto_b_id}: {self.conteo}"
+
+class ProcesoRecomendaciones(models.Model):
+    # Estado del cálculo incremental (una sola fila)
+    ultimo_pedido_id = models.BigIntegerField(default=0)
+    total_pedidos = models.PositiveIntegerField(default=0)
+    ejecutado = models.DateTimeField(null=True, blank=True)
+    def __str__(self): return f"Recomendaciones hasta pedido #{self.ultimo_pedido_id}"
+
+# 15. Claves de idempotencia (reintentos del POS, ver api/idempotencia.py)
+class ClaveIdempotencia(models.Model):
+    usuario = models.ForeignKey(Usuario, related_name='+', on_delete=models.CASCADE)
+    ruta = models.CharField(max_length=100)
+    clave = models.CharField(max_length=100)
+    huella = models.CharField(max_length=64)  # sha256 del cuerpo de la petición
+    estado_http = models.PositiveSmallIntegerField()
+    respuesta = models.JSONField()
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+    class Meta: unique_together = ('usuario', 'ruta', 'clave')
+    def __str__(self): return f"{self.ruta} {self.clave}"
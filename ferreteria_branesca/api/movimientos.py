@@ -0,0 +1,111 @@
+"""
+Kardex de inventario (MovimientoInventario).
+
+Cada cambio de stock agrega una fila compacta: producto, sucursal, delta con
+signo, cantidad resultante, motivo, pedido y usuario. Las rutas masivas
+(ventas, sincronización, checkout web, importación) escriben sus movimientos
+con bulk_create; los guardados de una sola fila (InventarioViewSet, admin)
+pasan por las señales de Inventario.
+
+Stock a una fecha pasada: CorteInventario guarda cada cierto tiempo el vector
+de stock de una sucursal; stock_al_dia() parte del corte más cercano (o del
+stock actual) y suma o resta solo los movimientos entre ese corte y la fecha,
+así el costo queda acotado por un intervalo entre cortes y no por todo el kardex.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import CorteInventario, Inventario, MovimientoInventario
+
+Motivo = MovimientoInventario.Motivo
+LOTE_IN = 1000
+
+
+def registrar_descuentos(sucursal_id, pedidos, usuario=None, motivo=Motivo.VENTA):
+    """
+    Movimientos de stock ya descontado. pedidos = [(pedido_id, {producto_id: cantidad}), ...]
+    en el orden en que se aplicaron, así la cantidad resultante de cada fila es la real.
+    """
+    total = Counter()
+    for _, cantidades in pedidos: total.update(cantidades)
+    if not total: return []
+
+    saldo = {}
+    ids = list(total)
+    for i in range(0, len(ids), LOTE_IN):
+        saldo.update(Inventario.objects.filter(sucursal_id=sucursal_id, producto_id__in=ids[i:i + LOTE_IN])
+                     .values_list('producto_id', 'cantidad'))
+    for pid in total: saldo[pid] += total[pid]  # cantidad antes de la primera venta
+
+    filas = []
+    for pedido_id, cantidades in pedidos:
+        for pid, cantidad in cantidades.items():
+            saldo[pid] -= cantidad
+            filas.append(MovimientoInventario(producto_id=pid, sucursal_id=sucursal_id, delta=-cantidad,
+                                              cantidad_resultante=saldo[pid], motivo=motivo,
+                                              pedido_id=pedido_id, usuario=usuario))
+    return MovimientoInventario.objects.bulk_create(filas, batch_size=1000)
+
+
+def registrar_cambios(cambios, motivo=Motivo.AJUSTE, usuario=None, pedido_id=None):
+    """cambios = [(producto_id, sucursal_id, anterior, nueva), ...]; se omiten los que no cambian."""
+    filas = [MovimientoInventario(producto_id=pid, sucursal_id=sid, delta=nueva - anterior, cantidad_resultante=nueva,
+                                  motivo=motivo, pedido_id=pedido_id, usuario=usuario)
+             for pid, sid, anterior, nueva in cambios if nueva != anterior]
+    return MovimientoInventario.objects.bulk_create(filas, batch_size=1000)
+
+
+def tomar_corte(sucursal_id):
+    """Guarda el stock actual de la sucursal junto con el id del último movimiento que incluye."""
+    with transaction.atomic():
+        # Con las filas bloqueadas ninguna venta/ajuste de esta sucursal queda a medias entre stock y kardex
+        stock = {str(pid): cant for pid, cant in Inventario.objects.select_for_update()
+                 .filter(sucursal_id=sucursal_id).order_by('pk').values_list('producto_id', 'cantidad') if cant}
+        ultimo = MovimientoInventario.objects.filter(sucursal_id=sucursal_id).aggregate(m=Max('id'))['m'] or 0
+        return CorteInventario.objects.create(sucursal_id=sucursal_id, ultimo_movimiento=ultimo, stock=stock)
+
+
+def _deltas(movimientos):
+    filas = movimientos.values('producto_id').annotate(total=Sum('delta'), n=Count('id')).values_list('producto_id', 'total', 'n')
+    deltas, aplicados = {}, 0
+    for pid, total, n in filas:
+        deltas[pid] = total
+        aplicados += n
+    return deltas, aplicados
+
+
+def stock_al_dia(sucursal_id, hasta):
+    """
+    Stock de la sucursal con todos los movimientos anteriores a `hasta` (exclusivo).
+    Devuelve ({producto_id: cantidad}, base) donde base describe el punto de partida.
+    """
+    movimientos = MovimientoInventario.objects.filter(sucursal_id=sucursal_id)
+    cortes = CorteInventario.objects.filter(sucursal_id=sucursal_id)
+    anterior = cortes.filter(fecha__lte=hasta).order_by('-fecha').first()
+    posterior = cortes.filter(fecha__gt=hasta).order_by('fecha').first()
+
+    ahora = timezone.now()
+    if anterior and hasta - anterior.fecha <= (posterior.fecha if posterior else ahora) - hasta:
+        # Hacia adelante: corte + movimientos posteriores al corte y anteriores a la fecha
+        stock = {int(pid): cant for pid, cant in anterior.stock.items()}
+        deltas, aplicados = _deltas(movimientos.filter(id__gt=anterior.ultimo_movimiento, fecha__lt=hasta))
+        signo, base = 1, {'tipo': 'corte', 'fecha': anterior.fecha, 'corte_id': anterior.id}
+    elif posterior:
+        # Hacia atrás desde el corte siguiente (los movimientos que incluye tienen fecha <= la del corte)
+        stock = {int(pid): cant for pid, cant in posterior.stock.items()}
+        deltas, aplicados = _deltas(movimientos.filter(id__lte=posterior.ultimo_movimiento,
+                                                       fecha__gte=hasta, fecha__lte=posterior.fecha))
+        signo, base = -1, {'tipo': 'corte', 'fecha': posterior.fecha, 'corte_id': posterior.id}
+    else:
+        # El stock actual es el "corte" más cercano: se deshacen los movimientos desde la fecha
+        stock = dict(Inventario.objects.filter(sucursal_id=sucursal_id).values_list('producto_id', 'cantidad'))
+        deltas, aplicados = _deltas(movimientos.filter(fecha__gte=hasta))
+        signo, base = -1, {'tipo': 'actual', 'fecha': ahora}
+
+    for pid, total in deltas.items():
+        stock[pid] = stock.get(pid, 0) + signo * total
+    base['movimientos_aplicados'] = aplicados
+    return {pid: cant for pid, cant in stock.items() if cant}, base
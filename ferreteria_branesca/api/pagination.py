@@ -0,0 +1,187 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por llave (keyset / cursor) sobre el orden de la vista.
+
+    La vista define `keyset_ordering`, p.ej. ('nombre', 'id'). El último campo
+    debe ser único (id) para desempatar; así cada página se obtiene con un
+    WHERE (nombre, id) > (x, y) y cuesta lo mismo la primera que la página 500.
+
+    En campos que admiten NULL, el NULL cuenta como el valor más chico (primero en
+    orden ascendente, último en descendente) tanto en el ORDER BY como en el cursor.
+
+    Si la vista usa OrderingFilter, ?ordering=-mora reemplaza ese orden (solo
+    campos de `ordering_fields`) y se le agrega el desempate del keyset_ordering.
+
+    Clientes antiguos pueden pedir la lista completa con ?todos=true.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    full_list_query_param = 'todos'
+    default_ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.lista_completa(request):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self._orden(queryset.model, self.ordering))
+
+        reverse = False
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            reverse, valores = self.decode_cursor(cursor)
+            queryset = queryset.filter(self.keyset_filter(queryset.model, valores, reverse))
+        if reverse:
+            queryset = queryset.order_by(*self._orden(queryset.model, [self._invertir(campo) for campo in self.ordering]))
+
+        # Pedimos uno extra para saber si hay más páginas
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverse:
+            filas.reverse()
+
+        self.next_values = self.row_values(filas[-1]) if filas and (hay_mas or reverse) else None
+        self.previous_values = self.row_values(filas[0]) if filas and (cursor and (not reverse or hay_mas)) else None
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # --- Helpers ---
+    def lista_completa(self, request):
+        return request.query_params.get(self.full_list_query_param, '').lower() in ('1', 'true', 'si')
+
+    def get_ordering(self, view):
+        ordering = tuple(getattr(view, 'keyset_ordering', None) or self.default_ordering)
+        pedido = self.ordering_pedido(view)
+        if not pedido: return ordering
+        desempate = ordering[-1]
+        if desempate.lstrip('-') not in {campo.lstrip('-') for campo in pedido}: pedido.append(desempate)
+        return tuple(pedido)
+
+    def ordering_pedido(self, view):
+        # Mismo parámetro y lista blanca que OrderingFilter
+        filtro = next((f for f in getattr(view, 'filter_backends', ()) if issubclass(f, OrderingFilter)), None)
+        if filtro is None: return []
+        validos = set(getattr(view, 'ordering_fields', None) or ())
+        parametro = self.request.query_params.get(filtro.ordering_param, '')
+        return [campo.strip() for campo in parametro.split(',') if campo.strip().lstrip('-') in validos]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0: return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_next_link(self):
+        if self.next_values is None: return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(False, self.next_values))
+
+    def get_previous_link(self):
+        if self.previous_values is None: return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(True, self.previous_values))
+
+    def row_values(self, obj):
+        valores = []
+        for campo in self.ordering:
+            valor = obj
+            for parte in campo.lstrip('-').split('__'):
+                valor = getattr(valor, parte, None)
+            valores.append(valor)
+        return valores
+
+    def keyset_filter(self, model, valores, reverse):
+        # (a, b, c) > (x, y, z)  ==>  a > x  OR  (a = x AND b > y)  OR  (a = x AND b = y AND c > z)
+        condicion = Q(pk__in=[])
+        iguales = Q()
+        for campo, valor in zip(self.ordering, valores):
+            nombre = campo.lstrip('-')
+            valor = self._campo(model, nombre).to_python(valor)
+            descendente = campo.startswith('-') != reverse
+            if valor is None:
+                # NULL es el menor: después vienen los no nulos (asc) o nada (desc)
+                if not descendente: condicion |= iguales & Q(**{f'{nombre}__isnull': False})
+                iguales &= Q(**{f'{nombre}__isnull': True})
+                continue
+            siguiente = Q(**{f"{nombre}__{'lt' if descendente else 'gt'}": valor})
+            if descendente and self._campo(model, nombre).null: siguiente |= Q(**{f'{nombre}__isnull': True})
+            condicion |= iguales & siguiente
+            iguales &= Q(**{nombre: valor})
+        return condicion
+
+    def encode_cursor(self, reverse, valores):
+        payload = {'r': int(reverse), 'v': [self._serializar(v) for v in valores]}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            valores = payload['v']
+            if len(valores) != len(self.ordering): raise ValueError
+            return bool(payload.get('r')), valores
+        except (ValueError, KeyError, TypeError):
+            raise NotFound('Cursor inválido.')
+
+    def _orden(self, model, campos):
+        # Solo los campos nulos llevan NULLS FIRST/LAST: en el resto el ORDER BY sigue usando el índice
+        orden = []
+        for campo in campos:
+            nombre = campo.lstrip('-')
+            if not self._campo(model, nombre).null: orden.append(campo)
+            elif campo.startswith('-'): orden.append(F(nombre).desc(nulls_last=True))
+            else: orden.append(F(nombre).asc(nulls_first=True))
+        return orden
+
+    @staticmethod
+    def _invertir(campo):
+        return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+    @staticmethod
+    def _serializar(valor):
+        if isinstance(valor, (datetime, date)): return valor.isoformat()
+        if isinstance(valor, Decimal): return str(valor)
+        return valor
+
+    @staticmethod
+    def _campo(model, ruta):
+        partes = ruta.split('__')
+        for parte in partes[:-1]:
+            model = model._meta.get_field(parte).related_model
+        return model._meta.get_field(partes[-1])
@@ -0,0 +1,129 @@
+"""
+PDF que se escribe página por página para respuestas en streaming.
+
+ReportLab (canvas.Canvas) guarda todas las páginas hasta save(). LienzoProgresivo
+implementa el subconjunto de esa API que usan los reportes (setFont, drawString,
+drawRightString, drawCentredString, line, rect, setFillColorRGB, showPage, save)
+y, al cerrar cada página, escribe su contenido comprimido como objetos PDF. Los
+anchos de texto salen de las métricas de ReportLab (pdfmetrics).
+
+Se anotan los offsets de cada objeto para la tabla xref; el árbol de páginas, el
+catálogo y la xref se escriben al final. En memoria solo queda la página en curso
+más dos enteros por página (offset y número de objeto).
+
+    p = LienzoProgresivo(letter)
+    ... dibujar ...
+    p.showPage(); yield p.pendiente()
+    p.save(); yield p.pendiente()
+"""
+import zlib
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+CATALOGO, PAGINAS = 1, 2
+
+
+def _numero(valor):
+    return f'{valor:.2f}'.rstrip('0').rstrip('.') if isinstance(valor, float) else str(valor)
+
+
+def _texto(texto):
+    # Fuentes estándar con WinAnsiEncoding: cp1252 cubre tildes, ñ y °
+    crudo = str(texto).encode('cp1252', 'replace')
+    return b'(' + crudo.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class LienzoProgresivo:
+    def __init__(self, pagesize=letter):
+        self.ancho, self.alto = pagesize
+        self._salida = bytearray()
+        self._largo = 0
+        self._offsets = {}
+        self._siguiente = PAGINAS + 1
+        self._fuentes = {}   # nombre -> (recurso, número de objeto)
+        self._paginas = []
+        self._emitir(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._nueva()
+
+    # --- API de canvas.Canvas ---
+    def setFont(self, nombre, tamano):
+        self._fuente = (nombre, tamano)
+
+    def setFillColorRGB(self, r, g, b):
+        self._operar(f'{_numero(r)} {_numero(g)} {_numero(b)} rg')
+
+    def drawString(self, x, y, texto):
+        nombre, tamano = self._fuente
+        recurso = self._recurso(nombre)
+        self._codigo.append(f'BT /{recurso} {_numero(tamano)} Tf {_numero(x)} {_numero(y)} Td '.encode('ascii')
+                            + _texto(texto) + b' Tj ET')
+
+    def drawRightString(self, x, y, texto):
+        self.drawString(x - stringWidth(str(texto), *self._fuente), y, texto)
+
+    def drawCentredString(self, x, y, texto):
+        self.drawString(x - stringWidth(str(texto), *self._fuente) / 2, y, texto)
+
+    def line(self, x1, y1, x2, y2):
+        self._operar(f'{_numero(x1)} {_numero(y1)} m {_numero(x2)} {_numero(y2)} l S')
+
+    def rect(self, x, y, ancho, alto, stroke=1, fill=0):
+        pintura = {(1, 1): 'B', (0, 1): 'f', (1, 0): 'S'}.get((int(bool(stroke)), int(bool(fill))), 'n')
+        self._operar(f'{_numero(x)} {_numero(y)} {_numero(ancho)} {_numero(alto)} re {pintura}')
+
+    def showPage(self):
+        contenido = zlib.compress(b'\n'.join(self._codigo))
+        flujo = self._objeto(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(contenido)
+                             + contenido + b'\nendstream')
+        fuentes = ' '.join(f'/{recurso} {numero} 0 R' for recurso, numero in self._fuentes.values())
+        self._paginas.append(self._objeto(
+            f'<< /Type /Page /Parent {PAGINAS} 0 R /MediaBox [0 0 {_numero(self.ancho)} {_numero(self.alto)}] '
+            f'/Resources << /Font << {fuentes} >> >> /Contents {flujo} 0 R >>'.encode('ascii')))
+        self._nueva()
+
+    def save(self):
+        if self._codigo: self.showPage()
+        hijos = ' '.join(f'{numero} 0 R' for numero in self._paginas)
+        self._objeto(f'<< /Type /Pages /Kids [{hijos}] /Count {len(self._paginas)} >>'.encode('ascii'), PAGINAS)
+        self._objeto(f'<< /Type /Catalog /Pages {PAGINAS} 0 R >>'.encode('ascii'), CATALOGO)
+        total = self._siguiente
+        xref = self._largo
+        filas = [b'xref\n0 %d\n0000000000 65535 f \n' % total]
+        filas += [b'%010d 00000 n \n' % self._offsets[n] for n in range(1, total)]
+        filas.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (total, CATALOGO, xref))
+        self._emitir(b''.join(filas))
+
+    # --- Streaming ---
+    def pendiente(self):
+        """Bytes escritos desde la última llamada (para el generador de la respuesta)."""
+        datos = bytes(self._salida)
+        self._salida.clear()
+        return datos
+
+    # --- Helpers ---
+    def _nueva(self):
+        # Cada página empieza con el estado por defecto de ReportLab
+        self._codigo = []
+        self._fuente = ('Helvetica', 12)
+
+    def _operar(self, operador):
+        self._codigo.append(operador.encode('ascii'))
+
+    def _recurso(self, nombre):
+        if nombre not in self._fuentes:
+            numero = self._objeto(f'<< /Type /Font /Subtype /Type1 /BaseFont /{nombre} '
+                                  f'/Encoding /WinAnsiEncoding >>'.encode('ascii'))
+            self._fuentes[nombre] = (f'F{len(self._fuentes) + 1}', numero)
+        return self._fuentes[nombre][0]
+
+    def _objeto(self, cuerpo, numero=None):
+        if numero is None:
+            numero, self._siguiente = self._siguiente, self._siguiente + 1
+        self._offsets[numero] = self._largo
+        self._emitir(b'%d 0 obj\n' % numero + cuerpo + b'\nendobj\n')
+        return numero
+
+    def _emitir(self, datos):
+        self._salida += datos
+        self._largo += len(datos)
@@ -0,0 +1,161 @@
+"""
+Recomendaciones "los clientes que compraron X también compraron Y".
+
+Se arma la matriz pedidos x productos (dispersa, binaria) con los pedidos
+nuevos desde la última corrida y la co-ocurrencia sale de Xᵀ·X. Los conteos se
+acumulan en CoocurrenciaProducto, así cada corrida solo procesa lo nuevo.
+
+Para cada producto afectado se calcula el lift
+    lift(a, b) = conteo(a, b) · N / (conteo(a) · conteo(b))
+y se guardan los top-K en Recomendacion (bulk_update de los pares que ya
+existen y bulk_create de los nuevos: SQL Server no soporta update_conflicts).
+
+Solo se procesan pedidos hasta una marca confirmada: los creados hace más de
+MARGEN_PEDIDOS. Un pedido con id menor que todavía no se confirmaba cuando
+empezó la corrida no queda saltado para siempre.
+
+Los pedidos cancelados después de procesados siguen contando hasta la próxima
+corrida con --completo.
+"""
+from array import array
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from .models import CoocurrenciaProducto, DetallePedido, Pedido, ProcesoRecomendaciones, Recomendacion
+
+LOTE_IN = 1000  # SQL Server admite ~2100 parámetros por consulta
+MARGEN_PEDIDOS = timedelta(minutes=5)  # más que cualquier transacción de venta
+
+
+def _en_lotes(ids, n=LOTE_IN):
+    ids = list(ids)
+    for i in range(0, len(ids), n):
+        yield ids[i:i + n]
+
+
+def _leer_detalles(desde, hasta):
+    pedidos, productos = array('q'), array('q')
+    qs = (DetallePedido.objects
+          .filter(pedido_id__gt=desde, pedido_id__lte=hasta)
+          .exclude(pedido__estado__in=[Pedido.EstadoPedido.CANCELADO, Pedido.EstadoPedido.DEVOLUCION])
+          .values_list('pedido_id', 'producto_id'))
+    for pedido_id, producto_id in qs.iterator(chunk_size=20000):
+        pedidos.append(pedido_id); productos.append(producto_id)
+    return np.frombuffer(pedidos, dtype=np.int64), np.frombuffer(productos, dtype=np.int64)
+
+
+def _acumular_coocurrencias(pedido_ids, producto_ids):
+    """Suma Xᵀ·X de los pedidos nuevos a CoocurrenciaProducto. Devuelve (productos tocados, pedidos)."""
+    pedidos_u, fila = np.unique(pedido_ids, return_inverse=True)
+    productos_u, col = np.unique(producto_ids, return_inverse=True)
+    X = sparse.csr_matrix((np.ones(len(fila), dtype=np.int32), (fila, col)), shape=(len(pedidos_u), len(productos_u)))
+    X.data[:] = 1
+    C = (X.T @ X).tocoo()
+    a, b, conteo = productos_u[C.row], productos_u[C.col], C.data
+
+    previos = {}
+    for ids in _en_lotes(productos_u.tolist()):
+        for pk, pa, pb, c in (CoocurrenciaProducto.objects.filter(producto_a_id__in=ids)
+                              .values_list('id', 'producto_a_id', 'producto_b_id', 'conteo')):
+            previos[(pa, pb)] = (pk, c)
+
+    filas = []
+    for pa, pb, c in zip(a.tolist(), b.tolist(), conteo.tolist()):
+        pk, anterior = previos.get((pa, pb), (None, 0))
+        filas.append(CoocurrenciaProducto(id=pk, producto_a_id=pa, producto_b_id=pb, conteo=int(c) + anterior))
+    CoocurrenciaProducto.objects.bulk_update([f for f in filas if f.id is not None], ['conteo'], batch_size=1000)
+    CoocurrenciaProducto.objects.bulk_create([f for f in filas if f.id is None], batch_size=1000)
+    return productos_u, len(pedidos_u)
+
+
+def _top_k(afectados, total_pedidos, top_k, min_soporte):
+    """Lift vectorizado para los productos base afectados; devuelve arrays (base, recomendado, score)."""
+    A, B, V = array('q'), array('q'), array('q')
+    for ids in _en_lotes(afectados):
+        for pa, pb, c in CoocurrenciaProducto.objects.filter(producto_a_id__in=ids).values_list('producto_a_id', 'producto_b_id', 'conteo'):
+            A.append(pa); B.append(pb); V.append(c)
+    A, B, V = (np.frombuffer(x, dtype=np.int64) for x in (A, B, V))
+
+    diagonal = A == B
+    frecuencia = dict(zip(A[diagonal].tolist(), V[diagonal].tolist()))
+    faltan = set(B.tolist()) - frecuencia.keys()
+    for ids in _en_lotes(faltan):
+        frecuencia.update(CoocurrenciaProducto.objects.filter(producto_a_id__in=ids, producto_b_id=F('producto_a_id'))
+                          .values_list('producto_a_id', 'conteo'))
+
+    mascara = ~diagonal & (V >= min_soporte)
+    A, B, V = A[mascara], B[mascara], V[mascara].astype(np.float64)
+    if not len(A): return A, B, V
+    fa = np.array([frecuencia[x] for x in A.tolist()], dtype=np.float64)
+    fb = np.array([frecuencia.get(x, 0) for x in B.tolist()], dtype=np.float64)
+    lift = np.divide(V * total_pedidos, fa * fb, out=np.zeros_like(V), where=(fa * fb) > 0)
+
+    orden = np.lexsort((-V, -lift, A))  # por base, luego lift desc (desempata soporte)
+    A, B, lift = A[orden], B[orden], lift[orden]
+    _, inicio_grupo, grupo = np.unique(A, return_index=True, return_inverse=True)
+    rango = np.arange(len(A)) - inicio_grupo[grupo]
+    keep = rango < top_k
+    return A[keep], B[keep], lift[keep]
+
+
+def _marca_confirmada():
+    """
+    Id más alto que ya no puede tener pedidos menores sin confirmar: el último creado
+    antes de MARGEN_PEDIDOS y anterior a cualquier pedido más reciente (las ventas
+    sincronizadas llegan con fecha atrasada pero id nuevo).
+    """
+    corte = timezone.now() - MARGEN_PEDIDOS
+    antiguos = Pedido.objects.filter(fecha_pedido__lt=corte)
+    primero_reciente = Pedido.objects.filter(fecha_pedido__gte=corte).aggregate(m=Min('id'))['m']
+    if primero_reciente: antiguos = antiguos.filter(id__lt=primero_reciente)
+    return antiguos.aggregate(m=Max('id'))['m'] or 0
+
+
+def calcular(completo=False, top_k=10, min_soporte=2):
+    with transaction.atomic():
+        ProcesoRecomendaciones.objects.get_or_create(pk=1)
+        estado = ProcesoRecomendaciones.objects.select_for_update().get(pk=1)
+        if completo:
+            CoocurrenciaProducto.objects.all().delete()
+            Recomendacion.objects.all().delete()
+            estado.ultimo_pedido_id = estado.total_pedidos = 0
+
+        tope = max(_marca_confirmada(), estado.ultimo_pedido_id)
+        pedido_ids, producto_ids = _leer_detalles(estado.ultimo_pedido_id, tope)
+        resumen = {'pedidos_nuevos': 0, 'productos_afectados': 0, 'recomendaciones': 0}
+
+        if len(pedido_ids):
+            tocados, n_pedidos = _acumular_coocurrencias(pedido_ids, producto_ids)
+            estado.total_pedidos += n_pedidos
+
+            # Cambia el ranking de los tocados y de sus vecinos (la matriz es simétrica)
+            afectados = set()
+            for ids in _en_lotes(tocados.tolist()):
+                afectados.update(CoocurrenciaProducto.objects.filter(producto_b_id__in=ids).values_list('producto_a_id', flat=True).distinct())
+            afectados = sorted(afectados)
+
+            base, recomendado, score = _top_k(afectados, estado.total_pedidos, top_k, min_soporte)
+            existentes = {}
+            for ids in _en_lotes(afectados):
+                existentes.update(((a, b), pk) for pk, a, b in Recomendacion.objects.filter(producto_base_id__in=ids)
+                                  .values_list('id', 'producto_base_id', 'producto_recomendado_id'))
+            nuevas = [Recomendacion(id=existentes.get((a, b)), producto_base_id=a, producto_recomendado_id=b, score=round(s, 4))
+                      for a, b, s in zip(base.tolist(), recomendado.tolist(), score.tolist())]
+            Recomendacion.objects.bulk_update([r for r in nuevas if r.id is not None], ['score'], batch_size=1000)
+            Recomendacion.objects.bulk_create([r for r in nuevas if r.id is None], batch_size=1000)
+            vigentes = set(zip(base.tolist(), recomendado.tolist()))
+            obsoletas = [pk for clave, pk in existentes.items() if clave not in vigentes]
+            for ids in _en_lotes(obsoletas):
+                Recomendacion.objects.filter(id__in=ids).delete()
+
+            resumen.update(pedidos_nuevos=n_pedidos, productos_afectados=len(afectados), recomendaciones=len(nuevas))
+
+        estado.ultimo_pedido_id = tope
+        estado.ejecutado = timezone.now()
+        estado.save()
+        return resumen
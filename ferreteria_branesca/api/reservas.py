@@ -0,0 +1,138 @@
+"""
+Checkout web con reservas de stock que expiran.
+
+1. reservar_carrito(): convierte el CarritoItem del usuario en un Pedido
+   PENDIENTE y aparta el stock con filas ReservaStock (expiran en
+   RESERVA_MINUTOS). La transacción es corta: no se retienen bloqueos
+   mientras el cliente paga.
+2. confirmar_pago(): con el transaction_id de PayPal descuenta el stock
+   reservado, borra las reservas y marca el pedido PAGADO.
+3. liberar_expiradas(): el barrido periódico (comando `liberar_reservas`)
+   cancela en bloque los pedidos cuyas reservas vencieron y las borra.
+
+El stock que ven los demás usuarios ya descuenta las reservas vigentes
+(Inventario.disponible / Producto.objects.con_stock).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import resumen_ventas
+from .cartera import ajustar_saldos, deudas_de
+from .history import historial_desde_queryset
+from .models import CarritoItem, DetallePedido, Direccion, Pedido, ReservaStock
+from .signals import marcar_catalogo_modificado
+from .stock import StockInsuficiente, aplicar_descuento, bloquear_stock, datos_productos
+
+METODO_WEB = 'PAYPAL'
+IVA = Decimal('1.15')
+
+
+class ErrorCheckout(Exception):
+    pass
+
+
+def _pendientes_web(usuario):
+    return Pedido.objects.filter(usuario=usuario, estado=Pedido.EstadoPedido.PENDIENTE, metodo_pago=METODO_WEB)
+
+
+def _cancelar(pedidos, usuario=None, motivo=''):
+    """
+    Cancela un queryset de pedidos y libera sus reservas (update + delete en bloque).
+    Solo toca los que siguen PENDIENTE con la fila bloqueada: un confirmar_pago() que
+    ganó la carrera deja el pedido PAGADO y aquí se salta. Llamar dentro de una transacción.
+    """
+    pendiente = Pedido.EstadoPedido.PENDIENTE
+    ids = list(Pedido.objects.select_for_update().filter(id__in=pedidos.values('id'), estado=pendiente)
+               .order_by('id').values_list('id', flat=True))
+    if not ids: return 0
+    sucursales = set(ReservaStock.objects.filter(pedido_id__in=ids).values_list('sucursal_id', flat=True).distinct())
+    deudas = deudas_de(Pedido.objects.filter(id__in=ids))
+    antes = resumen_ventas.resumen_de(Pedido.objects.filter(id__in=ids))
+    Pedido.objects.filter(id__in=ids, estado=pendiente).update(estado=Pedido.EstadoPedido.CANCELADO)
+    ajustar_saldos({cid: -deuda for cid, deuda in deudas.items()})
+    resumen_ventas.mover(antes, resumen_ventas.resumen_de(Pedido.objects.filter(id__in=ids)))
+    historial_desde_queryset(Pedido.objects.filter(id__in=ids), usuario=usuario, motivo=motivo)
+    ReservaStock.objects.filter(pedido_id__in=ids).delete()
+    for sucursal_id in sucursales: marcar_catalogo_modificado(sucursal_id)
+    return len(ids)
+
+
+def reservar_carrito(usuario, sucursal_id, direccion_id=None):
+    cantidades = dict(CarritoItem.objects.filter(usuario=usuario).values_list('producto_id', 'cantidad'))
+    cantidades = {pid: cant for pid, cant in cantidades.items() if cant > 0}
+    if not cantidades: raise ErrorCheckout('El carrito está vacío.')
+    direccion = Direccion.objects.filter(id=direccion_id).first() if direccion_id else None
+    productos = datos_productos(cantidades)
+
+    with transaction.atomic():
+        # Un checkout anterior sin pagar deja de apartar stock
+        _cancelar(_pendientes_web(usuario), usuario, 'Reemplazado por un nuevo checkout')
+
+        existencias = bloquear_stock(sucursal_id, cantidades)
+        for pid, cantidad in cantidades.items():
+            if existencias.get(pid, (None, 0))[1] < cantidad:
+                nombre = productos[pid][0] if pid in productos else pid
+                raise StockInsuficiente(f'Sin stock suficiente: {nombre}')
+
+        subtotal = sum((productos[pid][1] * cant for pid, cant in cantidades.items()), Decimal('0'))
+        pedido = Pedido.objects.create(
+            usuario=usuario, sucursal_id=sucursal_id, metodo_pago=METODO_WEB, estado=Pedido.EstadoPedido.PENDIENTE,
+            total=(subtotal * IVA).quantize(Decimal('0.01')), direccion_envio=str(direccion) if direccion else None,
+        )
+        DetallePedido.objects.bulk_create([
+            DetallePedido(pedido=pedido, producto_id=pid, cantidad=cant, precio_unitario=productos[pid][1])
+            for pid, cant in cantidades.items()
+        ])
+        pedido.expira = timezone.now() + timedelta(minutes=settings.RESERVA_MINUTOS)
+        ReservaStock.objects.bulk_create([
+            ReservaStock(pedido=pedido, producto_id=pid, sucursal_id=sucursal_id, cantidad=cant, expira=pedido.expira)
+            for pid, cant in cantidades.items()
+        ])
+        marcar_catalogo_modificado(sucursal_id)
+    return pedido
+
+
+def confirmar_pago(usuario, pedido_id, transaction_id):
+    with transaction.atomic():
+        pedido = Pedido.objects.select_for_update().filter(id=pedido_id, usuario=usuario, metodo_pago=METODO_WEB).first()
+        if pedido is None: raise ErrorCheckout('Pedido no encontrado.')
+        if pedido.estado != Pedido.EstadoPedido.PENDIENTE:
+            raise ErrorCheckout('La reserva de este pedido expiró o fue cancelada.')
+
+        cantidades = dict(pedido.detalles.values_list('producto_id', 'cantidad'))
+        # Si la reserva venció pero el barrido no pasó todavía, se cobra igual si hay stock
+        existencias = bloquear_stock(pedido.sucursal_id, cantidades, excluir_pedido=pedido.id)
+        for pid, cantidad in cantidades.items():
+            if existencias.get(pid, (None, 0))[1] < cantidad:
+                raise StockInsuficiente(f'Sin stock suficiente para el producto {pid}')
+        aplicar_descuento(pedido.sucursal_id, existencias, cantidades, usuario, [(pedido.id, cantidades)])
+
+        ReservaStock.objects.filter(pedido=pedido).delete()
+        CarritoItem.objects.filter(usuario=usuario, producto_id__in=cantidades).delete()
+        pedido.estado = Pedido.EstadoPedido.PAGADO
+        pedido.transaction_id = transaction_id
+        pedido.save()
+    return pedido
+
+
+def liberar_pedido(pedido, usuario=None):
+    with transaction.atomic():
+        return _cancelar(Pedido.objects.filter(id=pedido.id, estado=Pedido.EstadoPedido.PENDIENTE),
+                         usuario, 'Cancelado por el usuario')
+
+
+def liberar_expiradas(ahora=None):
+    """Cancela los pedidos web con reservas vencidas y borra esas reservas. Devuelve cuántos pedidos."""
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        vencidos = Pedido.objects.filter(estado=Pedido.EstadoPedido.PENDIENTE, metodo_pago=METODO_WEB,
+                                         id__in=ReservaStock.objects.filter(expira__lte=ahora).values('pedido_id'))
+        cancelados = _cancelar(vencidos, motivo='Reserva expirada')
+        # Reservas vencidas de pedidos que ya no están pendientes (no deberían quedar, por si acaso)
+        ReservaStock.objects.filter(expira__lte=ahora).delete()
+    return cancelados
+
@@ -0,0 +1,148 @@
+"""
+Resumen diario de ventas (VentaDiaria) que leen los reportes.
+
+Una fila por (día, sucursal, vendedor, método de pago, estado) con la cantidad de
+pedidos y su total. Se mantiene en la misma transacción que el cambio del pedido:
+los guardados de un Pedido pasan por las señales (api/signals.py) y las rutas en
+bloque (sincronización, abonos, cancelaciones web) llaman a ajustar_resumen() con
+la diferencia. Una cancelación o un abono mueven el monto de una fila a otra, así
+los reportes suman filas por día en vez de recorrer todos los pedidos.
+
+reconstruir() recalcula un rango de fechas desde Pedido (comando
+`reconstruir_resumen_ventas`), para las cargas masivas o si algo se desfasa.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Pedido, VentaDiaria
+
+CLAVE = ('fecha', 'sucursal_id', 'vendedor_id', 'metodo_pago', 'estado')
+LOTE = 200
+POCAS_CLAVES = 3
+CERO = Decimal('0')
+
+
+def _filtro(clave):
+    return Q(**dict(zip(CLAVE, clave)))
+
+
+def sumar(resumen, signo=1, deltas=None):
+    """Acumula {clave: (pedidos, total)} en `deltas` (multiplicado por signo) y lo devuelve."""
+    deltas = {} if deltas is None else deltas
+    for clave, (pedidos, total) in resumen.items():
+        actual = deltas.get(clave, (0, CERO))
+        deltas[clave] = (actual[0] + signo * pedidos, actual[1] + signo * total)
+    return deltas
+
+
+def resumen_de_objetos(pedidos):
+    """{clave: (pedidos, total)} de pedidos ya cargados (sin consultas)."""
+    resumen = {}
+    for pedido in pedidos:
+        venta = pedido.venta_resumen()
+        if venta: sumar({venta[0]: (1, venta[1])}, deltas=resumen)
+    return resumen
+
+
+def resumen_de(pedidos):
+    """{clave: (pedidos, total)} de un queryset de pedidos (una consulta agrupada)."""
+    filas = (pedidos.order_by().annotate(dia=TruncDate('fecha_pedido'))
+             .values_list('dia', 'sucursal_id', 'vendedor_id', 'metodo_pago', 'estado')
+             .annotate(n=Count('id'), suma=Sum('total')))
+    return {tuple(fila[:5]): (fila[5], fila[6] or CERO) for fila in filas}
+
+
+def mover(antes, despues):
+    """Aplica despues - antes (resúmenes del mismo conjunto de pedidos antes y después del cambio)."""
+    ajustar_resumen(sumar(despues, deltas=sumar(antes, -1)))
+
+
+def ajustar_resumen(deltas, reintentar=True):
+    """
+    Suma {clave: (pedidos, total)} a VentaDiaria. Con pocas claves (un guardado) basta un
+    UPDATE por clave; en bloque, un SELECT de las filas existentes, un UPDATE CASE por lote
+    y un bulk_create para las claves nuevas.
+    """
+    deltas = {clave: d for clave, d in deltas.items() if d[0] or d[1]}
+    if not deltas: return
+    if len(deltas) <= POCAS_CLAVES:
+        # La fila del día casi siempre existe: solo las que no se actualizaron pasan a crearse
+        deltas = {clave: (n, suma) for clave, (n, suma) in deltas.items()
+                  if not VentaDiaria.objects.filter(_filtro(clave)).update(pedidos=F('pedidos') + n, total=F('total') + suma)}
+        _crear(deltas, reintentar)
+        return
+
+    claves = list(deltas)
+    existentes = {}
+    for i in range(0, len(claves), LOTE):
+        condicion = reduce(or_, (_filtro(c) for c in claves[i:i + LOTE]))
+        for fila in VentaDiaria.objects.filter(condicion).values_list('id', *CLAVE):
+            existentes[fila[1:]] = fila[0]
+
+    por_id = [(existentes[c], deltas[c]) for c in claves if c in existentes]
+    for i in range(0, len(por_id), LOTE):
+        lote = por_id[i:i + LOTE]
+        VentaDiaria.objects.filter(id__in=[pk for pk, _ in lote]).update(
+            pedidos=Case(*[When(id=pk, then=F('pedidos') + n) for pk, (n, _) in lote],
+                         default=F('pedidos'), output_field=IntegerField()),
+            total=Case(*[When(id=pk, then=F('total') + suma) for pk, (_, suma) in lote],
+                       default=F('total'), output_field=VentaDiaria._meta.get_field('total')))
+
+    _crear({c: deltas[c] for c in claves if c not in existentes}, reintentar)
+
+
+def _crear(nuevas, reintentar):
+    if not nuevas: return
+    try:
+        with transaction.atomic():
+            VentaDiaria.objects.bulk_create([VentaDiaria(**dict(zip(CLAVE, c)), pedidos=n, total=suma)
+                                             for c, (n, suma) in nuevas.items()], batch_size=500)
+    except IntegrityError:
+        # Otra transacción creó la misma fila a la vez: ahora existe y se actualiza
+        if not reintentar: raise
+        ajustar_resumen(nuevas, reintentar=False)
+
+
+def _limites(desde, hasta):
+    # Días locales -> rango de datetimes [desde 00:00, hasta + 1 00:00)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min)) if desde else None
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)) if hasta else None
+    return inicio, fin
+
+
+def pedidos_del_rango(desde=None, hasta=None):
+    inicio, fin = _limites(desde, hasta)
+    pedidos = Pedido.objects.all()
+    if inicio: pedidos = pedidos.filter(fecha_pedido__gte=inicio)
+    if fin: pedidos = pedidos.filter(fecha_pedido__lt=fin)
+    return pedidos
+
+
+def reconstruir(desde=None, hasta=None):
+    """Borra y recalcula VentaDiaria de los días [desde, hasta] (None = sin límite). Devuelve filas creadas."""
+    with transaction.atomic():
+        resumen = resumen_de(pedidos_del_rango(desde, hasta))
+        viejas = VentaDiaria.objects.all()
+        if desde: viejas = viejas.filter(fecha__gte=desde)
+        if hasta: viejas = viejas.filter(fecha__lte=hasta)
+        viejas.delete()
+        VentaDiaria.objects.bulk_create([VentaDiaria(**dict(zip(CLAVE, c)), pedidos=n, total=suma)
+                                         for c, (n, suma) in resumen.items()], batch_size=500)
+    return len(resumen)
+
+
+def consultar(desde=None, hasta=None, sucursal_id=None, estados=None):
+    """Queryset de VentaDiaria filtrado para los reportes (índice único con fecha al frente)."""
+    qs = VentaDiaria.objects.all()
+    if desde: qs = qs.filter(fecha__gte=desde)
+    if hasta: qs = qs.filter(fecha__lte=hasta)
+    if sucursal_id: qs = qs.filter(sucursal_id=sucursal_id)
+    if estados: qs = qs.filter(estado__in=estados)
+    return qs
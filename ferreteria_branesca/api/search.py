@@ -0,0 +1,151 @@
+"""
+Índice de búsqueda de productos para el typeahead del POS.
+
+Se guarda en dos tablas (PalabraBusqueda y TrigramaBusqueda) que se mantienen
+al día desde las señales de Producto/Categoria, así cada búsqueda es un par de
+lecturas indexadas y nunca un recorrido de toda la tabla de productos.
+
+- Normalización: minúsculas y sin tildes ("Lámina" -> "lamina").
+- Prefijo: "lam" encuentra "Lámina"; "tru10" encuentra el SKU "TRU-1001".
+- Trigramas: tolera errores de tipeo ("lamna", "electirco").
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import transaction
+
+# Peso de cada origen de palabra al rankear
+PESO_SKU = 3
+PESO_NOMBRE = 2
+PESO_CATEGORIA = 1
+
+SIMILITUD_MINIMA = 0.5
+LARGO_PALABRA = 60
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', texto).strip()
+
+
+def compactar(texto):
+    return normalizar(texto).replace(' ', '')
+
+
+def trigramas(palabra):
+    relleno = f'  {palabra} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def palabras_producto(sku, nombre, categoria):
+    """Devuelve {palabra: peso} para un producto."""
+    pesos = {}
+
+    def agregar(palabra, peso):
+        palabra = palabra[:LARGO_PALABRA]
+        if palabra and pesos.get(palabra, 0) < peso: pesos[palabra] = peso
+
+    agregar(compactar(sku), PESO_SKU)
+    for p in normalizar(sku).split(): agregar(p, PESO_NOMBRE)
+    for p in normalizar(nombre).split(): agregar(p, PESO_NOMBRE)
+    for p in normalizar(categoria).split(): agregar(p, PESO_CATEGORIA)
+    return pesos
+
+
+def filas_indice(productos, palabra_model, trigrama_model):
+    """
+    Arma (sin guardar) las filas del índice para una lista de tuplas
+    (producto_id, sku, nombre, categoria_nombre). Recibe las clases de modelo
+    para poder usarse también desde migraciones.
+    """
+    palabras, trigs = [], []
+    for pid, sku, nombre, categoria in productos:
+        pesos = palabras_producto(sku, nombre, categoria)
+        vistos = set()
+        for palabra, peso in pesos.items():
+            palabras.append(palabra_model(producto_id=pid, palabra=palabra, peso=peso))
+            vistos |= trigramas(palabra)
+        trigs.extend(trigrama_model(producto_id=pid, trigrama=t) for t in vistos)
+    return palabras, trigs
+
+
+def indexar_productos(producto_ids):
+    """Reindexa solo los productos indicados (usado por las señales y cargas masivas)."""
+    from .models import Producto, PalabraBusqueda, TrigramaBusqueda
+
+    producto_ids = list(producto_ids)
+    if not producto_ids: return
+    datos = Producto.objects.filter(id__in=producto_ids).values_list('id', 'sku', 'nombre', 'categoria__nombre')
+    palabras, trigs = filas_indice(datos, PalabraBusqueda, TrigramaBusqueda)
+    with transaction.atomic():
+        PalabraBusqueda.objects.filter(producto_id__in=producto_ids).delete()
+        TrigramaBusqueda.objects.filter(producto_id__in=producto_ids).delete()
+        PalabraBusqueda.objects.bulk_create(palabras, batch_size=1000)
+        TrigramaBusqueda.objects.bulk_create(trigs, batch_size=1000)
+
+
+def reconstruir_indice(producto_model, palabra_model, trigrama_model, lote=1000):
+    """Reconstruye el índice completo por lotes (migración inicial / comando reindexar_busqueda)."""
+    palabra_model.objects.all().delete()
+    trigrama_model.objects.all().delete()
+    datos = producto_model.objects.order_by('id').values_list('id', 'sku', 'nombre', 'categoria__nombre')
+    total, buffer = 0, []
+    for fila in datos.iterator(chunk_size=lote):
+        buffer.append(fila)
+        if len(buffer) >= lote:
+            total += _guardar_lote(buffer, palabra_model, trigrama_model)
+            buffer = []
+    if buffer:
+        total += _guardar_lote(buffer, palabra_model, trigrama_model)
+    return total
+
+
+def _guardar_lote(filas, palabra_model, trigrama_model):
+    palabras, trigs = filas_indice(filas, palabra_model, trigrama_model)
+    palabra_model.objects.bulk_create(palabras, batch_size=1000)
+    trigrama_model.objects.bulk_create(trigs, batch_size=1000)
+    return len(filas)
+
+
+def buscar_ids(consulta, limite=20):
+    """Devuelve los ids de producto ordenados por relevancia."""
+    from django.db.models import Count, Max
+    from .models import PalabraBusqueda, TrigramaBusqueda
+
+    terminos = normalizar(consulta).split()
+    if not terminos: return []
+
+    puntajes = defaultdict(float)
+    coincidencias = defaultdict(int)
+
+    for termino in terminos:
+        mejor = {}
+        # 1) Prefijo de palabra (usa el índice de 'palabra': LIKE 'lam%')
+        for pid, peso in (PalabraBusqueda.objects.filter(palabra__startswith=termino)
+                          .values('producto_id').annotate(peso=Max('peso')).values_list('producto_id', 'peso')):
+            mejor[pid] = float(peso)
+        # 2) Trigramas para errores de tipeo / coincidencias parciales
+        trigs = trigramas(termino)
+        if len(termino) >= 3:
+            for pid, comunes in (TrigramaBusqueda.objects.filter(trigrama__in=trigs)
+                                 .values('producto_id').annotate(n=Count('id')).values_list('producto_id', 'n')):
+                similitud = comunes / len(trigs)
+                if similitud >= SIMILITUD_MINIMA and similitud > mejor.get(pid, 0):
+                    mejor[pid] = similitud
+        for pid, valor in mejor.items():
+            puntajes[pid] += valor
+            coincidencias[pid] += 1
+
+    # Todos los términos deben coincidir (AND)
+    resultado = {pid: p for pid, p in puntajes.items() if coincidencias[pid] == len(terminos)}
+
+    # SKU escrito completo o parcial ("tru-10" -> "tru10") gana sobre todo lo demás
+    sku = compactar(consulta)
+    if len(terminos) > 1 or sku != terminos[0]:
+        for pid in PalabraBusqueda.objects.filter(peso=PESO_SKU, palabra__startswith=sku).values_list('producto_id', flat=True):
+            resultado[pid] = resultado.get(pid, 0) + PESO_SKU * len(terminos)
+
+    ordenados = sorted(resultado.items(), key=lambda x: (-x[1], x[0]))
+    return [pid for pid, _ in ordenados[:limite]]
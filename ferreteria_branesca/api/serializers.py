@@ -4,8 +4,9 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import (
     Usuario, Producto, Categoria, Sucursal, 
     Inventario, Pedido, DetallePedido, Direccion, 
-    CarritoItem, Recomendacion, Cliente
+    CarritoItem, Recomendacion, Cliente, MovimientoInventario
 )
+from .thumbnails import url_miniatura
 
 # --- 1. CONFIGURACIÓN ---
 class SucursalSerializer(serializers.ModelSerializer):
@@ -21,37 +22,62 @@ class DireccionSerializer(serializers.ModelSerializer):
 class ProductoSerializer(serializers.ModelSerializer):
     stock_disponible = serializers.SerializerMethodField()
     categoria_nombre = serializers.ReadOnlyField(source='categoria.nombre')
+    # Versiones WebP reducidas (150/300/600 px); mientras se generan apuntan a la original
+    imagen_miniatura = serializers.SerializerMethodField()
+    imagen_mediana = serializers.SerializerMethodField()
+    imagen_grande = serializers.SerializerMethodField()
 
     class Meta: 
         model = Producto
-        fields = ('id', 'sku', 'nombre', 'descripcion', 'precio', 'categoria', 'categoria_nombre', 'imagen', 'stock_disponible')
+        fields = ('id', 'sku', 'nombre', 'descripcion', 'precio', 'categoria', 'categoria_nombre', 'imagen',
+                  'imagen_miniatura', 'imagen_mediana', 'imagen_grande', 'stock_disponible')
+
+    def get_imagen_miniatura(self, obj): return url_miniatura(obj, 'miniatura', self.context.get('request'))
+    def get_imagen_mediana(self, obj): return url_miniatura(obj, 'mediana', self.context.get('request'))
+    def get_imagen_grande(self, obj): return url_miniatura(obj, 'grande', self.context.get('request'))
     
     def get_stock_disponible(self, obj):
-        # Intenta obtener el stock de la sucursal del usuario o una por defecto
+        # Si la vista ya anotó el stock (Producto.objects.con_stock) no se hace ninguna consulta
+        if hasattr(obj, 'stock_sucursal'): return obj.stock_sucursal
         request = self.context.get('request')
-        try:
-            if request and hasattr(request.user, 'sucursal') and request.user.sucursal:
-                return obj.inventarios.get(sucursal=request.user.sucursal).cantidad
-            return obj.inventarios.first().cantidad # Fallback
-        except: return 0
+        sucursal_id = Sucursal.id_catalogo(request.user if request else None)
+        inv = obj.inventarios.filter(sucursal_id=sucursal_id).values_list('cantidad', flat=True).first()
+        return inv or 0
+
+class ReprecioSerializer(serializers.Serializer):
+    # Ajuste masivo de precios: porcentaje (+8 = +8%) o monto fijo (C$) sobre los productos filtrados
+    modo = serializers.ChoiceField(choices=['porcentaje', 'monto'])
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2)
+    categoria = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False, allow_blank=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    aplicar = serializers.BooleanField(default=False)  # False = vista previa (dry-run)
+
+    def validate(self, data):
+        if not any(k in data for k in ('categoria', 'sku', 'ids')):
+            raise serializers.ValidationError('Indique al menos un filtro: categoria, sku o ids.')
+        if data['modo'] == 'porcentaje' and data['valor'] <= -100:
+            raise serializers.ValidationError({'valor': 'El porcentaje debe ser mayor a -100.'})
+        return data
 
 class InventarioSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.ReadOnlyField(source='producto.nombre')
     sucursal_nombre = serializers.ReadOnlyField(source='sucursal.nombre')
     class Meta: model = Inventario; fields = '__all__'
 
-class HistoricalInventarioSerializer(serializers.ModelSerializer):
-    producto_nombre = serializers.ReadOnlyField(source='instance.producto.nombre', default='-')
-    sucursal_nombre = serializers.ReadOnlyField(source='instance.sucursal.nombre', default='-')
-    usuario = serializers.ReadOnlyField(source='history_user.username', default='Sistema')
-    fecha = serializers.DateTimeField(source='history_date', format="%d/%m/%Y %H:%M")
+class MovimientoInventarioSerializer(serializers.ModelSerializer):
+    producto_nombre = serializers.ReadOnlyField(source='producto.nombre')
+    sucursal_nombre = serializers.ReadOnlyField(source='sucursal.nombre')
+    usuario = serializers.ReadOnlyField(source='usuario.username', default='Sistema')
+    fecha = serializers.DateTimeField(format="%d/%m/%Y %H:%M")
     class Meta:
-        model = Inventario.history.model
-        fields = ['history_id', 'fecha', 'usuario', 'history_type', 'producto_nombre', 'sucursal_nombre', 'cantidad']
+        model = MovimientoInventario
+        fields = ['id', 'fecha', 'usuario', 'motivo', 'producto', 'producto_nombre', 'sucursal', 'sucursal_nombre',
+                  'delta', 'cantidad_resultante', 'pedido']
 
 # --- 3. CLIENTES (NUEVO) ---
 class ClienteSerializer(serializers.ModelSerializer):
-    deuda_actual = serializers.ReadOnlyField() # Campo calculado en el modelo
+    deuda_actual = serializers.DecimalField(source='saldo_pendiente', max_digits=14, decimal_places=2, read_only=True)
     class Meta:
         model = Cliente
         fields = '__all__'
@@ -126,10 +152,31 @@ class CarritoItemSerializer(serializers.ModelSerializer):
     producto_id = serializers.PrimaryKeyRelatedField(queryset=Producto.objects.all(), source='producto', write_only=True)
     class Meta: model = CarritoItem; fields = ('id', 'producto_id', 'producto_detalle', 'cantidad')
 
+    def to_representation(self, instance):
+        # CarritoViewSet anota el stock; lo pasamos al producto para que no consulte de nuevo
+        if hasattr(instance, 'stock_producto'):
+            instance.producto.stock_sucursal = instance.stock_producto
+        return super().to_representation(instance)
+
+class CarritoLineaSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    cantidad = serializers.IntegerField(min_value=0)  # 0 = quitar del carrito
+
+class CarritoSyncSerializer(serializers.Serializer):
+    # reemplazar: el carrito queda exactamente como la lista; combinar: solo se tocan los productos enviados
+    modo = serializers.ChoiceField(choices=['reemplazar', 'combinar'], default='reemplazar')
+    items = serializers.ListField(child=CarritoLineaSerializer(), allow_empty=True, max_length=500)
+
 class RecomendacionSerializer(serializers.ModelSerializer):
     producto = ProductoSerializer(source='producto_recomendado', read_only=True)
     class Meta: model = Recomendacion; fields = ('producto', 'score')
 
+    def to_representation(self, instance):
+        # RecomendacionesList anota el stock; lo pasamos al producto para que no consulte de nuevo
+        if hasattr(instance, 'stock_recomendado'):
+            instance.producto_recomendado.stock_sucursal = instance.stock_recomendado
+        return super().to_representation(instance)
+
 # --- 7. TOKEN JWT ---
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
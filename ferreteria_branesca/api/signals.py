@@ -1,12 +1,21 @@
 # Este código va en: api/signals.py
 
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
 from decouple import config
 
+from .models import Producto, Categoria, Inventario, Pedido, VersionCatalogo
+from .search import indexar_productos
+from .movimientos import Motivo, registrar_cambios
+from .cartera import ajustar_saldos
+from . import resumen_ventas
+from . import thumbnails
+
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
     """
@@ -36,4 +45,108 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
         config('EMAIL_USER'), # Remitente (tu correo configurado en .env)
         [reset_password_token.user.email] # Destinatario
     )
-    msg.send()
\ No newline at end of file
+    msg.send()
+
+
+# --- Índice de búsqueda de productos ---
+# Al borrar un producto sus filas del índice se van por CASCADE.
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, raw=False, **kwargs):
+    if raw: return  # loaddata
+    indexar_productos([instance.id])
+
+@receiver(post_save, sender=Producto)
+def miniaturas_producto(sender, instance, raw=False, **kwargs):
+    # Solo si la imagen es nueva o cambió; se generan fuera del hilo de la petición
+    if raw or not instance.imagen: return
+    if (instance.miniaturas or {}).get('origen') == instance.imagen.name: return
+    pid, nombre = instance.id, instance.imagen.name
+    transaction.on_commit(lambda: thumbnails.encolar(pid, nombre))
+
+@receiver(post_save, sender=Categoria)
+def indexar_categoria(sender, instance, created, raw=False, **kwargs):
+    if raw or created: return
+    indexar_productos(instance.productos.values_list('id', flat=True))
+
+
+# --- Versión del catálogo (ETag y snapshots por sucursal) ---
+def _subir_versiones():
+    conn = transaction.get_connection()
+    pendientes, conn.catalogo_pendiente = getattr(conn, 'catalogo_pendiente', set()), set()
+    for sucursal_id in pendientes:
+        VersionCatalogo.incrementar(sucursal_id)
+
+def marcar_catalogo_modificado(sucursal_id=None):
+    """
+    sucursal_id=None invalida el catálogo de todas las sucursales (productos/categorías);
+    con una sucursal solo se invalida su stock. Se aplica una vez por transacción y
+    después del commit, para no bloquear las filas de versión mientras dura una venta.
+    """
+    conn = transaction.get_connection()
+    registrado = conn.in_atomic_block and any(f is _subir_versiones for _, f, _ in conn.run_on_commit)
+    if not registrado:
+        conn.catalogo_pendiente = set()  # descarta lo de una transacción revertida
+    conn.catalogo_pendiente.add(sucursal_id)
+    if not registrado:
+        transaction.on_commit(_subir_versiones)
+
+@receiver([post_save, post_delete], sender=Producto)
+@receiver([post_save, post_delete], sender=Categoria)
+def catalogo_modificado(sender, raw=False, **kwargs):
+    if raw: return
+    marcar_catalogo_modificado()
+
+@receiver([post_save, post_delete], sender=Inventario)
+def inventario_modificado(sender, instance, raw=False, **kwargs):
+    if raw: return
+    marcar_catalogo_modificado(instance.sucursal_id)
+
+
+# --- Kardex para guardados de una sola fila (InventarioViewSet, admin) ---
+# Las rutas masivas usan update()/bulk_create y registran sus movimientos ellas mismas.
+# Quien guarda puede indicar instance._usuario_movimiento / instance._motivo_movimiento.
+@receiver(pre_save, sender=Inventario)
+def inventario_cantidad_anterior(sender, instance, raw=False, **kwargs):
+    if raw: return
+    anterior = Inventario.objects.filter(pk=instance.pk).values_list('cantidad', flat=True).first() if instance.pk else None
+    instance._cantidad_anterior = anterior or 0
+
+@receiver(post_save, sender=Inventario)
+def inventario_movimiento(sender, instance, raw=False, **kwargs):
+    if raw: return
+    registrar_cambios([(instance.producto_id, instance.sucursal_id, getattr(instance, '_cantidad_anterior', 0), instance.cantidad)],
+                      getattr(instance, '_motivo_movimiento', Motivo.AJUSTE), getattr(instance, '_usuario_movimiento', None))
+
+
+# --- Saldo pendiente del cliente (api/cartera.py) y resumen diario (api/resumen_ventas.py) ---
+# Cada guardado ajusta ambos por diferencia con lo que el pedido tenía en la base.
+@receiver(pre_save, sender=Pedido)
+def pedido_deuda_anterior(sender, instance, raw=False, **kwargs):
+    if raw or (hasattr(instance, '_deuda_guardada') and hasattr(instance, '_venta_guardada')): return
+    # Solo si no vino completo de la base (from_db ya lo guardó): pedido nuevo o cargado con only()
+    anterior = Pedido.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._deuda_guardada = anterior._deuda_guardada if anterior else (None, 0)
+    instance._venta_guardada = anterior._venta_guardada if anterior else None
+
+@receiver(post_save, sender=Pedido)
+def pedido_saldo_cliente(sender, instance, raw=False, **kwargs):
+    if raw: return
+    cliente_anterior, deuda_anterior = instance._deuda_guardada
+    instance._deuda_guardada = (instance.cliente_id, instance.deuda_cliente())
+    deltas = {cliente_anterior: -deuda_anterior}
+    deltas[instance.cliente_id] = deltas.get(instance.cliente_id, 0) + instance._deuda_guardada[1]
+    ajustar_saldos(deltas)
+
+@receiver(post_save, sender=Pedido)
+def pedido_resumen_ventas(sender, instance, raw=False, **kwargs):
+    if raw: return
+    anterior, nueva = instance._venta_guardada, instance.venta_resumen()
+    instance._venta_guardada = nueva
+    resumen_ventas.mover({anterior[0]: (1, anterior[1])} if anterior else {}, {nueva[0]: (1, nueva[1])})
+
+@receiver(post_delete, sender=Pedido)
+def pedido_borrado_saldo(sender, instance, **kwargs):
+    cliente_id, deuda = getattr(instance, '_deuda_guardada', (instance.cliente_id, instance.deuda_cliente()))
+    ajustar_saldos({cliente_id: -deuda})
+    venta = getattr(instance, '_venta_guardada', None) or instance.venta_resumen()
+    if venta: resumen_ventas.ajustar_resumen({venta[0]: (-1, -venta[1])})
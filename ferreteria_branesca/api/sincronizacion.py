@@ -0,0 +1,209 @@
+"""
+Sincronización en lote de ventas hechas sin conexión (POST /api/ventas/lote/).
+
+La terminal encola las ventas con una clave propia (UUID) y las envía juntas:
+
+    {"ventas": [{"clave": "...", "fecha": "2025-03-01T10:15:00", "cliente_id": 4,
+                 "metodo_pago": "EFECTIVO", "monto_recibido": 500,
+                 "items": [{"id": 12, "cantidad": 3}, ...]}, ...]}
+
+Se bloquean una sola vez todas las filas de Inventario involucradas, se
+reparte el stock en el orden de las ventas y los Pedido / DetallePedido se
+insertan con bulk_create. Cada venta recibe su propio resultado: creada,
+rechazada (stock o datos) o ya_aplicada (la clave ya se había sincronizado).
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import resumen_ventas
+from .cartera import ajustar_saldos
+from .history import historial_desde_queryset
+from .models import Cliente, DetallePedido, Pedido
+from .stock import agrupar_items, aplicar_descuento, bloquear_stock, datos_productos
+
+MAX_VENTAS = 500
+MAX_PRODUCTOS = 1000  # un solo bloqueo: SQL Server admite ~2100 parámetros por consulta
+IVA = Decimal('1.15')
+
+CREADA, RECHAZADA, YA_APLICADA = 'creada', 'rechazada', 'ya_aplicada'
+
+
+class ErrorLote(Exception):
+    pass
+
+
+def _en_lotes(valores, n=1000):
+    valores = list(valores)
+    for i in range(0, len(valores), n):
+        yield valores[i:i + n]
+
+
+class SincronizadorVentas:
+    def __init__(self, usuario, sucursal):
+        self.usuario = usuario
+        self.sucursal = sucursal
+        self.resultados = []
+
+    # --- API ---
+    def sincronizar(self, ventas):
+        if not isinstance(ventas, list) or not ventas: raise ErrorLote('Se esperaba una lista "ventas" no vacía.')
+        if len(ventas) > MAX_VENTAS: raise ErrorLote(f'Máximo {MAX_VENTAS} ventas por lote.')
+
+        self.resultados = [{'clave': str(v.get('clave') or '') if isinstance(v, dict) else '', 'estado': None} for v in ventas]
+        validas = self._validar(ventas)
+
+        with transaction.atomic():
+            existencias = bloquear_stock(self.sucursal.id, {pid for v in validas for pid in v['cantidades']})
+            restante = {pid: cant for pid, (_, cant) in existencias.items()}
+            aceptadas = []
+            for v in validas:
+                sin_stock = [pid for pid, cant in v['cantidades'].items() if restante.get(pid, 0) < cant]
+                if sin_stock:
+                    self._rechazar(v['indice'], f"Sin stock: {self.productos[sin_stock[0]][0]}", motivo='stock')
+                    continue
+                for pid, cant in v['cantidades'].items(): restante[pid] -= cant
+                aceptadas.append(v)
+            if aceptadas: self._guardar(aceptadas, existencias)
+
+        # Una clave repetida dentro del lote sigue la suerte de su primera aparición
+        for r in self.resultados:
+            if 'duplicada_de' in r:
+                original = self.resultados[r.pop('duplicada_de')]
+                r.update({k: v for k, v in original.items() if k != 'clave'})
+                if original['estado'] == CREADA: r['estado'] = YA_APLICADA
+
+        return {
+            'creadas': sum(r['estado'] == CREADA for r in self.resultados),
+            'rechazadas': sum(r['estado'] == RECHAZADA for r in self.resultados),
+            'ya_aplicadas': sum(r['estado'] == YA_APLICADA for r in self.resultados),
+            'resultados': self.resultados,
+        }
+
+    # --- Helpers ---
+    def _rechazar(self, indice, error, motivo='datos'):
+        self.resultados[indice].update(estado=RECHAZADA, motivo=motivo, error=error)
+
+    def _validar(self, ventas):
+        """Parsea cada venta; marca las inválidas y las ya sincronizadas. Devuelve las que quedan."""
+        parseadas, vistas = [], {}
+        for indice, venta in enumerate(ventas):
+            try:
+                parseadas.append(self._parsear(indice, venta))
+            except (ErrorLote, KeyError, TypeError, ValueError, InvalidOperation) as e:
+                self._rechazar(indice, str(e) or 'Venta inválida')
+
+        claves = {v['clave'] for v in parseadas}
+        aplicadas = {}
+        for lote in _en_lotes(claves):
+            aplicadas.update(Pedido.objects.filter(clave_offline__in=lote).values_list('clave_offline', 'id'))
+
+        cliente_ids = {v['cliente_id'] for v in parseadas if v['cliente_id']}
+        self.clientes = {}
+        for lote in _en_lotes(cliente_ids):
+            self.clientes.update(Cliente.objects.filter(id__in=lote).values_list('id', 'dias_credito'))
+        producto_ids = {pid for v in parseadas for pid in v['cantidades']}
+        if len(producto_ids) > MAX_PRODUCTOS: raise ErrorLote(f'El lote tiene más de {MAX_PRODUCTOS} productos distintos; divídalo.')
+        self.productos = datos_productos(producto_ids)
+
+        validas = []
+        for v in parseadas:
+            if v['clave'] in aplicadas:
+                self.resultados[v['indice']].update(estado=YA_APLICADA, pedido_id=aplicadas[v['clave']])
+            elif v['clave'] in vistas:
+                self.resultados[v['indice']].update(estado=YA_APLICADA, duplicada_de=vistas[v['clave']])
+            elif v['cliente_id'] and v['cliente_id'] not in self.clientes:
+                self._rechazar(v['indice'], f"Cliente no encontrado: {v['cliente_id']}")
+            elif faltan := [pid for pid in v['cantidades'] if pid not in self.productos]:
+                self._rechazar(v['indice'], f'Producto no encontrado: {faltan[0]}')
+            else:
+                vistas[v['clave']] = v['indice']
+                validas.append(v)
+        return validas
+
+    def _parsear(self, indice, venta):
+        if not isinstance(venta, dict): raise ErrorLote('Venta inválida')
+        clave = str(venta.get('clave') or '').strip()
+        if not clave: raise ErrorLote('Falta la clave de la venta')
+        if len(clave) > 64: raise ErrorLote('Clave de más de 64 caracteres')
+
+        cantidades = agrupar_items(venta.get('items') or [])
+        if not cantidades: raise ErrorLote('Venta sin productos')
+
+        fecha = None
+        if venta.get('fecha'):
+            fecha = parse_datetime(str(venta['fecha']))
+            if fecha is None: raise ErrorLote(f"Fecha inválida: {venta['fecha']!r}")
+            if timezone.is_naive(fecha): fecha = timezone.make_aware(fecha)
+            if fecha > timezone.now() + timedelta(minutes=5): raise ErrorLote('La fecha está en el futuro')
+
+        metodo = str(venta.get('metodo_pago') or 'EFECTIVO')[:50]
+        # Igual que VentaMostradorView: a crédito no se recibe dinero
+        recibido = Decimal('0') if metodo == 'CREDITO' else Decimal(str(venta.get('monto_recibido') or 0))
+        return {'indice': indice, 'clave': clave, 'fecha': fecha, 'metodo': metodo, 'recibido': recibido,
+                'cliente_id': int(venta['cliente_id']) if venta.get('cliente_id') else None, 'cantidades': cantidades}
+
+    def _guardar(self, aceptadas, existencias):
+        mostrador = None
+        if any(not v['cliente_id'] for v in aceptadas):
+            mostrador, _ = Cliente.objects.get_or_create(nombre='Cliente Mostrador', defaults={'ruc': '0000'})
+            self.clientes[mostrador.id] = mostrador.dias_credito
+
+        pedidos = []
+        for v in aceptadas:
+            cliente_id = v['cliente_id'] or mostrador.id
+            subtotal = sum((self.productos[pid][1] * cant for pid, cant in v['cantidades'].items()), Decimal('0'))
+            dia = timezone.localdate(v['fecha']) if v['fecha'] else timezone.localdate()
+            dias_credito = self.clientes[cliente_id]
+            # bulk_create no pasa por Pedido.save(): se replica su regla de estado y vencimiento
+            pedidos.append(Pedido(
+                cliente_id=cliente_id, sucursal=self.sucursal, vendedor=self.usuario, clave_offline=v['clave'],
+                metodo_pago=v['metodo'], monto_recibido=v['recibido'], total=(subtotal * IVA).quantize(Decimal('0.01')),
+                estado=Pedido.EstadoPedido.PENDIENTE if v['metodo'] == 'CREDITO' else (
+                    Pedido.EstadoPedido.PAGADO if v['metodo'] in ('EFECTIVO', 'TARJETA') else Pedido.EstadoPedido.ENTREGADO),
+                fecha_vencimiento=dia + timedelta(days=dias_credito) if dias_credito > 0 else None,
+            ))
+        Pedido.objects.bulk_create(pedidos, batch_size=500)
+
+        # Releemos los ids por la clave (no todos los motores devuelven pk en bulk_create)
+        ids = {}
+        for lote in _en_lotes([v['clave'] for v in aceptadas]):
+            ids.update(Pedido.objects.filter(clave_offline__in=lote).values_list('clave_offline', 'id'))
+
+        # auto_now_add pisa la fecha en el INSERT: la fecha real de la venta se aplica después
+        con_fecha = [(ids[v['clave']], v['fecha']) for v in aceptadas if v['fecha']]
+        for lote in _en_lotes(con_fecha, 500):
+            Pedido.objects.filter(id__in=[pk for pk, _ in lote]).update(fecha_pedido=Case(
+                *[When(id=pk, then=Value(fecha)) for pk, fecha in lote], output_field=DateTimeField()))
+
+        DetallePedido.objects.bulk_create([
+            DetallePedido(pedido_id=ids[v['clave']], producto_id=pid, cantidad=cant, precio_unitario=self.productos[pid][1])
+            for v in aceptadas for pid, cant in v['cantidades'].items()
+        ], batch_size=1000)
+        for lote in _en_lotes(ids.values()):
+            historial_desde_queryset(Pedido.objects.filter(id__in=lote), tipo='+', usuario=self.usuario, motivo='Sincronización offline')
+
+        totales = {}
+        for v in aceptadas:
+            for pid, cant in v['cantidades'].items(): totales[pid] = totales.get(pid, 0) + cant
+        aplicar_descuento(self.sucursal.id, existencias, totales, self.usuario,
+                          [(ids[v['clave']], v['cantidades']) for v in aceptadas])
+
+        # bulk_create no dispara las señales: el saldo de los clientes a crédito se ajusta aquí
+        saldos = {}
+        for p in pedidos:
+            if p.estado == Pedido.EstadoPedido.PENDIENTE:
+                saldos[p.cliente_id] = saldos.get(p.cliente_id, 0) + p.total - p.monto_recibido
+        ajustar_saldos(saldos)
+        # ...y el resumen diario, ya con la fecha real de cada venta
+        resumen = {}
+        for lote in _en_lotes(list(ids.values())):
+            resumen_ventas.sumar(resumen_ventas.resumen_de(Pedido.objects.filter(id__in=lote)), deltas=resumen)
+        resumen_ventas.ajustar_resumen(resumen)
+
+        for v in aceptadas:
+            self.resultados[v['indice']].update(estado=CREADA, pedido_id=ids[v['clave']])
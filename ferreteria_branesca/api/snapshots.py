@@ -0,0 +1,66 @@
+"""
+Snapshots del catálogo ya serializado (bytes JSON) por sucursal.
+
+Hay una entrada por sucursal (y URL base) que guarda (versión, bytes), con la
+versión de VersionCatalogo (global + sucursal). Las señales de Producto,
+Categoria e Inventario suben la versión y la siguiente lectura reconstruye y
+sobrescribe esa misma entrada: un cambio de stock en una sucursal solo invalida
+el snapshot de esa sucursal y las versiones viejas no se acumulan en la caché. Funciona con cualquier backend de caché de Django
+(locmem o archivos), configurado en CACHES['catalogo'].
+"""
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+
+from .models import Producto
+
+ALIAS = 'catalogo'
+CLAVE_HITS = 'catalogo:stats:hits'
+CLAVE_MISSES = 'catalogo:stats:misses'
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def clave(sucursal_id, base_url):
+    return f'catalogo:snapshot:{base_url}:s{sucursal_id or 0}'
+
+
+def _contar(nombre):
+    cache = _cache()
+    cache.add(nombre, 0, timeout=None)
+    try: cache.incr(nombre)
+    except ValueError: cache.set(nombre, 1, timeout=None)
+
+
+def construir(sucursal_id, request):
+    from .serializers import ProductoSerializer
+    productos = Producto.objects.select_related('categoria').order_by('nombre', 'id').con_stock(sucursal_id)
+    data = ProductoSerializer(productos, many=True, context={'request': request}).data
+    return JSONRenderer().render(data)
+
+
+def obtener(sucursal_id, version, request):
+    """Devuelve los bytes del catálogo; solo usa el ORM si la entrada no existe."""
+    k = clave(sucursal_id, request.build_absolute_uri('/'))
+    guardado = _cache().get(k)
+    if guardado is not None and guardado[0] == version:
+        _contar(CLAVE_HITS)
+        return guardado[1]
+    _contar(CLAVE_MISSES)
+    contenido = construir(sucursal_id, request)
+    _cache().set(k, (version, contenido))
+    return contenido
+
+
+def guardar(sucursal_id, version, request):
+    contenido = construir(sucursal_id, request)
+    _cache().set(clave(sucursal_id, request.build_absolute_uri('/')), (version, contenido))
+    return len(contenido)
+
+
+def estadisticas():
+    valores = _cache().get_many([CLAVE_HITS, CLAVE_MISSES])
+    hits, misses = valores.get(CLAVE_HITS, 0), valores.get(CLAVE_MISSES, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'ratio': round(hits / total, 4) if total else None}
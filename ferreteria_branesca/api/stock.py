@@ -0,0 +1,97 @@
+"""
+Descuento de stock por conjuntos para ventas y checkout.
+
+Todas las filas de Inventario de la venta se bloquean en una sola consulta
+ordenada por pk (dos tickets concurrentes toman los bloqueos en el mismo orden
+y no pueden hacer deadlock) y se descuentan con un único UPDATE condicional,
+así el tiempo que se retienen los bloqueos no crece con el número de líneas.
+"""
+from django.db import IntegrityError
+from django.db.models import Case, F, PositiveIntegerField, Q, Sum, When
+from django.utils import timezone
+
+from .models import Inventario, Producto, ReservaStock
+from .movimientos import registrar_descuentos
+from .signals import marcar_catalogo_modificado
+
+LOTE_UPDATE = 400  # 4 parámetros por fila: queda bajo el límite de ~2100 de SQL Server
+
+
+class StockInsuficiente(IntegrityError):
+    pass
+
+
+def agrupar_items(items):
+    """[{'id', 'cantidad'}, ...] -> {producto_id: cantidad total} (una línea repetida suma)."""
+    cantidades = {}
+    for item in items:
+        producto_id, cantidad = int(item['id']), int(item['cantidad'])
+        if cantidad <= 0: raise ValueError('La cantidad debe ser mayor a 0')
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    return cantidades
+
+
+def datos_productos(producto_ids):
+    """{producto_id: (nombre, precio)} de los productos que existen."""
+    return {pid: (nombre, precio) for pid, nombre, precio in
+            Producto.objects.filter(id__in=producto_ids).values_list('id', 'nombre', 'precio')}
+
+
+def bloquear_stock(sucursal_id, producto_ids, excluir_pedido=None):
+    """
+    Bloquea (una consulta, orden por pk) y devuelve {producto_id: (pk_inventario, disponible)},
+    donde disponible descuenta las reservas web vigentes (salvo las de excluir_pedido).
+    """
+    filas = (Inventario.objects.select_for_update()
+             .filter(sucursal_id=sucursal_id, producto_id__in=producto_ids)
+             .order_by('pk').values_list('pk', 'producto_id', 'cantidad'))
+    existencias = {pid: (pk, cant) for pk, pid, cant in filas}
+    # Con las filas de Inventario bloqueadas nadie más puede reservar estos productos
+    reservas = ReservaStock.objects.filter(sucursal_id=sucursal_id, producto_id__in=producto_ids, expira__gt=timezone.now())
+    if excluir_pedido: reservas = reservas.exclude(pedido_id=excluir_pedido)
+    reservas = reservas.values('producto_id').annotate(total=Sum('cantidad')).values_list('producto_id', 'total')
+    for pid, reservado in reservas:
+        if pid in existencias:
+            pk, cant = existencias[pid]
+            existencias[pid] = (pk, max(cant - reservado, 0))
+    return existencias
+
+
+def aplicar_descuento(sucursal_id, existencias, cantidades, usuario=None, pedidos=None):
+    """
+    UPDATE condicional (CASE pk ... WHERE cantidad >= n) por lotes + movimientos de kardex
+    en bloque. pedidos = [(pedido_id, {producto_id: cantidad}), ...] reparte el total entre
+    los pedidos que lo originan (por defecto un solo movimiento por producto, sin pedido).
+    """
+    items = list(cantidades.items())
+    for i in range(0, len(items), LOTE_UPDATE):
+        condicion, casos = Q(pk__in=[]), []
+        for pid, cantidad in items[i:i + LOTE_UPDATE]:
+            pk = existencias[pid][0]
+            condicion |= Q(pk=pk, cantidad__gte=cantidad)
+            casos.append(When(pk=pk, then=F('cantidad') - cantidad))
+        actualizadas = Inventario.objects.filter(condicion).update(
+            cantidad=Case(*casos, default=F('cantidad'), output_field=PositiveIntegerField()))
+        if actualizadas != len(casos): raise StockInsuficiente('El stock cambió durante la venta')
+
+    registrar_descuentos(sucursal_id, pedidos or [(None, cantidades)], usuario)
+    marcar_catalogo_modificado(sucursal_id)
+
+
+def descontar_stock(sucursal_id, cantidades, usuario=None, pedido_id=None):
+    """
+    Descuenta {producto_id: cantidad} del inventario de la sucursal. Debe
+    llamarse dentro de transaction.atomic(). Devuelve {producto_id: (nombre, precio)}
+    para armar los detalles sin volver a leer los productos.
+    """
+    if not cantidades: return {}
+    productos = datos_productos(cantidades)
+    faltan = set(cantidades) - productos.keys()
+    if faltan: raise Producto.DoesNotExist(f'Producto no encontrado: {min(faltan)}')
+
+    existencias = bloquear_stock(sucursal_id, cantidades)
+    for pid, cantidad in cantidades.items():
+        if existencias.get(pid, (None, 0))[1] < cantidad:
+            raise StockInsuficiente(f'Sin stock: {productos[pid][0]}')
+    aplicar_descuento(sucursal_id, existencias, cantidades, usuario, [(pedido_id, cantidades)])
+    return productos
@@ -1,3 +1,172 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cartera import conciliar
+from . import reservas
+from .models import (AplicacionAbono, CarritoItem, Cliente, Inventario, Pedido, Producto, ReservaStock, Sucursal,
+                     Usuario, VentaDiaria)
+from .resumen_ventas import CLAVE, resumen_de
+
+
+class FlujoCarteraTestCase(TestCase):
+    """Sucursal, vendedor admin, un producto con stock y un cliente con crédito."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sucursal = Sucursal.objects.create(nombre='Central')
+        cls.admin = Usuario.objects.create_superuser('admin', 'admin@test.com', 'x', sucursal=cls.sucursal)
+        cls.producto = Producto.objects.create(sku='MART-16', nombre='Martillo', precio=Decimal('100.00'))
+        Inventario.objects.create(producto=cls.producto, sucursal=cls.sucursal, cantidad=100)
+        cls.cliente = Cliente.objects.create(nombre='Juan', limite_credito=Decimal('5000'), dias_credito=30)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def vender(self, cantidad, metodo='CREDITO'):
+        r = self.api.post('/api/venta-mostrador/', {'metodo_pago': metodo, 'cliente_id': self.cliente.id,
+                                                    'items': [{'id': self.producto.id, 'cantidad': cantidad}]}, format='json')
+        self.assertEqual(r.status_code, 201, r.data)
+        return Pedido.objects.get(id=r.data['pedido_id'])
+
+    def abonar(self, monto):
+        r = self.api.post('/api/registrar-abono/', {'cliente_id': self.cliente.id, 'monto': str(monto)}, format='json')
+        self.assertEqual(r.status_code, 200, r.data)
+        return r.data
+
+    def flujo_completo(self):
+        """Venta a crédito, abono parcial, cancelación y lote sin conexión (las rutas que mueven saldo y resumen)."""
+        self.vender(2)
+        cancelada = self.vender(1)
+        self.vender(3, metodo='EFECTIVO')
+        self.abonar(50)
+        r = self.api.post(f'/api/cancelar-pedido/{cancelada.id}/')
+        self.assertEqual(r.status_code, 200, r.data)
+        r = self.api.post('/api/ventas/lote/', {'ventas': [
+            {'clave': 'T1-0001', 'cliente_id': self.cliente.id, 'metodo_pago': 'CREDITO',
+             'items': [{'id': self.producto.id, 'cantidad': 1}]},
+            {'clave': 'T1-0002', 'metodo_pago': 'EFECTIVO', 'items': [{'id': self.producto.id, 'cantidad': 2}]},
+        ]}, format='json')
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(r.data['creadas'], 2)
+
+
+class ConciliacionTests(FlujoCarteraTestCase):
+    def test_saldo_cuadra_tras_flujo_completo(self):
+        self.flujo_completo()
+        self.assertEqual(conciliar(), [])
+        self.cliente.refresh_from_db()
+        deuda = sum((p.total - p.monto_recibido for p in Pedido.objects.filter(cliente=self.cliente, estado='PENDIENTE')), Decimal('0'))
+        self.assertEqual(self.cliente.saldo_pendiente, deuda)
+        self.assertGreater(deuda, 0)
+
+
+class ResumenVentasTests(FlujoCarteraTestCase):
+    def resumen_guardado(self):
+        # Las filas que quedaron en cero tras mover montos no cuentan
+        return {tuple(fila[:5]): (fila[5], fila[6]) for fila in
+                VentaDiaria.objects.exclude(pedidos=0, total=0).values_list(*CLAVE, 'pedidos', 'total')}
+
+    def test_resumen_cuadra_tras_flujo_completo(self):
+        self.flujo_completo()
+        self.assertEqual(resumen_de(Pedido.objects.all()), self.resumen_guardado())
+        estados = {clave[4] for clave in self.resumen_guardado()}
+        self.assertTrue({'PENDIENTE', 'CANCELADO'} <= estados)
+
+    def test_abono_que_liquida_mueve_el_pedido_a_pagado(self):
+        pedido = self.vender(1)
+        self.abonar(pedido.total)
+        self.assertEqual(resumen_de(Pedido.objects.all()), self.resumen_guardado())
+        self.assertEqual({clave[4] for clave in self.resumen_guardado()}, {'PAGADO'})
+
+
+class AbonoFifoTests(FlujoCarteraTestCase):
+    def setUp(self):
+        super().setUp()
+        # Tres facturas a crédito (IVA incluido): 115, 230 y 115
+        self.facturas = [self.vender(1), self.vender(2), self.vender(1)]
+
+    def aplicaciones(self, abono_id):
+        return list(AplicacionAbono.objects.filter(abono_id=abono_id).order_by('pedido_id').values_list('pedido_id', 'monto'))
+
+    def estados(self):
+        return [(p.estado, p.monto_recibido) for p in Pedido.objects.filter(id__in=[f.id for f in self.facturas]).order_by('id')]
+
+    def test_abono_parcial_reparte_en_orden_de_fecha(self):
+        r = self.abonar(200)
+        uno, dos, tres = self.facturas
+        self.assertEqual(self.aplicaciones(r['abono_id']), [(uno.id, Decimal('115.00')), (dos.id, Decimal('85.00'))])
+        self.assertEqual(self.estados(), [('PAGADO', Decimal('115.00')), ('PENDIENTE', Decimal('85.00')), ('PENDIENTE', Decimal('0.00'))])
+        self.assertEqual((r['monto_aplicado'], r['cambio_devuelto'], r['nueva_deuda']), (Decimal('200'), Decimal('0'), Decimal('260.00')))
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.saldo_pendiente, Decimal('260.00'))
+
+    def test_abono_exacto_liquida_todas_las_facturas(self):
+        r = self.abonar(460)
+        self.assertEqual(self.aplicaciones(r['abono_id']), [(f.id, f.total) for f in self.facturas])
+        self.assertEqual({estado for estado, _ in self.estados()}, {'PAGADO'})
+        self.assertEqual((r['cambio_devuelto'], r['nueva_deuda']), (Decimal('0'), Decimal('0.00')))
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.saldo_pendiente, Decimal('0.00'))
+        self.assertEqual(conciliar(), [])
+
+    def test_sobrepago_devuelve_cambio(self):
+        r = self.abonar(500)
+        self.assertEqual(sum(monto for _, monto in self.aplicaciones(r['abono_id'])), Decimal('460.00'))
+        self.assertEqual((r['monto_aplicado'], r['cambio_devuelto'], r['nueva_deuda']), (Decimal('460.00'), Decimal('40.00'), Decimal('0.00')))
+        self.assertEqual({estado for estado, _ in self.estados()}, {'PAGADO'})
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.saldo_pendiente, Decimal('0.00'))
+        r = self.api.post('/api/registrar-abono/', {'cliente_id': self.cliente.id, 'monto': '10'}, format='json')
+        self.assertEqual(r.status_code, 400)
+
+
+class ReservaExpiradaTests(FlujoCarteraTestCase):
+    def setUp(self):
+        super().setUp()
+        CarritoItem.objects.create(usuario=self.admin, producto=self.producto, cantidad=4)
+        self.pedido = reservas.reservar_carrito(self.admin, self.sucursal.id)
+        # La reserva venció pero el barrido todavía no pasó
+        ReservaStock.objects.filter(pedido=self.pedido).update(expira=timezone.now() - timedelta(minutes=1))
+
+    def test_barrido_no_cancela_un_pedido_ya_pagado(self):
+        reservas.confirmar_pago(self.admin, self.pedido.id, 'PAYPAL-TX-1')
+        self.assertEqual(reservas.liberar_expiradas(), 0)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).estado, 'PAGADO')
+        self.assertEqual(Inventario.objects.get(producto=self.producto).cantidad, 96)
+
+    def test_ids_leidos_antes_del_pago_no_se_cancelan(self):
+        # El barrido eligió el pedido mientras seguía PENDIENTE; confirmar_pago() lo cobra antes del UPDATE
+        vencidos = Pedido.objects.filter(id__in=[self.pedido.id])
+        reservas.confirmar_pago(self.admin, self.pedido.id, 'PAYPAL-TX-2')
+        self.assertEqual(reservas._cancelar(vencidos, motivo='Reserva expirada'), 0)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).estado, 'PAGADO')
+        self.assertEqual(conciliar(), [])
+        self.assertEqual(resumen_de(Pedido.objects.all()), {tuple(f[:5]): (f[5], f[6]) for f in
+                         VentaDiaria.objects.exclude(pedidos=0, total=0).values_list(*CLAVE, 'pedidos', 'total')})
+
+    def test_barrido_cancela_la_reserva_sin_pagar(self):
+        self.assertEqual(reservas.liberar_expiradas(), 1)
+        self.assertEqual(Pedido.objects.get(id=self.pedido.id).estado, 'CANCELADO')
+        self.assertFalse(ReservaStock.objects.exists())
+
 
-# Create your tests here.
+class EstadoCuentaTests(FlujoCarteraTestCase):
+    def test_pdf_se_envia_por_paginas_con_xref_valida(self):
+        Pedido.objects.bulk_create([Pedido(cliente=self.cliente, sucursal=self.sucursal, metodo_pago='CREDITO',
+                                           estado='PENDIENTE', total=Decimal('10.00')) for _ in range(120)])
+        r = self.api.get(f'/api/clientes/{self.cliente.id}/estado-cuenta/')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.streaming)
+        partes = list(r.streaming_content)
+        self.assertGreater(len(partes), 2)  # una por página más el cierre
+        pdf = b''.join(partes)
+        self.assertTrue(pdf.startswith(b'%PDF-') and pdf.endswith(b'%%EOF\n'))
+        xref = int(pdf.rsplit(b'startxref\n', 1)[1].split()[0])
+        filas = pdf[xref:].split(b'trailer')[0].splitlines()[3:]
+        for numero, fila in enumerate(filas, start=1):
+            self.assertTrue(pdf[int(fila[:10]):].startswith(b'%d 0 obj' % numero))
@@ -0,0 +1,100 @@
+"""
+Miniaturas WebP de Producto.imagen.
+
+Al subir una imagen, la señal post_save encola (después del commit) la
+generación de las versiones reducidas en un pool de hilos acotado, fuera del
+hilo de la petición. Las rutas generadas quedan en Producto.miniaturas y el
+serializer las expone como imagen_miniatura / imagen_mediana / imagen_grande.
+
+Usa el storage por defecto, así que funciona igual con Azure que con
+FileSystemStorage (USE_AZURE=False).
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# nombre -> lado mayor en píxeles
+TAMANOS = {'miniatura': 150, 'mediana': 300, 'grande': 600}
+CALIDAD_WEBP = 80
+
+_pool = None
+_pool_lock = threading.Lock()
+_cupos = threading.BoundedSemaphore(settings.MINIATURAS_MAX_PENDIENTES)
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.MINIATURAS_WORKERS, thread_name_prefix='miniaturas')
+        return _pool
+
+
+def ruta_miniatura(nombre_imagen, etiqueta):
+    base = os.path.splitext(os.path.basename(nombre_imagen))[0]
+    return f'productos/miniaturas/{base}_{TAMANOS[etiqueta]}.webp'
+
+
+def generar(producto_id, nombre_imagen):
+    """Genera todas las miniaturas de una imagen y las registra en el producto."""
+    from .models import Producto, VersionCatalogo
+
+    with default_storage.open(nombre_imagen, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    rutas = {'origen': nombre_imagen}
+    for etiqueta, lado in TAMANOS.items():
+        copia = original.copy()
+        copia.thumbnail((lado, lado), Image.LANCZOS)
+        buffer = io.BytesIO()
+        copia.save(buffer, 'WEBP', quality=CALIDAD_WEBP, method=4)
+        ruta = ruta_miniatura(nombre_imagen, etiqueta)
+        if default_storage.exists(ruta):
+            default_storage.delete(ruta)
+        rutas[etiqueta] = default_storage.save(ruta, ContentFile(buffer.getvalue()))
+
+    # update() no dispara señales ni historial; solo si la imagen sigue siendo la misma
+    if Producto.objects.filter(pk=producto_id, imagen=nombre_imagen).update(miniaturas=rutas):
+        VersionCatalogo.incrementar()
+    return rutas
+
+
+def _tarea(producto_id, nombre_imagen):
+    try:
+        generar(producto_id, nombre_imagen)
+    except Exception:
+        logger.exception('No se pudieron generar las miniaturas de %s', nombre_imagen)
+    finally:
+        _cupos.release()
+        close_old_connections()
+
+
+def encolar(producto_id, nombre_imagen):
+    """Encola la generación sin bloquear. Si la cola está llena se omite (ver generar_miniaturas)."""
+    if not _cupos.acquire(blocking=False):
+        logger.warning('Cola de miniaturas llena; se omite %s', nombre_imagen)
+        return False
+    _executor().submit(_tarea, producto_id, nombre_imagen)
+    return True
+
+
+def url_miniatura(producto, etiqueta, request=None):
+    """URL de la miniatura; mientras no exista se devuelve la imagen original."""
+    if not producto.imagen: return None
+    miniaturas = producto.miniaturas or {}
+    ruta = miniaturas.get(etiqueta) if miniaturas.get('origen') == producto.imagen.name else None
+    url = default_storage.url(ruta) if ruta else producto.imagen.url
+    return request.build_absolute_uri(url) if request else url
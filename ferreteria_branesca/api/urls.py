@@ -30,8 +30,10 @@ urlpatterns = [
 
     # POS & Ventas
     path('venta-mostrador/', views.VentaMostradorView.as_view(), name='venta-mostrador'),
+    path('ventas/lote/', views.VentasLoteView.as_view(), name='ventas-lote'),
     path('corte-caja/', views.CorteCajaView.as_view(), name='corte-caja'),
     path('checkout/', views.CheckoutView.as_view(), name='checkout'),
+    path('checkout/<int:pedido_id>/confirmar/', views.ConfirmarCheckoutView.as_view(), name='checkout-confirmar'),
     path('cancelar-pedido/<int:pedido_id>/', views.CancelarPedidoView.as_view(), name='cancelar-pedido'),
     path('historial-pedidos/', views.HistorialPedidosView.as_view(), name='historial-pedidos'),
     
@@ -41,8 +43,11 @@ urlpatterns = [
     # Reportes & Admin
     path('reporte-ventas/', views.reporte_ventas, name='reporte-ventas'),
     path('reporte-vendedores/', views.ReporteVendedoresView.as_view(), name='reporte-vendedores'),
+    path('reportes/antiguedad-saldos/', views.AntiguedadSaldosView.as_view(), name='antiguedad-saldos'),
     path('alertas-stock/', views.AlertasStockBajoView.as_view(), name='alertas-stock'),
     path('monitor-pedidos/', views.MonitorPedidosView.as_view(), name='monitor-pedidos'),
+    path('productos-importar/', views.ImportarProductosView.as_view(), name='productos-importar'),
+    path('catalogo/cache-stats/', views.CatalogoCacheStatsView.as_view(), name='catalogo-cache-stats'),
     path('historial-inventario/', views.HistorialInventarioView.as_view(), name='historial-inventario'),
     path('auditoria-inventario/', views.HistorialInventarioView.as_view()),
     
@@ -1,7 +1,7 @@
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from django.db import transaction, IntegrityError
 from django.db.models import Sum, Count
 from django.utils import timezone
@@ -10,7 +10,7 @@ from django.conf import settings
 from django.core.mail import send_mail
 
 # --- PDF (REPORTLAB) ---
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import io
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
@@ -26,16 +26,43 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import (
     Producto, Categoria, Inventario, Sucursal, Pedido, DetallePedido, 
-    Usuario, Direccion, CarritoItem, Recomendacion, Cliente
+    Usuario, Direccion, CarritoItem, Recomendacion, Cliente, MovimientoInventario
 )
 from .serializers import (
     ProductoSerializer, CategoriaSerializer, InventarioSerializer,
     PedidoSerializer, AdminPedidoSerializer, GestionUsuarioSerializer,
-    DireccionSerializer, HistoricalInventarioSerializer, CarritoItemSerializer,
+    DireccionSerializer, MovimientoInventarioSerializer, CarritoItemSerializer,
     RecomendacionSerializer, SucursalSerializer, ClienteSerializer,
-    RegistroUsuarioSerializer, ChangePasswordSerializer, UserDetailSerializer
+    RegistroUsuarioSerializer, ChangePasswordSerializer, UserDetailSerializer,
+    ReprecioSerializer, CarritoSyncSerializer
 )
 from .permissions import IsAdminOrReadOnly
+from .pagination import KeysetPagination
+from .mixins import CatalogoCondicionalMixin
+from .filters import PedidoFilter, ProductoFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from .search import buscar_ids
+from . import snapshots
+from .importacion import ImportadorProductos, ErrorImportacion
+from .history import historial_desde_queryset
+from .signals import marcar_catalogo_modificado
+from .stock import agrupar_items, descontar_stock
+from .idempotencia import idempotente
+from .sincronizacion import ErrorLote, SincronizadorVentas
+from . import reservas
+from .thumbnails import url_miniatura
+from .movimientos import registrar_cambios, stock_al_dia
+from . import resumen_ventas
+from .cartera import ErrorAbono, antiguedad_saldos, movimientos_cuenta, registrar_abono, verificar_credito
+from .pdf_progresivo import LienzoProgresivo
+from django.db.models import F, Value, DecimalField
+from django.db.models.functions import Round
+import time
+from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 
 # ==========================
 # 1. AUTENTICACIÓN & USUARIOS
@@ -98,18 +125,115 @@ class ClienteViewSet(viewsets.ModelViewSet):
     queryset = Cliente.objects.all().order_by('nombre')
     serializer_class = ClienteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('nombre', 'id')
+
+    @action(detail=True, methods=['get'], url_path='estado-cuenta', permission_classes=[permissions.IsAdminUser])
+    def estado_cuenta(self, request, pk=None):
+        """PDF con cada factura a crédito, cada abono y el saldo corrido del cliente."""
+        cliente = self.get_object()
+        # Las filas se leen por bloques y cada página se envía al cerrarla (api/pdf_progresivo.py):
+        # la memoria no depende del largo del estado de cuenta
+        paginas = dibujar_estado_cuenta(LienzoProgresivo(letter), cliente, request.user.sucursal or Sucursal.objects.first())
+        respuesta = StreamingHttpResponse(paginas, content_type='application/pdf')
+        respuesta['Content-Disposition'] = f'inline; filename="estado_cuenta_{cliente.id}.pdf"'
+        return respuesta
 
 class UsuarioViewSet(viewsets.ModelViewSet):
     queryset = Usuario.objects.all().order_by('-date_joined')
     serializer_class = GestionUsuarioSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_joined', '-id')
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CatalogoCondicionalMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.select_related('categoria').all().order_by('nombre')
     serializer_class = ProductoSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('nombre', 'id')
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ProductoFilter
+    condicional_actions = ('list', 'retrieve', 'buscar')
+    stock_por_sucursal = True
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        # Stock de la sucursal del usuario (o la de respaldo) calculado en el query principal
+        return super().get_queryset().con_stock(Sucursal.id_catalogo(self.request.user))
+
+    def list(self, request, *args, **kwargs):
+        # La lista completa sin filtros (?todos=true) se sirve desde el snapshot por sucursal
+        if set(request.query_params) == {'todos'} and self.paginator.lista_completa(request):
+            if self.handle_conditional(request): return Response(status=status.HTTP_304_NOT_MODIFIED)
+            version, sucursal_id = self.catalogo_version
+            return HttpResponse(snapshots.obtener(sucursal_id, version, request), content_type='application/json')
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def buscar(self, request):
+        # Typeahead del POS: ?q=lamina  |  ?q=tru-10  (sin tildes, por prefijo o trigramas)
+        if self.handle_conditional(request): return Response(status=status.HTTP_304_NOT_MODIFIED)
+        try: limite = max(1, min(int(request.query_params.get('limite', 20)), 50))
+        except ValueError: limite = 20
+        ids = buscar_ids(request.query_params.get('q', ''), limite)
+        productos = {p.id: p for p in self.get_queryset().filter(id__in=ids)}
+        ordenados = [productos[i] for i in ids if i in productos]
+        return Response(self.get_serializer(ordenados, many=True).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def reprecio(self, request):
+        """
+        Ajuste masivo de precios en un solo UPDATE. Sin "aplicar": true devuelve
+        una vista previa (cantidad y muestra con precio actual/nuevo).
+        """
+        ser = ReprecioSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        datos = ser.validated_data
+
+        filtros = {k: datos[k] for k in ('categoria', 'sku') if k in datos}
+        filterset = ProductoFilter(data=filtros, queryset=Producto.objects.all())
+        if not filterset.is_valid(): return Response(filterset.errors, 400)
+        qs = filterset.qs
+        if 'ids' in datos: qs = qs.filter(id__in=datos['ids'])
+
+        decimal = DecimalField(max_digits=10, decimal_places=2)
+        if datos['modo'] == 'porcentaje':
+            factor = 1 + datos['valor'] / 100
+            nuevo = Round(F('precio') * Value(factor, output_field=decimal), 2, output_field=decimal)
+        else:
+            nuevo = F('precio') + Value(datos['valor'], output_field=decimal)
+
+        con_nuevo = qs.annotate(precio_nuevo=nuevo)
+        invalidos = con_nuevo.filter(precio_nuevo__lt=Decimal('0.01')).count()
+        if invalidos:
+            return Response({'error': f'{invalidos} productos quedarían con precio menor a C$ 0.01'}, 400)
+
+        if not datos['aplicar']:
+            muestra = con_nuevo.order_by('nombre', 'id').values('id', 'sku', 'nombre', 'precio', 'precio_nuevo')[:20]
+            return Response({'aplicado': False, 'productos': qs.count(), 'muestra': list(muestra)})
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            actualizados = qs.update(precio=nuevo)
+            historial_desde_queryset(qs, usuario=request.user, motivo='Ajuste masivo de precios')
+            marcar_catalogo_modificado()
+        return Response({'aplicado': True, 'productos': actualizados, 'segundos': round(time.monotonic() - inicio, 3)})
+
+class ImportarProductosView(APIView):
+    """Sube un CSV/XLSX de proveedor y hace upsert por SKU (ver api/importacion.py)."""
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if not archivo: return Response({'error': 'Falta el archivo (campo "archivo")'}, 400)
+        try:
+            res = ImportadorProductos(usuario=request.user).importar(archivo.file, archivo.name)
+        except ErrorImportacion as e:
+            return Response({'error': str(e)}, 400)
+        return Response(res, 200)
+
+class CategoriaViewSet(CatalogoCondicionalMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -122,6 +246,56 @@ class InventarioViewSet(viewsets.ModelViewSet):
     queryset = Inventario.objects.select_related('producto', 'sucursal').all()
     serializer_class = InventarioSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id',)
+
+    # El movimiento de kardex (AJUSTE) lo escribe la señal post_save con el usuario de la petición
+    def perform_create(self, serializer):
+        instancia = Inventario(**serializer.validated_data)
+        instancia._usuario_movimiento = self.request.user
+        instancia.save()
+        serializer.instance = instancia
+
+    def perform_update(self, serializer):
+        serializer.instance._usuario_movimiento = self.request.user
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            registrar_cambios([(instance.producto_id, instance.sucursal_id, instance.cantidad, 0)], usuario=self.request.user)
+            instance.delete()
+
+    @action(detail=False, methods=['get'], url_path='al-dia')
+    def al_dia(self, request):
+        """?fecha=AAAA-MM-DD (fin de ese día) o fecha y hora ISO &sucursal=id: stock de la sucursal en esa fecha."""
+        texto = request.query_params.get('fecha', '')
+        try:
+            hasta = parse_datetime(texto)
+            if hasta is None:
+                dia = parse_date(texto)
+                if dia is not None: hasta = datetime.combine(dia + timedelta(days=1), datetime.min.time())
+        except ValueError:  # bien formada pero inexistente, p.ej. 2025-13-01
+            hasta = None
+        if hasta is None: raise ValidationError('fecha: use AAAA-MM-DD o AAAA-MM-DDTHH:MM.')
+        if timezone.is_naive(hasta): hasta = timezone.make_aware(hasta)
+
+        try:
+            sucursal_id = int(request.query_params.get('sucursal') or request.user.sucursal_id or 0)
+        except ValueError:
+            raise ValidationError('sucursal debe ser un id numérico.')
+        sucursal = Sucursal.objects.filter(id=sucursal_id).first()
+        if sucursal is None: return Response({'error': 'Sucursal no encontrada'}, status=404)
+
+        stock, base = stock_al_dia(sucursal.id, hasta)
+        nombres = {}
+        ids = list(stock)
+        for i in range(0, len(ids), 1000):
+            nombres.update(Producto.objects.filter(id__in=ids[i:i + 1000]).values_list('id', 'nombre'))
+        return Response({
+            'sucursal': sucursal.id, 'sucursal_nombre': sucursal.nombre, 'hasta': hasta, 'base': base,
+            'stock': [{'producto': pid, 'producto_nombre': nombres.get(pid), 'cantidad': cant}
+                      for pid, cant in sorted(stock.items())],
+        })
 
 class DireccionViewSet(viewsets.ModelViewSet):
     serializer_class = DireccionSerializer
@@ -137,12 +311,18 @@ class AdminPedidoViewSet(viewsets.ModelViewSet):
     queryset = Pedido.objects.select_related('cliente', 'vendedor', 'sucursal').prefetch_related('detalles__producto').all().order_by('-fecha_pedido')
     serializer_class = AdminPedidoSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-fecha_pedido', '-id')
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = PedidoFilter
+    ordering_fields = ['fecha_pedido', 'fecha_vencimiento', 'total', 'mora']
     
     def perform_update(self, serializer):
         serializer.save()
 
 class VentaMostradorView(APIView):
     permission_classes = [permissions.IsAdminUser]
+    @idempotente
     def post(self, request):
         try:
             sucursal = request.user.sucursal or Sucursal.objects.first()
@@ -172,19 +352,16 @@ class VentaMostradorView(APIView):
                     total=0, vendedor=request.user, metodo_pago=metodo, monto_recibido=recibido
                 )
                 
-                items = request.data.get('items', [])
-                subtotal = 0; detalles = []
-                
-                for i in items:
-                    inv = Inventario.objects.select_for_update().get(producto_id=i['id'], sucursal_id=sucursal.id)
-                    cant = int(i['cantidad'])
-                    if inv.cantidad < cant: raise IntegrityError(f"Sin stock: {inv.producto.nombre}")
-                    
-                    inv.cantidad -= cant; inv.save()
-                    detalles.append(DetallePedido(pedido=pedido, producto=inv.producto, cantidad=cant, precio_unitario=inv.producto.precio))
-                    subtotal += (inv.producto.precio * cant)
+                cantidades = agrupar_items(request.data.get('items', []))
+                # Un solo bloqueo (ordenado por pk) y un solo UPDATE para todas las líneas
+                productos = descontar_stock(sucursal.id, cantidades, usuario=request.user, pedido_id=pedido.id)
+                detalles = [DetallePedido(pedido=pedido, producto_id=pid, cantidad=cant, precio_unitario=productos[pid][1])
+                            for pid, cant in cantidades.items()]
+                subtotal = sum((d.precio_unitario * d.cantidad for d in detalles), Decimal('0'))
                 
                 total = subtotal * Decimal('1.15') # IVA 15%
+                # Límite de crédito: una lectura por pk del saldo mantenido (bloquea al cliente hasta el commit)
+                if metodo == 'CREDITO': verificar_credito(cliente.id, total)
                 DetallePedido.objects.bulk_create(detalles)
                 pedido.total = total
                 
@@ -198,49 +375,122 @@ class VentaMostradorView(APIView):
                 return Response({'pedido_id': pedido.id}, 201)
         except Exception as e: return Response({'error': str(e)}, 400)
 
+class VentasLoteView(APIView):
+    """Sincroniza de una vez las ventas que una terminal registró sin conexión."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        sucursal = request.user.sucursal or Sucursal.objects.first()
+        if not sucursal: return Response({'error': 'Sin sucursal asignada'}, 400)
+        try:
+            resultado = SincronizadorVentas(request.user, sucursal).sincronizar(request.data.get('ventas'))
+        except ErrorLote as e:
+            return Response({'error': str(e)}, 400)
+        except IntegrityError:
+            # Otra sincronización del mismo lote ganó la carrera; al reintentar salen como ya_aplicada
+            return Response({'error': 'El inventario o el lote cambió durante la sincronización. Reintente.'}, 409)
+        return Response(resultado, 200)
+
 class CheckoutView(APIView):
+    """Paso 1: el carrito pasa a Pedido PENDIENTE y el stock queda reservado mientras se paga."""
     permission_classes = [permissions.IsAuthenticated]
     def post(self, request):
-        return Response({"message": "Funcionalidad Web en mantenimiento por reestructuración"}, 200)
+        sucursal_id = request.data.get('sucursal_id') or Sucursal.id_catalogo(request.user)
+        if not Sucursal.objects.filter(id=sucursal_id).exists(): return Response({'error': 'Sucursal no encontrada'}, 400)
+        try:
+            pedido = reservas.reservar_carrito(request.user, sucursal_id, request.data.get('direccion_id'))
+        except (reservas.ErrorCheckout, IntegrityError) as e:
+            return Response({'error': str(e)}, 400)
+        return Response({'pedido_id': pedido.id, 'total': pedido.total, 'expira': pedido.expira}, 201)
+
+class ConfirmarCheckoutView(APIView):
+    """Paso 2: pago aprobado (PayPal); se descuenta el stock reservado."""
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request, pedido_id):
+        transaction_id = request.data.get('transaction_id')
+        if not transaction_id: return Response({'error': 'Falta transaction_id'}, 400)
+        try:
+            pedido = reservas.confirmar_pago(request.user, pedido_id, str(transaction_id)[:100])
+        except (reservas.ErrorCheckout, IntegrityError) as e:
+            return Response({'error': str(e)}, 400)
+        return Response({'pedido_id': pedido.id, 'estado': pedido.estado})
 
 # ==========================
 # 4. REPORTES Y DASHBOARD
 # ==========================
 
+def _fecha_param(request, nombre):
+    texto = request.query_params.get(nombre)
+    if not texto: return None
+    try:
+        fecha = parse_date(texto)
+    except ValueError:  # bien formada pero inexistente, p.ej. 2025-13-01
+        fecha = None
+    if fecha is None: raise ValidationError(f'{nombre}: use el formato AAAA-MM-DD.')
+    return fecha
+
+def _sucursal_param(request, nombre='sucursal'):
+    try:
+        return int(request.query_params.get(nombre) or 0) or None
+    except ValueError:
+        raise ValidationError(f'{nombre} debe ser un id numérico.')
+
+def _rango_reporte(request):
+    """?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&sucursal=id, todos opcionales."""
+    desde, hasta = _fecha_param(request, 'desde'), _fecha_param(request, 'hasta')
+    if desde and hasta and desde > hasta: raise ValidationError('desde no puede ser posterior a hasta.')
+    return desde, hasta, _sucursal_param(request)
+
+# Los reportes leen VentaDiaria (api/resumen_ventas.py): su costo depende de los días pedidos, no del histórico
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def reporte_ventas(request):
-    hoy = timezone.now().date()
-    total = Pedido.objects.filter(estado='PAGADO').aggregate(Sum('total'))['total__sum'] or 0
-    conteo = Pedido.objects.filter(estado='PAGADO').count()
-    vencidas = Pedido.objects.filter(estado='PENDIENTE', fecha_vencimiento__lt=hoy).count()
-    return Response({'total_ventas': total, 'pedidos_procesados': conteo, 'facturas_vencidas': vencidas})
+    desde, hasta, sucursal_id = _rango_reporte(request)
+    res = resumen_ventas.consultar(desde, hasta, sucursal_id, estados=['PAGADO']).aggregate(total=Sum('total'), conteo=Sum('pedidos'))
+    vencidas = Pedido.objects.filter(estado='PENDIENTE', fecha_vencimiento__lt=timezone.localdate())
+    if sucursal_id: vencidas = vencidas.filter(sucursal_id=sucursal_id)
+    return Response({'total_ventas': res['total'] or 0, 'pedidos_procesados': res['conteo'] or 0, 'facturas_vencidas': vencidas.count()})
 
 class ReporteVendedoresView(APIView):
     permission_classes = [permissions.IsAdminUser]
     def get(self, request):
-        rep = Pedido.objects.filter(estado__in=['PAGADO', 'ENTREGADO']).values('vendedor__username').annotate(total=Sum('total'), pedidos=Count('id')).order_by('-total')
+        desde, hasta, sucursal_id = _rango_reporte(request)
+        rep = (resumen_ventas.consultar(desde, hasta, sucursal_id, estados=['PAGADO', 'ENTREGADO'])
+               .values('vendedor__username').annotate(total=Sum('total'), pedidos=Sum('pedidos')).order_by('-total'))
         return Response(rep)
 
 class CorteCajaView(APIView):
+    """Ventas del usuario en un día: ?fecha=AAAA-MM-DD (hoy por defecto) &sucursal=id."""
     permission_classes = [permissions.IsAdminUser]
     def get(self, request):
-        hoy = timezone.now()
-        vtas = Pedido.objects.filter(
-            vendedor=request.user, 
-            fecha_pedido__date=hoy.date(), 
-            estado__in=['ENTREGADO', 'PAGADO']
-        )
-        res = vtas.aggregate(total=Sum('total'), count=Count('id'))
+        dia = _fecha_param(request, 'fecha') or timezone.localdate()
+        sucursal_id = _sucursal_param(request)
+        estados = ['ENTREGADO', 'PAGADO']
+        res = (resumen_ventas.consultar(dia, dia, sucursal_id, estados=estados).filter(vendedor=request.user)
+               .aggregate(total=Sum('total'), count=Sum('pedidos')))
+        vtas = resumen_ventas.pedidos_del_rango(dia, dia).filter(vendedor=request.user, estado__in=estados)
+        if sucursal_id: vtas = vtas.filter(sucursal_id=sucursal_id)
         detalles = vtas.values('id', 'fecha_pedido', 'total', 'metodo_pago').order_by('-fecha_pedido')
         return Response({
             "vendedor": request.user.username,
-            "fecha": hoy.strftime("%d/%m/%Y"),
+            "fecha": dia.strftime("%d/%m/%Y"),
             "total_vendido": res['total'] or 0.00,
             "transacciones": res['count'] or 0,
             "detalles": list(detalles)
         })
 
+class AntiguedadSaldosView(APIView):
+    """Cartera por tramos de atraso: ?fecha=AAAA-MM-DD (corte, hoy por defecto) &sucursal=id."""
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        corte = _fecha_param(request, 'fecha') or timezone.localdate()
+        return Response(antiguedad_saldos(corte, _sucursal_param(request)))
+
+class CatalogoCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        return Response(snapshots.estadisticas())
+
 class MonitorPedidosView(APIView):
     permission_classes = [permissions.IsAdminUser]
     def get(self, request):
@@ -254,15 +504,124 @@ class AlertasStockBajoView(generics.ListAPIView):
     def get_queryset(self): return Inventario.objects.filter(cantidad__lte=10).order_by('cantidad')
 
 class HistorialInventarioView(generics.ListAPIView):
-    serializer_class = HistoricalInventarioSerializer
+    """Kardex: ?producto=&sucursal=&motivo=&desde=AAAA-MM-DD&hasta=AAAA-MM-DD (paginado por cursor)."""
+    serializer_class = MovimientoInventarioSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-fecha', '-id')
+
     def get_queryset(self):
-        return Inventario.history.select_related('history_user', 'producto', 'sucursal').defer('producto__descripcion').all().order_by('-history_date')[:50]
+        qs = (MovimientoInventario.objects.select_related('usuario', 'producto', 'sucursal')
+              .only('id', 'fecha', 'delta', 'cantidad_resultante', 'motivo', 'pedido_id',
+                    'usuario__username', 'producto__nombre', 'sucursal__nombre'))
+        params = self.request.query_params
+        try:
+            if params.get('producto'): qs = qs.filter(producto_id=int(params['producto']))
+            if params.get('sucursal'): qs = qs.filter(sucursal_id=int(params['sucursal']))
+        except ValueError:
+            raise ValidationError('producto y sucursal deben ser ids numéricos.')
+        if params.get('motivo'): qs = qs.filter(motivo=params['motivo'].upper())
+        for nombre, lookup in (('desde', 'gte'), ('hasta', 'lt')):
+            dia = _fecha_param(self.request, nombre)
+            if dia:
+                if nombre == 'hasta': dia += timedelta(days=1)  # hasta inclusive
+                # Límite como datetime (no __date) para que use el índice por fecha
+                qs = qs.filter(**{f'fecha__{lookup}': timezone.make_aware(datetime.combine(dia, datetime.min.time()))})
+        return qs
 
 # ==========================
 # 5. PDF Y EXTRAS
 # ==========================
 
+def encabezado_pdf(p, sucursal):
+    """Membrete de los PDF (factura, estado de cuenta) en la parte superior de la página."""
+    height = letter[1]
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(1 * inch, height - 1 * inch, "FERRETERÍA EL SHADAY")
+
+    p.setFont("Helvetica", 10)
+    p.drawString(1 * inch, height - 1.25 * inch, f"Sucursal: {sucursal.nombre if sucursal else ''}")
+    p.drawString(1 * inch, height - 1.4 * inch, f"Dirección: {sucursal.direccion if sucursal else ''}")
+    p.drawString(1 * inch, height - 1.55 * inch, "RUC: J031000000000")
+
+def dibujar_estado_cuenta(p, cliente, sucursal):
+    """Generador: dibuja en `p` (LienzoProgresivo) y entrega los bytes de cada página terminada."""
+    width, height = letter
+    pagina = 0
+
+    def nueva_pagina():
+        nonlocal pagina
+        pagina += 1
+        encabezado_pdf(p, sucursal)
+        p.setFont("Helvetica-Bold", 12)
+        p.drawRightString(7.5 * inch, height - 1 * inch, "ESTADO DE CUENTA")
+        p.setFont("Helvetica", 10)
+        p.drawRightString(7.5 * inch, height - 1.2 * inch, f"Emitido: {timezone.localtime().strftime('%d/%m/%Y %H:%M')}")
+        p.drawRightString(7.5 * inch, height - 1.35 * inch, f"Página {pagina}")
+
+        p.line(1 * inch, height - 1.7 * inch, 7.5 * inch, height - 1.7 * inch)
+        p.setFont("Helvetica-Bold", 10)
+        p.drawString(1 * inch, height - 1.9 * inch, "CLIENTE:")
+        p.setFont("Helvetica", 10)
+        p.drawString(1.8 * inch, height - 1.9 * inch, cliente.nombre)
+        p.drawString(5 * inch, height - 1.9 * inch, f"RUC/Cédula: {cliente.ruc or 'N/A'}")
+        p.drawString(1.8 * inch, height - 2.05 * inch, f"Límite de crédito: C$ {cliente.limite_credito:.2f}  |  Plazo: {cliente.dias_credito} días")
+
+        y = height - 2.4 * inch
+        p.setFillColorRGB(0.9, 0.9, 0.9)
+        p.rect(1 * inch, y - 5, 6.5 * inch, 15, fill=1, stroke=0)
+        p.setFillColorRGB(0, 0, 0)
+        p.setFont("Helvetica-Bold", 9)
+        p.drawString(1.1 * inch, y, "FECHA")
+        p.drawString(1.9 * inch, y, "DOCUMENTO")
+        p.drawString(3.4 * inch, y, "VENCE")
+        p.drawRightString(5.0 * inch, y, "CARGO")
+        p.drawRightString(6.2 * inch, y, "ABONO")
+        p.drawRightString(7.4 * inch, y, "SALDO")
+        p.setFont("Helvetica", 9)
+        return y - 20
+
+    y = nueva_pagina()
+    cargos = abonos = saldo = Decimal('0')
+    for fecha, tipo, documento, vence, cargo, pago, saldo in movimientos_cuenta(cliente.id):
+        if y < 1 * inch:
+            p.showPage()
+            yield p.pendiente()
+            y = nueva_pagina()
+        cargos += cargo
+        abonos += pago
+        p.drawString(1.1 * inch, y, timezone.localtime(fecha).strftime('%d/%m/%Y'))
+        p.drawString(1.9 * inch, y, f"Factura N° {documento}" if tipo == 'F' else f"Abono N° {documento}")
+        p.drawString(3.4 * inch, y, vence.strftime('%d/%m/%Y') if vence else '')
+        p.drawRightString(5.0 * inch, y, f"C$ {cargo:.2f}" if cargo else '')
+        p.drawRightString(6.2 * inch, y, f"C$ {pago:.2f}" if pago else '')
+        p.drawRightString(7.4 * inch, y, f"C$ {saldo:.2f}")
+        y -= 15
+
+    if y < 2 * inch:
+        p.showPage()
+        yield p.pendiente()
+        y = nueva_pagina()
+    p.line(1 * inch, y - 5, 7.5 * inch, y - 5)
+    y -= 25
+    filas = [("TOTAL CARGOS:", cargos), ("TOTAL ABONOS:", abonos)]
+    # Pagos hechos antes de que existieran los abonos (o fuera de ellos) no tienen fila propia
+    if saldo != cliente.saldo_pendiente: filas.append(("OTROS PAGOS / AJUSTES:", saldo - cliente.saldo_pendiente))
+    p.setFont("Helvetica-Bold", 10)
+    for etiqueta, monto in filas:
+        p.drawRightString(6.0 * inch, y, etiqueta)
+        p.drawRightString(7.4 * inch, y, f"C$ {monto:.2f}")
+        y -= 15
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(6.0 * inch, y, "SALDO PENDIENTE:")
+    p.drawRightString(7.4 * inch, y, f"C$ {cliente.saldo_pendiente:.2f}")
+
+    p.setFont("Helvetica", 8)
+    p.drawCentredString(width / 2, 0.5 * inch, "Ferretería El Shaday - Departamento de Cobranza")
+    p.showPage()
+    p.save()
+    yield p.pendiente()
+
 class FacturaPDFView(APIView):
     """
     Genera un PDF usando ReportLab
@@ -281,13 +640,7 @@ class FacturaPDFView(APIView):
         width, height = letter
 
         # Encabezado
-        p.setFont("Helvetica-Bold", 18)
-        p.drawString(1 * inch, height - 1 * inch, "FERRETERÍA EL SHADAY")
-        
-        p.setFont("Helvetica", 10)
-        p.drawString(1 * inch, height - 1.25 * inch, f"Sucursal: {pedido.sucursal.nombre}")
-        p.drawString(1 * inch, height - 1.4 * inch, f"Dirección: {pedido.sucursal.direccion}")
-        p.drawString(1 * inch, height - 1.55 * inch, "RUC: J031000000000")
+        encabezado_pdf(p, pedido.sucursal)
 
         # Datos Factura
         p.setFont("Helvetica-Bold", 12)
@@ -374,27 +727,87 @@ class FacturaPDFView(APIView):
 class CarritoViewSet(viewsets.ModelViewSet):
     serializer_class = CarritoItemSerializer
     permission_classes = [permissions.IsAuthenticated]
-    def get_queryset(self): return CarritoItem.objects.filter(usuario=self.request.user)
+
+    def get_queryset(self):
+        # Producto, categoría y stock de la sucursal en el mismo query (sin un query por ítem)
+        sucursal_id = _sucursal_param(self.request, 'sucursal_id') or Sucursal.id_catalogo(self.request.user)
+        return (CarritoItem.objects.filter(usuario=self.request.user)
+                .select_related('producto__categoria')
+                .annotate(stock_producto=Inventario.disponible('producto', sucursal_id))
+                .order_by('creado_en', 'id'))
+
+    def perform_create(self, serializer): serializer.save(usuario=self.request.user)
+
+    def _resumen(self):
+        items, subtotal = [], Decimal('0')
+        for item in self.get_queryset():
+            p = item.producto
+            linea = p.precio * item.cantidad
+            subtotal += linea
+            items.append({
+                'id': item.id, 'producto_id': p.id, 'sku': p.sku, 'nombre': p.nombre, 'precio': p.precio,
+                'imagen': url_miniatura(p, 'miniatura', self.request), 'cantidad': item.cantidad,
+                'stock_disponible': item.stock_producto, 'subtotal': linea,
+            })
+        iva = (subtotal * Decimal('0.15')).quantize(Decimal('0.01'))
+        return {'items': items, 'subtotal': subtotal, 'iva': iva, 'total': subtotal + iva}
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        return Response(self._resumen())
+
+    @action(detail=False, methods=['post'], url_path='sync')
+    def sync(self, request):
+        datos = CarritoSyncSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        cantidades = {}
+        for linea in datos.validated_data['items']: cantidades[linea['id']] = linea['cantidad']
+        existentes = set(Producto.objects.filter(id__in=cantidades).values_list('id', flat=True))
+
+        with transaction.atomic():
+            actual = CarritoItem.objects.filter(usuario=request.user)
+            if datos.validated_data['modo'] == 'reemplazar':
+                actual.exclude(producto_id__in=[pid for pid, cant in cantidades.items() if cant > 0]).delete()
+            else:
+                actual.filter(producto_id__in=[pid for pid, cant in cantidades.items() if cant == 0]).delete()
+            # Sin upsert (SQL Server no soporta update_conflicts): bulk_update de las líneas que ya
+            # están en el carrito y bulk_create de las nuevas
+            en_carrito = dict(actual.filter(producto_id__in=cantidades).values_list('producto_id', 'id'))
+            lineas = [CarritoItem(id=en_carrito.get(pid), usuario=request.user, producto_id=pid, cantidad=cant)
+                      for pid, cant in cantidades.items() if cant > 0 and pid in existentes]
+            CarritoItem.objects.bulk_update([l for l in lineas if l.id is not None], ['cantidad'])
+            CarritoItem.objects.bulk_create([l for l in lineas if l.id is None])
+        return Response(self._resumen())
 
 class RecomendacionesList(generics.ListAPIView):
     serializer_class = RecomendacionSerializer
     def get_queryset(self):
         pid = self.kwargs.get('producto_id')
-        return Recomendacion.objects.filter(producto_base_id=pid).order_by('-score')
+        # Producto y stock de la sucursal en el mismo query (sin un query por recomendación)
+        stock = Inventario.disponible('producto_recomendado', Sucursal.id_catalogo(self.request.user))
+        return (Recomendacion.objects.filter(producto_base_id=pid)
+                .select_related('producto_recomendado__categoria')
+                .annotate(stock_recomendado=stock)
+                .order_by('-score'))
 
 class HistorialPedidosView(generics.ListAPIView):
     serializer_class = PedidoSerializer
     permission_classes = [permissions.IsAuthenticated]
-    def get_queryset(self): return Pedido.objects.none()
+    def get_queryset(self):
+        return (Pedido.objects.filter(usuario=self.request.user)
+                .select_related('cliente').prefetch_related('detalles__producto')
+                .order_by('-fecha_pedido', '-id'))
 
 class CancelarPedidoView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def post(self, request, pedido_id):
         try:
             p = Pedido.objects.get(id=pedido_id)
+            if not request.user.is_staff and p.usuario_id != request.user.id:
+                return Response({'error': 'No encontrado'}, 404)
             if p.estado == 'PENDIENTE':
-                p.estado = 'CANCELADO'
-                p.save()
+                # Una sola ruta de cancelación: estado, saldo, resumen, historial y reservas
+                reservas.liberar_pedido(p, request.user)
                 return Response({'status': 'Cancelado'})
             return Response({'error': 'No se puede cancelar'}, 400)
         except: return Response({'error': 'No encontrado'}, 404)
@@ -403,55 +816,28 @@ class CancelarPedidoView(APIView):
 class RegistrarAbonoView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
+    @idempotente
     def post(self, request):
-        cliente_id = request.data.get('cliente_id')
-        monto_abono = Decimal(request.data.get('monto', 0))
-
+        try:
+            monto_abono = Decimal(str(request.data.get('monto', 0)))
+        except ArithmeticError:
+            return Response({'error': 'Monto inválido'}, status=400)
         if monto_abono <= 0:
             return Response({'error': 'El monto debe ser mayor a 0'}, status=400)
 
         try:
-            cliente = Cliente.objects.get(id=cliente_id)
-            # Buscar facturas pendientes ordenadas por fecha (FIFO)
-            pendientes = Pedido.objects.filter(cliente=cliente, estado='PENDIENTE').order_by('fecha_pedido')
-
-            if not pendientes.exists():
-                return Response({'error': 'Este cliente no tiene deuda pendiente.'}, status=400)
-
-            abonado_total = 0
-            saldo_restante = monto_abono
-
-            with transaction.atomic():
-                for pedido in pendientes:
-                    if saldo_restante <= 0:
-                        break
-
-                    deuda_pedido = pedido.total - pedido.monto_recibido
-                    
-                    if saldo_restante >= deuda_pedido:
-                        # Paga completo
-                        pedido.monto_recibido += deuda_pedido
-                        pedido.estado = 'PAGADO'
-                        pedido.save()
-                        saldo_restante -= deuda_pedido
-                        abonado_total += deuda_pedido
-                    else:
-                        # Abono parcial
-                        pedido.monto_recibido += saldo_restante
-                        pedido.save()
-                        abonado_total += saldo_restante
-                        saldo_restante = 0
-
-                cambio = monto_abono - abonado_total
-
-            return Response({
-                'mensaje': 'Abono registrado correctamente',
-                'monto_aplicado': abonado_total,
-                'cambio_devuelto': cambio,
-                'nueva_deuda': cliente.deuda_actual
-            })
-
-        except Cliente.DoesNotExist:
+            # Reparto FIFO con las filas bloqueadas una sola vez (ver api/cartera.py)
+            abono = registrar_abono(request.data.get('cliente_id'), monto_abono, request.user)
+        except (Cliente.DoesNotExist, ValueError):
             return Response({'error': 'Cliente no encontrado'}, 404)
-        except Exception as e:
-            return Response({'error': str(e)}, 400)
\ No newline at end of file
+        except ErrorAbono as e:
+            return Response({'error': str(e)}, 400)
+
+        return Response({
+            'mensaje': 'Abono registrado correctamente',
+            'abono_id': abono.id,
+            'monto_aplicado': abono.aplicado,
+            'cambio_devuelto': abono.cambio,
+            'nueva_deuda': abono.saldo_cliente,
+            'aplicaciones': [{'pedido_id': pid, 'monto': pago} for pid, pago in abono.aplicaciones_fifo],
+        })
\ No newline at end of file
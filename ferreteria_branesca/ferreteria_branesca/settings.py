@@ -138,6 +138,43 @@ REST_FRAMEWORK = {
     }
 }
 
+# --- Catálogo ---
+# Sucursal cuyo stock ven los visitantes anónimos y empleados sin sucursal asignada.
+# Si no se define, se usa la primera sucursal registrada (menor id).
+SUCURSAL_CATALOGO_ID = config('SUCURSAL_CATALOGO_ID', default=None, cast=lambda v: int(v) if v else None)
+
+# --- Idempotency-Key del POS (api/idempotencia.py) ---
+# Horas que se conserva una respuesta para reintentos; se purga con `purgar_idempotencia`.
+IDEMPOTENCIA_HORAS = config('IDEMPOTENCIA_HORAS', default=48, cast=int)
+
+# --- Reservas de stock del checkout web (api/reservas.py) ---
+# Minutos que se aparta el stock mientras el cliente paga; `liberar_reservas` barre las vencidas.
+RESERVA_MINUTOS = config('RESERVA_MINUTOS', default=15, cast=int)
+
+# --- Reportes de cartera (api/cartera.py) ---
+# Segundos que se reutiliza un reporte de antigüedad de saldos ya calculado.
+REPORTES_CACHE_SEGUNDOS = config('REPORTES_CACHE_SEGUNDOS', default=60, cast=int)
+
+# --- Miniaturas de productos (api/thumbnails.py) ---
+MINIATURAS_WORKERS = config('MINIATURAS_WORKERS', default=2, cast=int)
+MINIATURAS_MAX_PENDIENTES = config('MINIATURAS_MAX_PENDIENTES', default=100, cast=int)
+
+# --- Caché ---
+# 'catalogo' guarda los snapshots del catálogo por sucursal (api/snapshots.py).
+# Por defecto en memoria; con CATALOGO_CACHE_DIR se comparte entre procesos vía archivos.
+CATALOGO_CACHE_DIR = config('CATALOGO_CACHE_DIR', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if CATALOGO_CACHE_DIR else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': CATALOGO_CACHE_DIR or 'catalogo',
+        'TIMEOUT': 60 * 60 * 6,
+        'OPTIONS': {'MAX_ENTRIES': 200},
+    },
+}
+
 # --- Email ---
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
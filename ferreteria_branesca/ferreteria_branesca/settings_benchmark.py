@@ -0,0 +1,32 @@
+"""
+Configuración para `python manage.py benchmark --settings=ferreteria_branesca.settings_benchmark`.
+
+Usa una base SQLite desechable (se recrea en cada corrida) para que el
+benchmark construya sus propios datos sin tocar SQL Server ni Azure.
+"""
+import os
+import tempfile
+
+for variable in ('DB_NAME', 'DB_USER', 'DB_PASS', 'DB_HOST', 'DB_PORT', 'DB_DRIVER_NAME'):
+    os.environ.setdefault(variable, 'benchmark')
+os.environ.setdefault('USE_AZURE', 'False')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import REST_FRAMEWORK, config  # noqa: E402
+
+DEBUG = False
+BENCHMARK_DB = config('BENCHMARK_DB', default=os.path.join(tempfile.gettempdir(), 'ferreteria_benchmark.sqlite3'))
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BENCHMARK_DB,
+        # Los clientes concurrentes esperan el bloqueo de escritura en vez de fallar
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+    }
+}
+
+# Sin límites de peticiones ni hashing lento: se mide la API, no el throttling
+REST_FRAMEWORK = {k: v for k, v in REST_FRAMEWORK.items() if k != 'DEFAULT_THROTTLE_CLASSES'}
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'ferreteria_benchmark_media')